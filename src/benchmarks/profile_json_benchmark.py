@@ -0,0 +1,100 @@
+# src/benchmarks/profile_json_benchmark.py
+
+"""
+Compares the two profile read paths for a batch of users:
+
+    orm   select(User) with the four selectinloads, to_dict(), json.dumps of the event
+    sql   ProfileJSONLoader (one json_build_object statement), dumps_event of the event
+
+Usage (from src/):
+    python -m benchmarks.profile_json_benchmark [batch_size ...]
+
+Reads random existing profiles from the application database (default batch
+sizes 1, 20 and 100); nothing is written. Each batch is timed end to end,
+from query to SSE-ready text, and the two outputs are checked to parse to the
+same profiles, ignoring the order of nested lists.
+"""
+
+import sys
+import json
+import time
+import asyncio
+from sqlalchemy import select, text
+from sqlalchemy.orm import selectinload
+from database.models import User
+from database.client import get_async_session_factory
+from search.services.profile_json import ProfileJSONLoader, DICT, LLM, dumps_event
+
+DEFAULT_BATCHES = [1, 20, 100]
+RUNS = 7  # Per path and batch size; the median is reported
+PROFILE_LOAD_OPTIONS = (
+    selectinload(User.projects),
+    selectinload(User.educations),
+    selectinload(User.experiences),
+    selectinload(User.skills)
+)
+
+
+async def _orm(session_factory, user_ids, shape):
+    async with session_factory() as session:
+        users = (await session.execute(
+            select(User).options(*PROFILE_LOAD_OPTIONS).where(User.user_id.in_(user_ids))
+        )).scalars().all()
+        profiles = [user.to_dict() if shape == DICT else user.for_llm() for user in users]
+    return json.dumps({ "type": "users", "message": profiles })
+
+
+async def _sql(loader, user_ids, shape):
+    profiles = await loader.load(user_ids, shape)
+    return dumps_event({ "type": "users", "message": list(profiles.values()) })
+
+
+async def _time(fn, *args) -> tuple:
+    timings, output = [], None
+    for _ in range(RUNS):
+        started = time.perf_counter()
+        output = await fn(*args)
+        timings.append((time.perf_counter() - started) * 1000)
+    timings.sort()
+    return timings[len(timings) // 2], output
+
+
+def _comparable(payload: str):
+    """The profiles of an event, keyed by user_id, with nested lists sorted."""
+    profiles = {}
+    for profile in json.loads(payload)["message"]:
+        profiles[profile["user_id"]] = {
+            key: sorted(value, key=json.dumps) if isinstance(value, list) else value
+            for key, value in profile.items()
+        }
+    return profiles
+
+
+async def run(batch_sizes):
+    session_factory = get_async_session_factory()
+    loader = ProfileJSONLoader(session_factory)
+    async with session_factory() as session:
+        user_ids = (await session.execute(
+            text("SELECT user_id FROM users ORDER BY random() LIMIT :n"), { "n": max(batch_sizes) }
+        )).scalars().all()
+    if not user_ids:
+        print("[BENCH] No users in the database.")
+        return
+
+    print(f"{'shape':<6} {'batch':>6} {'orm (ms)':>10} {'sql (ms)':>10} {'speedup':>8} {'bytes':>9}  same")
+    for shape in (DICT, LLM):
+        for size in batch_sizes:
+            ids = user_ids[:size]
+            # Warm up connections and statement caches before timing.
+            await _orm(session_factory, ids, shape)
+            await _sql(loader, ids, shape)
+            orm_ms, orm_out = await _time(_orm, session_factory, ids, shape)
+            sql_ms, sql_out = await _time(_sql, loader, ids, shape)
+            same = _comparable(orm_out) == _comparable(sql_out)
+            speedup = orm_ms / sql_ms if sql_ms else float("inf")
+            print(f"{shape:<6} {len(ids):>6} {orm_ms:>10.1f} {sql_ms:>10.1f} {speedup:>7.1f}x {len(sql_out):>9}  {same}")
+
+
+if __name__ == "__main__":
+    sizes = [int(arg) for arg in sys.argv[1:]] or DEFAULT_BATCHES
+    asyncio.run(run(sizes))
@@ -0,0 +1,116 @@
+# src/benchmarks/read_model_benchmark.py
+
+"""
+Compares ORM entities with the read models in database/read_models.py for the
+same batch of profiles:
+
+    orm    select(User) with the four selectinloads
+    view   load_profiles() (plain column selects into ProfileView)
+
+Usage (from src/):
+    python -m benchmarks.read_model_benchmark [batch_size]
+
+Reads random existing profiles (default 200); nothing is written. Reported per
+path: load time (query and construction), time for to_dict() and for_llm() on
+every profile (twice, the second call showing the cache), and the memory that
+stays allocated per loaded profile, measured with tracemalloc.
+"""
+
+import gc
+import sys
+import time
+import asyncio
+import tracemalloc
+from sqlalchemy import select, text
+from sqlalchemy.orm import selectinload
+from database.models import User
+from database.client import get_async_session_factory
+from database.read_models import load_profiles
+
+DEFAULT_BATCH = 200
+RUNS = 5  # Per path; the median is reported
+
+
+async def _load_orm(session_factory, user_ids):
+    async with session_factory() as session:
+        return list((await session.execute(
+            select(User)
+            .options(
+                selectinload(User.projects),
+                selectinload(User.educations),
+                selectinload(User.experiences),
+                selectinload(User.skills)
+            )
+            .where(User.user_id.in_(user_ids))
+        )).scalars().all())
+
+
+async def _load_views(session_factory, user_ids):
+    async with session_factory() as session:
+        return list((await load_profiles(session, user_ids)).values())
+
+
+def _views_ms(profiles) -> float:
+    started = time.perf_counter()
+    for profile in profiles:
+        profile.to_dict()
+        profile.for_llm()
+    return (time.perf_counter() - started) * 1000
+
+
+async def _measure(load, session_factory, user_ids) -> dict:
+    load_ms, first_ms, second_ms = [], [], []
+    for _ in range(RUNS):
+        started = time.perf_counter()
+        profiles = await load(session_factory, user_ids)
+        load_ms.append((time.perf_counter() - started) * 1000)
+        first_ms.append(_views_ms(profiles))
+        second_ms.append(_views_ms(profiles))
+
+    gc.collect()
+    tracemalloc.start()
+    baseline = tracemalloc.get_traced_memory()[0]
+    profiles = await load(session_factory, user_ids)
+    gc.collect()
+    retained = tracemalloc.get_traced_memory()[0] - baseline
+    tracemalloc.stop()
+
+    median = lambda values: sorted(values)[len(values) // 2]
+    return {
+        "profiles": len(profiles),
+        "load_ms": median(load_ms),
+        "views_ms": median(first_ms),
+        "cached_views_ms": median(second_ms),
+        "bytes_per_profile": retained / len(profiles) if profiles else 0.0,
+    }
+
+
+async def run(batch_size: int):
+    session_factory = get_async_session_factory()
+    async with session_factory() as session:
+        user_ids = (await session.execute(
+            text("SELECT user_id FROM users ORDER BY random() LIMIT :n"), { "n": batch_size }
+        )).scalars().all()
+    if not user_ids:
+        print("[BENCH] No users in the database.")
+        return
+
+    # Warm up connections and statement caches before measuring.
+    await _load_orm(session_factory, user_ids)
+    await _load_views(session_factory, user_ids)
+    results = {
+        "orm": await _measure(_load_orm, session_factory, user_ids),
+        "view": await _measure(_load_views, session_factory, user_ids),
+    }
+
+    print(f"{'path':<6} {'profiles':>9} {'load (ms)':>10} {'views (ms)':>11} {'cached (ms)':>12} {'KB/profile':>11}")
+    for name, result in results.items():
+        print(
+            f"{name:<6} {result['profiles']:>9} {result['load_ms']:>10.1f} {result['views_ms']:>11.2f} "
+            f"{result['cached_views_ms']:>12.2f} {result['bytes_per_profile'] / 1024:>11.1f}"
+        )
+
+
+if __name__ == "__main__":
+    size = int(sys.argv[1]) if len(sys.argv) > 1 else DEFAULT_BATCH
+    asyncio.run(run(size))
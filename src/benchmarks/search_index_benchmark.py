@@ -0,0 +1,164 @@
+# src/benchmarks/search_index_benchmark.py
+
+"""
+Measures the filter_structured experience filters with and without the
+indexes from database/migrations/0002_experiences_search_indexes.sql.
+
+Usage (from src/):
+    python -m benchmarks.search_index_benchmark [rows ...]
+
+For each row count (default 100000 and 1000000) a synthetic experiences table
+is generated in a scratch schema, every query is timed with EXPLAIN ANALYZE,
+the indexes are built, and the queries are timed again. The scratch schema is
+dropped afterwards; nothing in the application schema is touched.
+"""
+
+import re
+import sys
+import json
+import asyncio
+from sqlalchemy import text
+from database.client import get_async_engine
+
+SCHEMA = "bench_search_index"
+DEFAULT_ROWS = [100_000, 1_000_000]
+RUNS = 3  # EXPLAIN ANALYZE runs per query; the median is reported
+
+SETUP = [
+    "CREATE EXTENSION IF NOT EXISTS pg_trgm",
+    f"DROP SCHEMA IF EXISTS {SCHEMA} CASCADE",
+    f"CREATE SCHEMA {SCHEMA}",
+    f"""
+    CREATE TABLE {SCHEMA}.experiences (
+        experience_id BIGINT PRIMARY KEY,
+        user_id BIGINT NOT NULL,
+        job_title TEXT,
+        company_name TEXT,
+        location TEXT,
+        experience_description TEXT,
+        search_tsv tsvector GENERATED ALWAYS AS (
+            setweight(to_tsvector('simple'::regconfig, coalesce(job_title, '')), 'A') ||
+            setweight(to_tsvector('simple'::regconfig, coalesce(company_name, '')), 'B') ||
+            setweight(to_tsvector('simple'::regconfig, coalesce(location, '')), 'C') ||
+            setweight(to_tsvector('simple'::regconfig, coalesce(experience_description, '')), 'D')
+        ) STORED
+    )
+    """,
+]
+
+# Roughly three experiences per user, drawn from small vocabularies so that
+# selective and unselective filters both occur.
+POPULATE = f"""
+INSERT INTO {SCHEMA}.experiences
+SELECT
+    i,
+    i / 3,
+    (ARRAY['Software Engineer', 'Senior Backend Developer', 'Data Scientist', 'Product Manager',
+           'Machine Learning Engineer', 'DevOps Engineer', 'Frontend Developer', 'Engineering Manager'])[1 + i % 8]
+        || ' ' || (i % 997),
+    (ARRAY['Google', 'Microsoft', 'Stripe', 'Shopify', 'Spotify', 'Datadog', 'Airbnb', 'Revolut',
+           'Mistral', 'Canva', 'Atlassian'])[1 + i % 11] || ' ' || (i % 50),
+    (ARRAY['San Francisco, CA', 'New York, NY', 'London, UK', 'Berlin, Germany', 'Paris, France',
+           'Toronto, Canada', 'Sydney, Australia', 'Remote'])[1 + (i / 7) % 8],
+    'Worked on ' || (ARRAY['payments', 'search ranking', 'kubernetes', 'recommendation systems',
+                           'data pipelines', 'mobile apps'])[1 + i % 6]
+        || ' using ' || (ARRAY['python', 'rust', 'go', 'typescript', 'java'])[1 + (i / 5) % 5]
+FROM generate_series(1, :rows) AS i
+"""
+
+INDEXES = [
+    f"CREATE INDEX ON {SCHEMA}.experiences USING gin (location gin_trgm_ops)",
+    f"CREATE INDEX ON {SCHEMA}.experiences USING gin (company_name gin_trgm_ops)",
+    f"CREATE INDEX ON {SCHEMA}.experiences USING gin (job_title gin_trgm_ops)",
+    f"CREATE INDEX ON {SCHEMA}.experiences USING gin (search_tsv)",
+    f"CREATE INDEX ON {SCHEMA}.experiences (user_id)",
+]
+
+# The shapes filter_structured generates, against the scratch table.
+QUERIES = {
+    "location ILIKE": f"SELECT DISTINCT user_id FROM {SCHEMA}.experiences WHERE location ILIKE '%berlin%'",
+    "company ILIKE (rare)": f"SELECT DISTINCT user_id FROM {SCHEMA}.experiences WHERE company_name ILIKE '%mistral 7%'",
+    "job_title ILIKE": f"SELECT DISTINCT user_id FROM {SCHEMA}.experiences WHERE job_title ILIKE '%machine learning%'",
+    "keywords tsquery": (
+        f"SELECT DISTINCT user_id FROM {SCHEMA}.experiences "
+        f"WHERE search_tsv @@ websearch_to_tsquery('simple'::regconfig, 'kubernetes rust')"
+    ),
+    "combined + ranked": (
+        f"SELECT user_id, max(word_similarity('engineer', job_title) "
+        f"+ ts_rank(search_tsv, websearch_to_tsquery('simple'::regconfig, 'payments'))) AS score "
+        f"FROM {SCHEMA}.experiences "
+        f"WHERE job_title ILIKE '%engineer%' AND location ILIKE '%london%' "
+        f"AND search_tsv @@ websearch_to_tsquery('simple'::regconfig, 'payments') "
+        f"GROUP BY user_id ORDER BY score DESC LIMIT 20"
+    ),
+}
+
+
+async def _execute(conn, sql: str, **params):
+    return await conn.execute(text(sql), params)
+
+
+async def _time_query(conn, sql: str) -> dict:
+    timings, plan_root = [], ""
+    for _ in range(RUNS):
+        result = await _execute(conn, f"EXPLAIN (ANALYZE, FORMAT JSON) {sql}")
+        plan = result.scalar()
+        plan = json.loads(plan) if isinstance(plan, str) else plan
+        timings.append(plan[0]["Execution Time"])
+        plan_root = _scan_types(plan[0]["Plan"])
+    timings.sort()
+    return { "ms": timings[len(timings) // 2], "scans": plan_root }
+
+
+def _scan_types(node: dict) -> str:
+    """The distinct scan node types in a plan, e.g. 'Bitmap Index Scan' vs 'Seq Scan'."""
+    found = []
+    stack = [node]
+    while stack:
+        current = stack.pop()
+        if re.search(r"Scan$", current.get("Node Type", "")) and current["Node Type"] not in found:
+            found.append(current["Node Type"])
+        stack.extend(current.get("Plans", []))
+    return ", ".join(found)
+
+
+async def _time_all(conn) -> dict:
+    return { name: await _time_query(conn, sql) for name, sql in QUERIES.items() }
+
+
+async def run(row_counts):
+    engine = get_async_engine()
+    async with engine.connect() as conn:
+        conn = await conn.execution_options(isolation_level="AUTOCOMMIT")
+        try:
+            for rows in row_counts:
+                for statement in SETUP:
+                    await _execute(conn, statement)
+                print(f"[BENCH] Generating {rows:,} experiences...")
+                await _execute(conn, POPULATE, rows=rows)
+                await _execute(conn, f"ANALYZE {SCHEMA}.experiences")
+                before = await _time_all(conn)
+
+                print(f"[BENCH] Building indexes...")
+                for statement in INDEXES:
+                    await _execute(conn, statement)
+                await _execute(conn, f"ANALYZE {SCHEMA}.experiences")
+                after = await _time_all(conn)
+
+                print(f"\n{rows:,} rows")
+                print(f"{'query':<22} {'no index (ms)':>14} {'indexed (ms)':>13} {'speedup':>8}  plan")
+                for name in QUERIES:
+                    speedup = before[name]["ms"] / after[name]["ms"] if after[name]["ms"] else float("inf")
+                    print(
+                        f"{name:<22} {before[name]['ms']:>14.1f} {after[name]['ms']:>13.1f} "
+                        f"{speedup:>7.1f}x  {before[name]['scans']} -> {after[name]['scans']}"
+                    )
+                print()
+        finally:
+            await _execute(conn, f"DROP SCHEMA IF EXISTS {SCHEMA} CASCADE")
+    await engine.dispose()
+
+
+if __name__ == "__main__":
+    counts = [int(arg) for arg in sys.argv[1:]] or DEFAULT_ROWS
+    asyncio.run(run(counts))
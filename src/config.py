@@ -31,6 +31,97 @@ class Config(BaseSettings):
 
     REDIS_URL: str
 
+    # Optional cache of deterministic LLM steps, keyed on (model, messages, params)
+    LLM_CACHE_ENABLED: bool = False
+    LLM_CACHE_TTL_SECONDS: int = 3600
+    LLM_CACHE_STAGES: str = "thought,action,format_users"
+
+    # Optional cache of whole first-turn agent runs, matched by query embedding
+    SEMANTIC_CACHE_ENABLED: bool = False
+    SEMANTIC_CACHE_THRESHOLD: float = 0.9
+    SEMANTIC_CACHE_TTL_SECONDS: int = 21600
+    SEMANTIC_CACHE_MAX_ENTRIES: int = 5000
+
+    # Coalescing of identical concurrent searches, in-process and across workers
+    SINGLE_FLIGHT_ENABLED: bool = True
+    SINGLE_FLIGHT_LOCK_TTL_SECONDS: int = 120
+    SINGLE_FLIGHT_WAIT_TIMEOUT_SECONDS: float = 30.0
+    SINGLE_FLIGHT_HEARTBEAT_SECONDS: float = 5.0
+
+    # Cross-session cache of vector/graph retrieval results, stamped with the index version
+    ACTION_CACHE_ENABLED: bool = True
+    ACTION_CACHE_TTL_SECONDS: int = 120
+
+    # Agent run loop
+    AGENT_ACTION_TIMEOUT_SECONDS: float = 30.0
+    AGENT_MAX_ITERATIONS: int = 8
+    AGENT_DEADLINE_SECONDS: float = 120.0
+    AGENT_TOKEN_BUDGET: int = 60000
+    AGENT_STAGE_TIMEOUTS: str = "thought:30,action:20,response:45,format_users:30"
+
+    # Speculative vector search on the raw query while the first thought streams
+    # (off until prefetch.used outweighs prefetch.wasted; the first search is usually a rewritten query)
+    PREFETCH_ENABLED: bool = False
+    PREFETCH_NAMESPACES: str = "experience"
+
+    # Stream an action's user cards as profile batches load, before its final users event
+    HYDRATION_INCREMENTAL: bool = False
+    HYDRATION_BATCH_SIZE: int = 5
+
+    # Rule/embedding router that answers simple lookups without the LLM loop
+    FAST_PATH_ENABLED: bool = True
+    FAST_PATH_FILTER_THRESHOLD: float = 0.6
+    FAST_PATH_VECTOR_THRESHOLD: float = 0.8
+    FAST_PATH_MAX_RESULTS: int = 20
+
+    # Per-stage models: "stage:model|fallback,...". OPENAI_MODEL is always the last fallback.
+    LLM_STAGE_MODELS: str = "thought:gpt-4o-mini,action:gpt-4o-mini,format_users:gpt-4o-mini"
+    LLM_ROUTING_POLICY: str = "ordered"  # "ordered" or "latency"
+    LLM_STAGE_LATENCY_BUDGETS_MS: str = "thought:6000,action:2000,format_users:3000"
+    LLM_MODEL_COOLDOWN_SECONDS: float = 30.0
+    LLM_LATENCY_WINDOW_SECONDS: float = 300.0
+
+    # Streaming call limits, retries and hedging
+    LLM_FIRST_TOKEN_TIMEOUT_SECONDS: float = 20.0
+    LLM_CHUNK_TIMEOUT_SECONDS: float = 10.0
+    LLM_MAX_RETRIES: int = 2
+    LLM_RETRY_BASE_DELAY_SECONDS: float = 0.5
+    LLM_HEDGE_ENABLED: bool = False
+
+    # Cluster-wide LLM rate limits and admission control for new runs
+    LLM_LIMIT_ENABLED: bool = True
+    LLM_LIMIT_REQUESTS_PER_MINUTE: int = 500
+    LLM_LIMIT_TOKENS_PER_MINUTE: int = 200000
+    LLM_LIMIT_COMPLETION_ESTIMATE: int = 500
+    LLM_ADMISSION_MAX_WAIT_SECONDS: float = 5.0
+
+    # In-process columnar index of experiences and skills for filter_structured
+    COLUMNAR_INDEX_ENABLED: bool = False
+    COLUMNAR_INDEX_REFRESH_SECONDS: float = 30.0
+    COLUMNAR_INDEX_REBUILD_SECONDS: float = 3600.0
+    COLUMNAR_INDEX_CHECK_RATE: float = 0.01  # Share of filters re-run through SQL to verify the index
+
+    # Canonical company/title/skill aliases for filter_structured (built by search.services.canonical)
+    CANONICAL_ALIASES_ENABLED: bool = True
+    CANONICAL_ALIASES_REFRESH_SECONDS: float = 300.0
+
+    # Profiles serialized to JSON by Postgres for replayed and final results
+    PROFILE_SQL_JSON_ENABLED: bool = False
+
+    # Precomputed profile_documents for primary-key profile reads (backfilled by search.services.profile_documents)
+    PROFILE_DOCUMENTS_ENABLED: bool = False
+    PROFILE_DOCUMENTS_REFRESH_SECONDS: float = 10.0
+
+    # Per-worker LRU of loaded profiles, invalidated across workers over Redis pub/sub
+    PROFILE_CACHE_ENABLED: bool = True
+    PROFILE_CACHE_MAX_ENTRIES: int = 5000
+    PROFILE_CACHE_TTL_SECONDS: float = 300.0
+    PROFILE_CACHE_WATCH_SECONDS: float = 2.0
+
+    # Profiles shared by all workers as msgpack blobs in Redis (only used with PROFILE_CACHE_ENABLED, whose watcher invalidates it)
+    SHARED_PROFILE_CACHE_ENABLED: bool = False
+    SHARED_PROFILE_CACHE_TTL_SECONDS: int = 3600
+
     model_config = {
         "env_file": ".env",
         "case_sensitive": True,
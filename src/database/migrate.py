@@ -0,0 +1,88 @@
+# src/database/migrate.py
+
+"""
+Applies the SQL files in database/migrations in filename order.
+
+Usage (from src/):
+    python -m database.migrate
+
+Applied versions are recorded in schema_migrations, so re-running is a no-op.
+Files are split into statements at each ';' that ends a line outside a
+dollar-quoted body ($$ ... $$ or $tag$ ... $tag$), and every statement is sent
+on its own through asyncpg in autocommit mode. Postgres runs a multi-statement
+string as one implicit transaction, which CREATE INDEX CONCURRENTLY refuses,
+so statements must not be batched.
+"""
+
+import re
+import asyncio
+from pathlib import Path
+from typing import List
+from sqlalchemy import text
+from database.client import get_async_engine
+
+MIGRATIONS_DIR = Path(__file__).parent / "migrations"
+
+_DOLLAR_QUOTE = re.compile(r"\$[A-Za-z_]*\$")
+_STATEMENT_END = re.compile(r";[ \t]*(?:--.*)?$")
+
+
+async def _applied_versions(conn) -> set:
+    await conn.execute(text("""
+        CREATE TABLE IF NOT EXISTS schema_migrations (
+            version TEXT PRIMARY KEY,
+            applied_at TIMESTAMPTZ NOT NULL DEFAULT now()
+        )
+    """))
+    result = await conn.execute(text("SELECT version FROM schema_migrations"))
+    return set(result.scalars().all())
+
+
+def _statements(sql: str) -> List[str]:
+    statements, lines = [], []
+    quote = None  # The dollar-quote tag of the body we are inside, if any
+
+    def flush():
+        body = [line for line in lines if line.strip() and not line.strip().startswith("--")]
+        if body:
+            statements.append("\n".join(lines).strip())
+        lines.clear()
+
+    for line in sql.splitlines():
+        lines.append(line)
+        for tag in _DOLLAR_QUOTE.findall(line):
+            if quote is None:
+                quote = tag
+            elif tag == quote:
+                quote = None
+        if quote is None and _STATEMENT_END.search(line):
+            flush()
+    flush()
+    return statements
+
+
+async def migrate():
+    engine = get_async_engine()
+    async with engine.connect() as conn:
+        conn = await conn.execution_options(isolation_level="AUTOCOMMIT")
+        applied = await _applied_versions(conn)
+
+        pending = [p for p in sorted(MIGRATIONS_DIR.glob("*.sql")) if p.stem not in applied]
+        if not pending:
+            print("[MIGRATE] Database is up to date.")
+            return
+
+        raw = await conn.get_raw_connection()
+        for path in pending:
+            print(f"[MIGRATE] Applying {path.name}")
+            for statement in _statements(path.read_text()):
+                await raw.driver_connection.execute(statement)
+            await conn.execute(
+                text("INSERT INTO schema_migrations (version) VALUES (:version)"),
+                { "version": path.stem }
+            )
+        print(f"[MIGRATE] Applied {len(pending)} migration(s).")
+
+
+if __name__ == "__main__":
+    asyncio.run(migrate())
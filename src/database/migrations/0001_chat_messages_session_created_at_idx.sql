@@ -0,0 +1,9 @@
+-- src/database/migrations/0001_chat_messages_session_created_at_idx.sql
+--
+-- Supports keyset pagination of GET /search/sessions/{session_id}:
+--   WHERE session_id = :session_id AND (created_at, id) > (:after_created_at, :after_id)
+--   ORDER BY created_at, id
+-- id is the trailing key so the tie-break on equal timestamps is served by the index too.
+
+CREATE INDEX CONCURRENTLY IF NOT EXISTS idx_chat_messages_session_created_at
+    ON chat_messages (session_id, created_at, id);
@@ -0,0 +1,41 @@
+-- src/database/migrations/0002_experiences_search_indexes.sql
+--
+-- Indexes behind search/services/search_index.py, used by filter_structured:
+--   * pg_trgm GIN indexes so ILIKE '%value%' on location, company_name and
+--     job_title is an index scan instead of a sequential scan of experiences.
+--   * search_tsv, a weighted tsvector over title (A), company (B), location (C)
+--     and description (D), with a GIN index, for the `keywords` filter and
+--     ts_rank ranking.
+--   * user_id indexes so the correlated EXISTS subqueries probe by user.
+--
+-- Adding the stored generated column rewrites experiences under an ACCESS
+-- EXCLUSIVE lock; run this migration outside peak hours. The indexes are built
+-- CONCURRENTLY and do not block writes.
+
+CREATE EXTENSION IF NOT EXISTS pg_trgm;
+
+ALTER TABLE experiences
+    ADD COLUMN IF NOT EXISTS search_tsv tsvector GENERATED ALWAYS AS (
+        setweight(to_tsvector('simple'::regconfig, coalesce(job_title, '')), 'A') ||
+        setweight(to_tsvector('simple'::regconfig, coalesce(company_name, '')), 'B') ||
+        setweight(to_tsvector('simple'::regconfig, coalesce(location, '')), 'C') ||
+        setweight(to_tsvector('simple'::regconfig, coalesce(experience_description, '')), 'D')
+    ) STORED;
+
+CREATE INDEX CONCURRENTLY IF NOT EXISTS idx_experiences_location_trgm
+    ON experiences USING gin (location gin_trgm_ops);
+
+CREATE INDEX CONCURRENTLY IF NOT EXISTS idx_experiences_company_name_trgm
+    ON experiences USING gin (company_name gin_trgm_ops);
+
+CREATE INDEX CONCURRENTLY IF NOT EXISTS idx_experiences_job_title_trgm
+    ON experiences USING gin (job_title gin_trgm_ops);
+
+CREATE INDEX CONCURRENTLY IF NOT EXISTS idx_experiences_search_tsv
+    ON experiences USING gin (search_tsv);
+
+CREATE INDEX CONCURRENTLY IF NOT EXISTS idx_experiences_user_id
+    ON experiences (user_id);
+
+CREATE INDEX CONCURRENTLY IF NOT EXISTS idx_skills_user_id_lower_name
+    ON skills (user_id, lower(skill_name));
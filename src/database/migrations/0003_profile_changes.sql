@@ -0,0 +1,58 @@
+-- src/database/migrations/0003_profile_changes.sql
+--
+-- Change log of profile writes, so in-process copies of profile data
+-- (search/services/columnar_index.py) can refresh only the users that changed.
+-- Every insert, update or delete on a profile table appends the affected
+-- user_id; readers keep the highest change_id they have applied.
+--
+-- change_id comes from a sequence, so a transaction can commit a lower id
+-- after a reader has already moved past it. Readers must periodically reload
+-- in full, which is also when old entries are pruned.
+
+CREATE TABLE IF NOT EXISTS profile_changes (
+    change_id BIGSERIAL PRIMARY KEY,
+    user_id TEXT NOT NULL,
+    table_name TEXT NOT NULL,
+    changed_at TIMESTAMPTZ NOT NULL DEFAULT now()
+);
+
+CREATE INDEX IF NOT EXISTS idx_profile_changes_changed_at
+    ON profile_changes (changed_at);
+
+CREATE OR REPLACE FUNCTION record_profile_change() RETURNS trigger
+LANGUAGE plpgsql AS $$
+BEGIN
+    IF TG_OP IN ('UPDATE', 'DELETE') THEN
+        INSERT INTO profile_changes (user_id, table_name) VALUES (OLD.user_id, TG_TABLE_NAME);
+    END IF;
+    IF TG_OP = 'INSERT' OR (TG_OP = 'UPDATE' AND NEW.user_id IS DISTINCT FROM OLD.user_id) THEN
+        INSERT INTO profile_changes (user_id, table_name) VALUES (NEW.user_id, TG_TABLE_NAME);
+    END IF;
+    RETURN NULL;
+END;
+$$;
+
+DROP TRIGGER IF EXISTS trg_users_profile_change ON users;
+CREATE TRIGGER trg_users_profile_change
+    AFTER INSERT OR UPDATE OR DELETE ON users
+    FOR EACH ROW EXECUTE FUNCTION record_profile_change();
+
+DROP TRIGGER IF EXISTS trg_experiences_profile_change ON experiences;
+CREATE TRIGGER trg_experiences_profile_change
+    AFTER INSERT OR UPDATE OR DELETE ON experiences
+    FOR EACH ROW EXECUTE FUNCTION record_profile_change();
+
+DROP TRIGGER IF EXISTS trg_educations_profile_change ON educations;
+CREATE TRIGGER trg_educations_profile_change
+    AFTER INSERT OR UPDATE OR DELETE ON educations
+    FOR EACH ROW EXECUTE FUNCTION record_profile_change();
+
+DROP TRIGGER IF EXISTS trg_projects_profile_change ON projects;
+CREATE TRIGGER trg_projects_profile_change
+    AFTER INSERT OR UPDATE OR DELETE ON projects
+    FOR EACH ROW EXECUTE FUNCTION record_profile_change();
+
+DROP TRIGGER IF EXISTS trg_skills_profile_change ON skills;
+CREATE TRIGGER trg_skills_profile_change
+    AFTER INSERT OR UPDATE OR DELETE ON skills
+    FOR EACH ROW EXECUTE FUNCTION record_profile_change();
@@ -0,0 +1,40 @@
+-- src/database/migrations/0004_canonical_entities.sql
+--
+-- Canonical companies, job titles and skills (search/services/canonical.py).
+-- canonical_entities holds one row per entity, keyed by its normalized form;
+-- entity_aliases maps every normalized spelling to its entity. Profile rows
+-- carry the entity ids, backfilled by `python -m search.services.canonical`,
+-- so filters compare integers instead of matching strings. Rows inserted since
+-- the last backfill have NULL ids and are matched on their raw strings; rows
+-- edited since get the same treatment from migration 0007.
+
+CREATE TABLE IF NOT EXISTS canonical_entities (
+    entity_id SERIAL PRIMARY KEY,
+    kind TEXT NOT NULL,
+    key TEXT NOT NULL,
+    name TEXT NOT NULL,
+    UNIQUE (kind, key)
+);
+
+CREATE TABLE IF NOT EXISTS entity_aliases (
+    kind TEXT NOT NULL,
+    alias TEXT NOT NULL,
+    entity_id INTEGER NOT NULL REFERENCES canonical_entities (entity_id) ON DELETE CASCADE,
+    PRIMARY KEY (kind, alias)
+);
+
+ALTER TABLE experiences
+    ADD COLUMN IF NOT EXISTS canonical_company_id INTEGER REFERENCES canonical_entities (entity_id) ON DELETE SET NULL,
+    ADD COLUMN IF NOT EXISTS canonical_title_id INTEGER REFERENCES canonical_entities (entity_id) ON DELETE SET NULL;
+
+ALTER TABLE skills
+    ADD COLUMN IF NOT EXISTS canonical_skill_id INTEGER REFERENCES canonical_entities (entity_id) ON DELETE SET NULL;
+
+CREATE INDEX CONCURRENTLY IF NOT EXISTS idx_experiences_canonical_company
+    ON experiences (canonical_company_id, user_id);
+
+CREATE INDEX CONCURRENTLY IF NOT EXISTS idx_experiences_canonical_title
+    ON experiences (canonical_title_id, user_id);
+
+CREATE INDEX CONCURRENTLY IF NOT EXISTS idx_skills_canonical_skill
+    ON skills (canonical_skill_id, user_id);
@@ -0,0 +1,22 @@
+-- src/database/migrations/0005_profile_documents.sql
+--
+-- One precomputed document per profile (search/services/profile_documents.py),
+-- so profile reads are a single primary-key lookup instead of five joined
+-- tables. `document` is the User.to_dict() shape; `llm_digest` is the
+-- User.for_llm() shape as JSON text, kept as text so its key order (and so the
+-- prompts built from it) matches the ORM path. `version` is the highest
+-- profile_changes.change_id the document reflects; a user with a newer change
+-- is stale until the refresher rebuilds the document.
+--
+-- Backfill with `python -m search.services.profile_documents` after migrating.
+
+CREATE TABLE IF NOT EXISTS profile_documents (
+    user_id TEXT PRIMARY KEY,
+    document JSONB NOT NULL,
+    llm_digest TEXT NOT NULL,
+    version BIGINT NOT NULL,
+    built_at TIMESTAMPTZ NOT NULL DEFAULT now()
+);
+
+CREATE INDEX IF NOT EXISTS idx_profile_changes_user_id_change_id
+    ON profile_changes (user_id, change_id);
@@ -0,0 +1,45 @@
+-- src/database/migrations/0006_profile_change_content_columns.sql
+--
+-- Restricts the profile_changes triggers (migration 0003) to updates of the
+-- columns that make up a profile. Updates of other columns, such as the
+-- canonical_*_id backfill of search/services/canonical.py (migration 0004) or
+-- users.hashed_password, no longer log a change, so they do not rebuild
+-- profile documents or invalidate profile caches. UPDATE OF also fires when a
+-- listed column is set to its current value, which the log tolerates.
+--
+-- One transaction, so no profile write goes unlogged between DROP and CREATE.
+
+BEGIN;
+
+DROP TRIGGER IF EXISTS trg_users_profile_change ON users;
+CREATE TRIGGER trg_users_profile_change
+    AFTER INSERT OR DELETE OR UPDATE OF user_id, first_name, last_name, email, pfp_url ON users
+    FOR EACH ROW EXECUTE FUNCTION record_profile_change();
+
+DROP TRIGGER IF EXISTS trg_experiences_profile_change ON experiences;
+CREATE TRIGGER trg_experiences_profile_change
+    AFTER INSERT OR DELETE OR UPDATE OF
+        experience_id, user_id, company_name, start_date, end_date, experience_description, job_title, location
+    ON experiences
+    FOR EACH ROW EXECUTE FUNCTION record_profile_change();
+
+DROP TRIGGER IF EXISTS trg_educations_profile_change ON educations;
+CREATE TRIGGER trg_educations_profile_change
+    AFTER INSERT OR DELETE OR UPDATE OF
+        education_id, user_id, institution_name, degree_type, degree_name, enrollment_date, graduation_date
+    ON educations
+    FOR EACH ROW EXECUTE FUNCTION record_profile_change();
+
+DROP TRIGGER IF EXISTS trg_projects_profile_change ON projects;
+CREATE TRIGGER trg_projects_profile_change
+    AFTER INSERT OR DELETE OR UPDATE OF
+        project_id, user_id, project_name, project_description, github_url, project_url, project_start_date, project_end_date
+    ON projects
+    FOR EACH ROW EXECUTE FUNCTION record_profile_change();
+
+DROP TRIGGER IF EXISTS trg_skills_profile_change ON skills;
+CREATE TRIGGER trg_skills_profile_change
+    AFTER INSERT OR DELETE OR UPDATE OF skill_id, user_id, skill_name ON skills
+    FOR EACH ROW EXECUTE FUNCTION record_profile_change();
+
+COMMIT;
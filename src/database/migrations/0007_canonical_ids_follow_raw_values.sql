@@ -0,0 +1,45 @@
+-- src/database/migrations/0007_canonical_ids_follow_raw_values.sql
+--
+-- Clears a row's canonical entity id (migration 0004) when an update changes
+-- the raw value it was derived from, unless the same update also sets the id.
+-- An experience edited from "Google" to "Meta" then falls back to matching on
+-- its raw string until the next backfill (search/services/canonical.py),
+-- instead of still carrying the google id. These are BEFORE triggers, so the
+-- cleared id is part of the same row update that the profile_changes
+-- triggers (migration 0006) log.
+
+CREATE OR REPLACE FUNCTION clear_experience_canonical_ids() RETURNS trigger
+LANGUAGE plpgsql AS $$
+BEGIN
+    IF NEW.company_name IS DISTINCT FROM OLD.company_name
+       AND NEW.canonical_company_id IS NOT DISTINCT FROM OLD.canonical_company_id THEN
+        NEW.canonical_company_id := NULL;
+    END IF;
+    IF NEW.job_title IS DISTINCT FROM OLD.job_title
+       AND NEW.canonical_title_id IS NOT DISTINCT FROM OLD.canonical_title_id THEN
+        NEW.canonical_title_id := NULL;
+    END IF;
+    RETURN NEW;
+END;
+$$;
+
+CREATE OR REPLACE FUNCTION clear_skill_canonical_id() RETURNS trigger
+LANGUAGE plpgsql AS $$
+BEGIN
+    IF NEW.skill_name IS DISTINCT FROM OLD.skill_name
+       AND NEW.canonical_skill_id IS NOT DISTINCT FROM OLD.canonical_skill_id THEN
+        NEW.canonical_skill_id := NULL;
+    END IF;
+    RETURN NEW;
+END;
+$$;
+
+DROP TRIGGER IF EXISTS trg_experiences_canonical_ids ON experiences;
+CREATE TRIGGER trg_experiences_canonical_ids
+    BEFORE UPDATE OF company_name, job_title ON experiences
+    FOR EACH ROW EXECUTE FUNCTION clear_experience_canonical_ids();
+
+DROP TRIGGER IF EXISTS trg_skills_canonical_id ON skills;
+CREATE TRIGGER trg_skills_canonical_id
+    BEFORE UPDATE OF skill_name ON skills
+    FOR EACH ROW EXECUTE FUNCTION clear_skill_canonical_id();
@@ -1,7 +1,8 @@
 # src/database/models.py
 
-from sqlalchemy.orm import sessionmaker, Session, relationship
-from sqlalchemy import Column, String, Date, ForeignKey
+from sqlalchemy.orm import sessionmaker, Session, relationship, deferred
+from sqlalchemy import Column, String, Date, Integer, ForeignKey, Computed
+from sqlalchemy.dialects.postgresql import TSVECTOR
 from sqlalchemy.ext.declarative import declarative_base
 
 Base = declarative_base()
@@ -129,6 +130,17 @@ class Experience(Base):
     experience_description = Column(String)
     job_title = Column(String)
     location = Column(String)
+    # Full-text search vector, generated by Postgres (see migration 0002). Deferred so profile loads skip it.
+    search_tsv = deferred(Column(TSVECTOR, Computed(
+        "setweight(to_tsvector('simple'::regconfig, coalesce(job_title, '')), 'A') || "
+        "setweight(to_tsvector('simple'::regconfig, coalesce(company_name, '')), 'B') || "
+        "setweight(to_tsvector('simple'::regconfig, coalesce(location, '')), 'C') || "
+        "setweight(to_tsvector('simple'::regconfig, coalesce(experience_description, '')), 'D')",
+        persisted=True
+    )))
+    # Canonical entity ids (see migrations 0004 and 0007), NULL for rows inserted or edited since the last canonicalization run.
+    canonical_company_id = Column(Integer, ForeignKey("canonical_entities.entity_id"))
+    canonical_title_id = Column(Integer, ForeignKey("canonical_entities.entity_id"))
     
     # Relationship
     user = relationship("User", back_populates="experiences")
@@ -163,6 +175,7 @@ class Skill(Base):
     skill_id = Column(String, primary_key=True)
     user_id = Column(String, ForeignKey("users.user_id"))
     skill_name = Column(String)
+    canonical_skill_id = Column(Integer, ForeignKey("canonical_entities.entity_id"))
     
     # Relationship
     user = relationship("User", back_populates="skills")
@@ -173,3 +186,18 @@ class Skill(Base):
             'user_id': self.user_id,
             'skill_name': self.skill_name
         }
+
+class CanonicalEntity(Base):
+    __tablename__ = "canonical_entities"
+
+    entity_id = Column(Integer, primary_key=True)
+    kind = Column(String, nullable=False)  # "company", "title" or "skill"
+    key = Column(String, nullable=False)  # Normalized form, unique per kind
+    name = Column(String, nullable=False)  # Most common original spelling
+
+class EntityAlias(Base):
+    __tablename__ = "entity_aliases"
+
+    kind = Column(String, primary_key=True)
+    alias = Column(String, primary_key=True)
+    entity_id = Column(Integer, ForeignKey("canonical_entities.entity_id"), nullable=False)
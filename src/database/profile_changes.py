@@ -0,0 +1,25 @@
+# src/database/profile_changes.py
+
+"""
+Retention of the profile_changes log (migrations 0003 and 0006).
+
+Each reader of the log prunes it with prune(), at most every
+PRUNE_INTERVAL_SECONDS: the profile cache watcher, the profile document
+refresher and the columnar index. The table therefore stays bounded whichever
+of them are enabled. A reader that falls more than CHANGE_RETENTION_HOURS
+behind must reload in full, which each of them already does periodically.
+"""
+
+from sqlalchemy import text
+from sqlalchemy.ext.asyncio import AsyncSession
+
+CHANGE_RETENTION_HOURS = 24
+PRUNE_INTERVAL_SECONDS = 3600.0
+
+_PRUNE = text("DELETE FROM profile_changes WHERE changed_at < now() - make_interval(hours => :hours)")
+
+
+async def prune(session: AsyncSession) -> int:
+    """Deletes changes older than the retention period and returns how many; the caller commits."""
+    result = await session.execute(_PRUNE, { "hours": CHANGE_RETENTION_HOURS })
+    return result.rowcount
@@ -0,0 +1,224 @@
+# src/database/read_models.py
+
+"""
+Read-only profile models for search results.
+
+Search loads hundreds of profiles per run only to turn them into to_dict() and
+for_llm() output, so it does not need ORM entities (identity map, instance
+state, lazy-load and attribute instrumentation). load_profiles() selects plain
+columns from the five profile tables and builds ProfileView objects: slotted,
+immutable, with nested rows as named tuples and both views computed once and
+cached. The views are identical to User.to_dict() and User.for_llm(), except
+that nested lists are ordered by primary key.
+
+Benchmark against the ORM path: python -m benchmarks.read_model_benchmark
+"""
+
+from datetime import date
+from typing import Any, Dict, List, NamedTuple, Optional, Union
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+from database.models import User, Project, Education, Experience, Skill
+
+
+def _iso(value: Optional[date]) -> Optional[str]:
+    return value.isoformat() if value else None
+
+
+class ProjectRow(NamedTuple):
+    project_id: str
+    user_id: str
+    project_name: Optional[str]
+    project_description: Optional[str]
+    github_url: Optional[str]
+    project_url: Optional[str]
+    project_start_date: Optional[date]
+    project_end_date: Optional[date]
+
+    def to_dict(self) -> Dict[str, Any]:
+        row = self._asdict()
+        row["project_start_date"] = _iso(self.project_start_date)
+        row["project_end_date"] = _iso(self.project_end_date)
+        return row
+
+
+class EducationRow(NamedTuple):
+    education_id: str
+    user_id: str
+    institution_name: Optional[str]
+    degree_type: Optional[str]
+    degree_name: Optional[str]
+    enrollment_date: Optional[date]
+    graduation_date: Optional[date]
+
+    def to_dict(self) -> Dict[str, Any]:
+        row = self._asdict()
+        row["enrollment_date"] = _iso(self.enrollment_date)
+        row["graduation_date"] = _iso(self.graduation_date)
+        return row
+
+    def education_description(self) -> str:
+        period = ""
+        if self.enrollment_date and self.graduation_date:
+            period = f"From {self.enrollment_date} to {self.graduation_date}"
+        return f"{self.degree_type} in {self.degree_name} at {self.institution_name}. {period}"
+
+
+class ExperienceRow(NamedTuple):
+    experience_id: str
+    user_id: str
+    company_name: Optional[str]
+    start_date: Optional[date]
+    end_date: Optional[date]
+    experience_description: Optional[str]
+    job_title: Optional[str]
+    location: Optional[str]
+
+    def to_dict(self) -> Dict[str, Any]:
+        row = self._asdict()
+        row["start_date"] = _iso(self.start_date)
+        row["end_date"] = _iso(self.end_date)
+        return row
+
+    def job_description(self) -> str:
+        base = f"{self.job_title} at {self.company_name}"
+        if not self.start_date:
+            return base
+        period = f"From {self.start_date} to {self.end_date if self.end_date else 'Present'}"
+        return f"{base}. {period}. Description: {self.experience_description}"
+
+
+class SkillRow(NamedTuple):
+    skill_id: str
+    user_id: str
+    skill_name: Optional[str]
+
+    def to_dict(self) -> Dict[str, Any]:
+        return self._asdict()
+
+
+class ProfileView:
+    """A user's profile as loaded for search; read-only, with cached to_dict() and for_llm()."""
+
+    __slots__ = (
+        "user_id", "first_name", "last_name", "email", "pfp_url",
+        "projects", "educations", "experiences", "skills", "_dict", "_llm"
+    )
+
+    def __init__(
+        self,
+        user_id: str,
+        first_name: Optional[str],
+        last_name: Optional[str],
+        email: Optional[str],
+        pfp_url: Optional[str],
+        projects: tuple = (),
+        educations: tuple = (),
+        experiences: tuple = (),
+        skills: tuple = ()
+    ):
+        values = (user_id, first_name, last_name, email, pfp_url, projects, educations, experiences, skills, None, None)
+        for name, value in zip(self.__slots__, values):
+            object.__setattr__(self, name, value)
+
+    def __setattr__(self, name, value):
+        raise AttributeError(f"{type(self).__name__} is read-only")
+
+    def __repr__(self) -> str:
+        return f"ProfileView(user_id={self.user_id!r})"
+
+    def to_dict(self) -> Dict[str, Any]:
+        if self._dict is None:
+            object.__setattr__(self, "_dict", {
+                'user_id': self.user_id,
+                'first_name': self.first_name,
+                'last_name': self.last_name,
+                'email': self.email,
+                'pfp_url': self.pfp_url,
+                'projects': [project.to_dict() for project in self.projects],
+                'educations': [education.to_dict() for education in self.educations],
+                'experiences': [experience.to_dict() for experience in self.experiences],
+                'skills': [skill.to_dict() for skill in self.skills]
+            })
+        return self._dict
+
+    def for_llm(self) -> Dict[str, Any]:
+        if self._llm is None:
+            object.__setattr__(self, "_llm", {
+                'user_id': self.user_id,
+                'name': f'{self.first_name} {self.last_name}',
+                'contact': self.email,
+                'projects': [
+                    {
+                        'project_id': proj.project_id,
+                        'project_name': proj.project_name,
+                        'project_description': proj.project_description
+                    } for proj in self.projects
+                ],
+                'experiences': [exp.job_description() for exp in self.experiences],
+                'educations': [edu.education_description() for edu in self.educations],
+                'skills': [skill.skill_name for skill in self.skills]
+            })
+        return self._llm
+
+
+class ProfileDocument:
+    """A profile read from profile_documents (search/services/profile_documents.py), already in both views."""
+
+    __slots__ = ("user_id", "document", "llm_digest")
+
+    def __init__(self, user_id: str, document: Dict[str, Any], llm_digest: Dict[str, Any]):
+        object.__setattr__(self, "user_id", user_id)
+        object.__setattr__(self, "document", document)
+        object.__setattr__(self, "llm_digest", llm_digest)
+
+    def __setattr__(self, name, value):
+        raise AttributeError(f"{type(self).__name__} is read-only")
+
+    def to_dict(self) -> Dict[str, Any]:
+        return self.document
+
+    def for_llm(self) -> Dict[str, Any]:
+        return self.llm_digest
+
+
+# What search code holds for a profile: either read model serves both views.
+Profile = Union[ProfileView, ProfileDocument]
+
+
+# (model, row type, primary key) for each nested list of a profile.
+_CHILDREN = {
+    "projects": (Project, ProjectRow, Project.project_id),
+    "educations": (Education, EducationRow, Education.education_id),
+    "experiences": (Experience, ExperienceRow, Experience.experience_id),
+    "skills": (Skill, SkillRow, Skill.skill_id),
+}
+_USER_COLUMNS = (User.user_id, User.first_name, User.last_name, User.email, User.pfp_url)
+
+
+async def load_profiles(session: AsyncSession, user_ids: List[str]) -> Dict[str, ProfileView]:
+    """Profiles of the given users, in `user_ids` order, skipping unknown ids. Five plain selects, no ORM entities."""
+    ids = list(dict.fromkeys(user_ids))
+    if not ids:
+        return {}
+    users = (await session.execute(select(*_USER_COLUMNS).where(User.user_id.in_(ids)))).all()
+    if not users:
+        return {}
+    found = [user.user_id for user in users]
+
+    children: Dict[str, Dict[str, List]] = {}
+    for name, (model, row_type, primary_key) in _CHILDREN.items():
+        columns = [getattr(model, field) for field in row_type._fields]
+        rows = await session.execute(select(*columns).where(model.user_id.in_(found)).order_by(primary_key))
+        grouped = children[name] = {}
+        for row in rows.tuples():
+            grouped.setdefault(row[1], []).append(row_type._make(row))
+
+    profiles = {
+        user.user_id: ProfileView(
+            *user,
+            **{ name: tuple(grouped.get(user.user_id, ())) for name, grouped in children.items() }
+        )
+        for user in users
+    }
+    return { user_id: profiles[user_id] for user_id in ids if user_id in profiles }
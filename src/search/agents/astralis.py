@@ -3,20 +3,62 @@
 import re
 import json
 import asyncio
+import hashlib
+import time
+import contextvars
 from uuid import UUID
 import redis.asyncio as redis
 from openai import AsyncOpenAI
 from fastapi import HTTPException
 from search.services.rag_service import RAGService
 from search.services.prompt_manager import PromptManager
-from typing import List, Dict, Any, AsyncGenerator
+from search.services.llm_cache import LLMResponseCache
+from search.services.semantic_cache import SemanticQueryCache
+from search.services.single_flight import SingleFlight
+from search.services.action_cache import ActionResultCache
+from search.services.query_router import QueryRouter
+from search.services.model_router import ModelRouter
+from search.services.llm_client import LLMClient, LLMError
+from search.services.llm_limiter import PRIORITY_INTERACTIVE
+from search.services.metrics import metrics
+from search.services.search_index import experience_rank
+from search.services.filter_compiler import compile_filters, rank_filters
+from search.services.columnar_index import ColumnarIndex
+from search.services.canonical import AliasMap
+from search.services.profile_json import ProfileJSONLoader, LLM
+from search.services.profile_documents import ProfileDocumentStore
+from search.services.profile_cache import ProfileCache
+from search.services.shared_profile_cache import SharedProfileCache
+from search.services.run_scheduler import RunScheduler, StageTimeout
+from search.config import agent_config, prefetch_config, fast_path_config, hydration_config
+from typing import List, Dict, Any, AsyncGenerator, Tuple
 from sqlalchemy import select, and_, or_, func, text, inspect 
 from sqlalchemy.orm import selectinload, aliased
 from database.models import User, Experience, Skill
+from database.read_models import Profile, ProfileView, load_profiles
 from sqlalchemy.ext.asyncio import async_sessionmaker, AsyncSession
 
 
 SESSION_EXPIRATION_SECONDS = 3600
+MEMORY_KEY = "session:{session_id}:memory"
+OUTCOME_EVENT = "_outcome"
+MEMOIZED_ACTIONS = { "query_graph", "search_rag_service", "fetch_profile", "filter_structured" }
+CONTROL_ACTIONS = { "finish", "request_clarification" }
+PARTIAL_USERS_EVENT = "users_partial"
+
+# Set for an action run by _execute_action_incremental: _fetch_users puts each
+# batch of loaded profiles on it. A context variable, so only the action's own
+# tasks (and the memo tasks it starts) report to it, not concurrent prefetches.
+_hydration_queue: contextvars.ContextVar[asyncio.Queue | None] = contextvars.ContextVar("hydration_queue", default=None)
+
+# Placeholders each template in search/prompts.yaml must expose, checked when
+# the template registry loads or hot-reloads the file.
+PROMPT_PLACEHOLDERS = {
+    "THOUGHT_PROMPT": ["query", "observation_history"],
+    "ACTION_PROMPT": ["thought", "iteration", "max_steps"],
+    "RESPONSE_PROMPT": ["query", "observation_history"],
+    "FORMAT_USERS_PROMPT": ["observation_history"],
+}
 
 class Astralis:
     """
@@ -29,7 +71,21 @@ class Astralis:
         psql_db: async_sessionmaker[AsyncSession],
         rag_service: RAGService,
         prompt_manager: PromptManager,
-        redis_client: redis.Redis
+        redis_client: redis.Redis,
+        llm_cache: LLMResponseCache | None = None,
+        semantic_cache: SemanticQueryCache | None = None,
+        single_flight: SingleFlight | None = None,
+        action_cache: ActionResultCache | None = None,
+        query_router: QueryRouter | None = None,
+        model_router: ModelRouter | None = None,
+        llm: LLMClient | None = None,
+        priority: int = PRIORITY_INTERACTIVE,
+        columnar_index: ColumnarIndex | None = None,
+        aliases: AliasMap | None = None,
+        profile_json: ProfileJSONLoader | None = None,
+        profile_documents: ProfileDocumentStore | None = None,
+        profile_cache: ProfileCache | None = None,
+        shared_profile_cache: SharedProfileCache | None = None
     ):
         self.model = model
         self.client = client
@@ -37,6 +93,20 @@ class Astralis:
         self.rag_service = rag_service
         self.prompt_manager = prompt_manager
         self.redis_client = redis_client
+        self.llm_cache = llm_cache
+        self.semantic_cache = semantic_cache
+        self.single_flight = single_flight
+        self.action_cache = action_cache
+        self.query_router = query_router
+        self.model_router = model_router
+        self.llm = llm or LLMClient(client)
+        self.priority = priority
+        self.columnar_index = columnar_index
+        self.aliases = aliases
+        self.profile_json = profile_json
+        self.profile_documents = profile_documents
+        self.profile_cache = profile_cache
+        self.shared_profile_cache = shared_profile_cache
 
     """
     Core Functions
@@ -48,6 +118,9 @@ class Astralis:
         """
         self.context: Dict[str, Any] = {}
         self.context["conversation"] = await self._load_history(session_id)
+        self.context["scores"] = {}
+        self.context["profiles"] = {}  # user_id -> Profile loaded by this run's actions
+        self.context["memory"] = await self._load_memory(session_id)
         self.context["user_query"] = user_query
         user_msg = { "role": "user", "content": user_query }
         await self._save_message(session_id, user_msg)
@@ -58,61 +131,189 @@ class Astralis:
         print(f"[RUN START]: Session {session_id}, Query: '{user_query}', History Len: {len(self.context['conversation'])}")
         yield { "type": "start", "message": "Starting to process your query", "session_id": str(session_id) }
 
+        # Only first-turn runs are cached or shared: later turns depend on the conversation.
+        first_turn = not self.context["conversation"] and not self.context["memory"]
+        if self.query_router and first_turn:
+            try:
+                decision = await self.query_router.route(user_query)
+            except Exception as e:
+                print(f"[WARN] Query routing failed, running the agent: {e}")
+                metrics.incr("fast_path.error")
+                decision = None
+            if decision:
+                served = False
+                try:
+                    async for event in self._run_fast_path(session_id, decision):
+                        served = True
+                        yield event
+                except Exception as e:
+                    print(f"[ERROR] Fast path failed for session {session_id}: {e}")
+                    metrics.incr("fast_path.error")
+                    if served:
+                        # Its events already reached the client; the agent cannot start over.
+                        yield { "type": "error", "message": f"An unexpected error occurred during processing: {e}" }
+                        yield { "type": "end", "message": "Task ended due to an error." }
+                        return
+                if served:
+                    print(f"[RUN END]: Served session {session_id} from the {decision['route']} fast path.")
+                    return
+        if self.semantic_cache and first_turn:
+            cached_run = None
+            try:
+                self.context["semantic_embedding"] = await self.semantic_cache.embed(user_query)
+                cached_run = await self.semantic_cache.lookup(self.context["semantic_embedding"])
+            except Exception as e:
+                print(f"[WARN] Semantic cache unavailable, running the agent: {e}")
+                metrics.incr("semantic_cache.error")
+            if cached_run:
+                replayed = False
+                try:
+                    async for event in self._replay_cached_run(session_id, cached_run):
+                        replayed = True
+                        yield event
+                    print(f"[RUN END]: Served session {session_id} from the semantic cache.")
+                    return
+                except Exception as e:
+                    print(f"[ERROR] Semantic cache replay failed for session {session_id}: {e}")
+                    metrics.incr("semantic_cache.error")
+                    if replayed:
+                        # Its events already reached the client; the agent cannot start over.
+                        yield { "type": "error", "message": f"An unexpected error occurred during processing: {e}" }
+                        yield { "type": "end", "message": "Task ended due to an error." }
+                        return
+
+        try:
+            if self.single_flight and first_turn:
+                events = self.single_flight.stream(self._run_key(user_query), self._run_events)
+            else:
+                events = self._run_events()
+
+            async for event in events:
+                if event["type"] == OUTCOME_EVENT:
+                    await self._apply_outcome(session_id, event)
+                    continue
+                yield event
+
+        except Exception as e:
+            print(f"[ERROR] Unhandled exception in agent run loop for session {session_id}: {e}")
+            import traceback
+            traceback.print_exc()
+            yield { "type": "error", "message": f"An unexpected error occurred during processing: {e}" }
+            yield { "type": "end", "message": "Task ended due to an error." }
+            # if 'memory' in self.context:
+            #     await self._save_session(session_id)
+                 # await self._save_history(session_id, self.context['memory'])
+
+        finally:
+            print(f"[RUN END]: Session {session_id} processing finished.")
+
+
+    async def _run_events(self) -> AsyncGenerator[Dict[str, Any], None]:
+        """
+        The ReAct loop. Yields client events, and ends with an internal
+        OUTCOME_EVENT that run() turns into session side effects, so the same
+        stream can be shared with concurrent identical runs.
+        """
+        self.context["scheduler"] = RunScheduler(
+            max_iterations=agent_config.MAX_ITERATIONS,
+            deadline_seconds=agent_config.DEADLINE_SECONDS,
+            token_budget=agent_config.TOKEN_BUDGET,
+            stage_timeouts=agent_config.STAGE_TIMEOUTS
+        )
+        self._start_prefetch()
         try:
-            while True:
-                # --- Thought Generation ---
-                thought = ""
-                async for thought_chunk in self._generate_thought():
+            async for event in self._react_loop():
+                yield event
+        finally:
+            self._settle_prefetch()
+
+
+    async def _react_loop(self) -> AsyncGenerator[Dict[str, Any], None]:
+        scheduler: RunScheduler = self.context["scheduler"]
+        while True:
+            # --- Budget Check ---
+            stop_reason = scheduler.exhausted()
+            if stop_reason:
+                async for event in self._finalize_early(stop_reason):
+                    yield event
+                return
+            scheduler.next_iteration()
+            # --- End Budget Check ---
+
+            # --- Thought Generation ---
+            thought = ""
+            try:
+                async for thought_chunk in scheduler.stream("thought", self._generate_thought()):
                     thought += thought_chunk
                     yield { "type": "thought", "message": thought_chunk }
-                print(f"[THOUGHT]: {thought}")
-                # --- End Thought Generation ---
-
-                # --- Action Determination ---
-                yield { "type": "status", "message": "Determining next action" }
-                raw_action = ""
-                async for raw_chunk in self._determine_action(thought):
+            except StageTimeout as e:
+                print(f"[WARN] {e}")
+                scheduler.stop(f"timed out in the {e.stage} stage")
+                continue
+            except LLMError as e:
+                print(f"[ERROR] {e}")
+                yield { "type": "error", "message": "The language model is unavailable, stopping the search." }
+                scheduler.stop("could not reach the language model")
+                continue
+            print(f"[THOUGHT]: {thought}")
+            # --- End Thought Generation ---
+
+            # --- Action Determination ---
+            yield { "type": "status", "message": "Determining next action" }
+            raw_action = ""
+            try:
+                async for raw_chunk in scheduler.stream("action", self._determine_action(thought)):
                     raw_action += raw_chunk
-                closed_raw_action = self._ensure_closing_tags(raw_action, "action")
-                closed_raw_action = self._ensure_closing_tags(closed_raw_action, "input")
-                action_raw = self._extract_xml(closed_raw_action, "action").strip()
-                action = action_raw.strip('[]').strip()
-                input_text = self._extract_xml(closed_raw_action, "input").strip()
-                yield { "type": "action", "message": action }
-                print(f"[ACTION]: {action}")
-                print(f"[INPUTS]: {input_text}")
-
-                # Parse action inputs carefully
-                action_inputs: Dict[str, Any] = {}
-                if action not in ["finish"] and input_text:
-                    try:
-                        action_inputs = json.loads(input_text)
-                        print(f"Action inputs parsed: {action_inputs}")
-                    except json.JSONDecodeError:
-                        print(f"[ERROR]: Failed to parse action input JSON: {input_text}")
-                        # Decide how to handle bad input format from LLM
-                        # Option 1: Ask for clarification about the format?
-                        # Option 2: Try to finish gracefully?
-                        # Option 3: Raise an internal error?
-                        # For now, let's yield an error and force finish
-                        yield { "type": "error", "message": f"Invalid action input format received: {input_text}" }
-                        action = "finish"
-                        action_inputs = {}
-                # --- End Action Determination ---
-
-                yield { "type": "status", "message": f"Executing action: {action}" }
-
-                # --- Action Execution ---
-                result_users: List[User] = []
-                # Reset clarification flag before executing action
-                self.context['needs_clarification'] = False
-                self.context['clarification_question'] = None
-
+            except StageTimeout as e:
+                print(f"[WARN] {e}")
+                scheduler.stop(f"timed out in the {e.stage} stage")
+                continue
+            except LLMError as e:
+                print(f"[ERROR] {e}")
+                yield { "type": "error", "message": "The language model is unavailable, stopping the search." }
+                scheduler.stop("could not reach the language model")
+                continue
+            actions, parse_error = self._parse_actions(raw_action)
+            if parse_error:
+                # For now, let's yield an error and force finish
+                yield { "type": "error", "message": parse_error }
+            action = ", ".join(name for name, _ in actions)
+            yield { "type": "action", "message": action }
+            print(f"[ACTION]: {action}")
+            # --- End Action Determination ---
+
+            yield { "type": "status", "message": f"Executing action: {action}" }
+
+            # --- Action Execution ---
+            result_users: List[Profile] = []
+            # Reset clarification flag before executing action
+            self.context['needs_clarification'] = False
+            self.context['clarification_question'] = None
+
+            if len(actions) > 1:
+                # Independent actions from one step run concurrently, merged into one observation.
+                result_users, action_inputs, failures = await self._execute_actions(actions)
+                action = "parallel"
+                for failure in failures:
+                    yield { "type": "error", "message": f"Action failed: {failure}" }
+                if result_users:
+                    yield { "type": "users", "message": [res.to_dict() for res in result_users] }
+                print(f"[RESULT]: Found {len(result_users)} users across {len(actions)} actions.")
+            else:
+                action, action_inputs = actions[0]
                 if action != "finish":
+                    streamed = shown = False
                     try:
-                        result_users = await self._execute_action(action, action_inputs)
+                        if hydration_config.INCREMENTAL:
+                            result_users = []
+                            async for cards in self._execute_action_incremental(action, action_inputs, result_users):
+                                streamed = True
+                                yield { "type": PARTIAL_USERS_EVENT, "message": cards }
+                        else:
+                            result_users = await self._execute_action_bounded(action, action_inputs)
                         if result_users and not self.context.get('needs_clarification'):
                             yield { "type": "users", "message": [res.to_dict() for res in result_users] }
+                            shown = True
                         print(f"[RESULT]: Found {len(result_users)} users.")
                     except HTTPException as e:
                         print(f"[ERROR] HTTP Exception during action execution: {e.detail}")
@@ -120,119 +321,241 @@ class Astralis:
                         result_users = [] # Ensure result is empty on error
                     except Exception as e:
                         print(f"[ERROR] Unexpected Exception during action execution: {e}")
-                        yield { "type": "error", "message": f"An unexpected error occurred: {e}" }
+                        yield { "type": "error", "message": f"An unexpected error occurred: {self._describe_error(e)}" }
                         result_users = []
-                # --- End Action Execution ---
-
-                # --- Handle Clarification Request ---
-                # Check if the action execution decided clarification is needed
-                if self.context.get('needs_clarification'):
-                    question = self.context.get('clarification_question', "Could you please provide more details?")
-                    print(f"[CLARIFICATION]: Asking user: '{question}'")
-                    yield {
-                        "type": "clarification_request",
-                        "message": question
-                    }
-                    # Append the clarification attempt to history *before* saving and returning
-                    # Ensure action_inputs contains the question dict if parsed, otherwise use default
-                    clarification_input = action_inputs if action == "request_clarification" else {"question": question}
-                    self.context.setdefault('memory', []).append({
-                        "thought": thought,
-                        "action": "request_clarification",
-                        "action_input": clarification_input,
-                        "result": []
-                    })
-                    # await self._save_history(session_id, self.context['memory'])
-                    yield { "type": "end", "message": "Waiting for user clarification." }
-                    print(f"[RUN END]: Paused for clarification in session {session_id}.")
-                    return
-                # --- End Handle Clarification Request ---
-
-                # --- History Update (only if not clarification) ---
-                # Prepare result for history (use for_llm format)
-                history_result = [res.for_llm() for res in result_users] if result_users else []
+                    if streamed and not shown:
+                        # The users event settles what the partial cards showed: here, nothing.
+                        yield { "type": "users", "message": [] }
+            # --- End Action Execution ---
+
+            # --- Handle Clarification Request ---
+            # Check if the action execution decided clarification is needed
+            if self.context.get('needs_clarification'):
+                question = self.context.get('clarification_question', "Could you please provide more details?")
+                print(f"[CLARIFICATION]: Asking user: '{question}'")
+                yield {
+                    "type": "clarification_request",
+                    "message": question
+                }
+                # Append the clarification attempt to history *before* saving and returning
+                # Ensure action_inputs contains the question dict if parsed, otherwise use default
+                clarification_input = action_inputs if action == "request_clarification" else {"question": question}
                 self.context.setdefault('memory', []).append({
                     "thought": thought,
-                    "action": action,
-                    "action_input": action_inputs,
-                    "result": history_result
+                    "action": "request_clarification",
+                    "action_input": clarification_input,
+                    "result": [],
+                    "result_refs": []
                 })
-                # --- End History Update ---
+                yield { "type": "end", "message": "Waiting for user clarification." }
+                yield { "type": OUTCOME_EVENT, "outcome": "clarification", "memory": self._compact_memory() }
+                return
+            # --- End Handle Clarification Request ---
+
+            # --- History Update (only if not clarification) ---
+            # Prepare result for history (use for_llm format)
+            history_result = [res.for_llm() for res in result_users] if result_users else []
+            self.context.setdefault('memory', []).append({
+                "thought": thought,
+                "action": action,
+                "action_input": action_inputs,
+                "result": history_result,
+                "result_refs": self._result_refs(result_users)
+            })
+            # --- End History Update ---
+
+            yield { "type": "budget", "message": scheduler.snapshot() }
+
+            # --- Completion Check ---
+            # Check if the *last appended action* was 'finish'
+            if self._is_task_complete():
+                async for event in self._finalize():
+                    yield event
+                return
+            # --- End Completion Check ---
+
+            # Loop continues if not finished and no clarification needed
+
+
+    async def _finalize_early(self, reason: str) -> AsyncGenerator[Dict[str, Any], None]:
+        """Ends a run that hit a scheduler limit, answering from the results found so far."""
+        print(f"[BUDGET]: Stopping early, {reason}")
+        metrics.incr("run.stopped_early")
+        yield { "type": "status", "message": f"Stopping the search early ({reason}), summarizing the best results found so far" }
+        self.context.setdefault('memory', []).append({
+            "thought": f"The search was stopped because it {reason}. Answer with the best results found so far.",
+            "action": "finish",
+            "action_input": {},
+            "result": [],
+            "result_refs": []
+        })
+        yield { "type": "budget", "message": self.context["scheduler"].snapshot() }
+        async for event in self._finalize():
+            yield event
+
+
+    async def _finalize(self) -> AsyncGenerator[Dict[str, Any], None]:
+        scheduler: RunScheduler = self.context["scheduler"]
+        final_response_content = ""
+        #
+        # async for item in self.stream_response_and_users_parallel():
+        #     yield item
 
-                # --- Completion Check ---
-                # Check if the *last appended action* was 'finish'
-                if self._is_task_complete():
-                    final_response_content = ""
-                    #
-                    # async for item in self.stream_response_and_users_parallel():
-                    #     yield item
 
-            
-                    async for final_chunk in self._generate_final_response():
-                        final_response_content += final_chunk
-                        yield { "type": "response", "message": final_chunk }
+        try:
+            async for final_chunk in scheduler.stream("response", self._generate_final_response()):
+                final_response_content += final_chunk
+                yield { "type": "response", "message": final_chunk }
+        except StageTimeout as e:
+            print(f"[WARN] {e}")
+            yield { "type": "error", "message": "The response was cut short because it took too long." }
+        except LLMError as e:
+            print(f"[ERROR] {e}")
+            yield { "type": "error", "message": "The response could not be completed because the language model is unavailable." }
+
+        final_user_ids = []
+        try:
+            async for user_id, user in scheduler.stream("format_users", self._generate_final_users(final_response_content)):
+                final_user_ids.append(user_id)
+                yield { "type": "users_found", "message": user }
+        except StageTimeout as e:
+            print(f"[WARN] {e}")
+            yield { "type": "error", "message": "Listing the matching profiles took too long." }
+        except LLMError as e:
+            print(f"[ERROR] {e}")
+            yield { "type": "error", "message": "The matching profiles could not be listed because the language model is unavailable." }
+
+
+
+        # print(f"[FINAL USERS]: {final_users}")
+        print(f"[RESPONSE]: Final response generated.")
+        print(f"[RESPONSE CONTENT]: {final_response_content}")
+
+        print(f"[BUDGET]: {scheduler.snapshot()}")
+        yield { "type": "end", "message": "Task completed successfully." }
+        # await self._save_history(session_id, self.context['memory'])
+
+        # final_users_str = json.dumps(final_users)
+        #
+        # final_response_content += f"""\n
+        # <full profiles> 
+        # {final_users_str}
+        # </full profiles>
+        # """
+
+        semantic_embedding = self.context.get("semantic_embedding")
+        # Runs cut short by the scheduler are not worth replaying to other users.
+        if semantic_embedding is not None and final_user_ids and scheduler.stop_reason is None:
+            await self.semantic_cache.store(
+                self.context.get("user_query", ""),
+                semantic_embedding,
+                final_response_content,
+                final_user_ids
+            )
+
+        yield { "type": OUTCOME_EVENT, "outcome": "finished", "final_response": final_response_content }
 
-                    final_users = []
-                    async for user in self._generate_final_users(final_response_content):
-                        final_users.append(user)
-                        yield { "type": "users_found", "message": user }
 
+    async def _apply_outcome(self, session_id: UUID, outcome: Dict[str, Any]):
+        if outcome["outcome"] == "clarification":
+            await self._save_memory(session_id, outcome["memory"])
+            print(f"[RUN END]: Paused for clarification in session {session_id}.")
+        elif outcome["outcome"] == "finished":
+            astralis_msg = { "role": "assistant", "content": outcome["final_response"] }
+            await self._save_message(session_id, astralis_msg)
+            await self._clear_memory(session_id)
 
 
-                    # print(f"[FINAL USERS]: {final_users}")
-                    print(f"[RESPONSE]: Final response generated.")
-                    print(f"[RESPONSE CONTENT]: {final_response_content}")
+    def _run_key(self, user_query: str) -> str:
+        normalized = " ".join(user_query.lower().split())
+        return "run:" + hashlib.sha256(normalized.encode()).hexdigest()
 
-                    yield { "type": "end", "message": "Task completed successfully." }
-                    # await self._save_history(session_id, self.context['memory'])
 
-                    # final_users_str = json.dumps(final_users)
-                    #
-                    # final_response_content += f"""\n
-                    # <full profiles> 
-                    # {final_users_str}
-                    # </full profiles>
-                    # """
+    async def _replay_cached_run(self, session_id: UUID, cached_run: Dict[str, Any]):
+        """
+        Replays a semantically matching earlier run: its final response, and its
+        ranked users re-hydrated from current profile data.
+        """
+        yield { "type": "status", "message": "Found results for a similar recent search" }
+        response = cached_run["response"]
+        yield { "type": "response", "message": response }
 
-                    astralis_msg = { "role": "assistant", "content": final_response_content }
-                    await self._save_message(session_id, astralis_msg)
+        ranked_ids = cached_run.get("user_ids", [])
+        if self.profile_json:
+            profiles = await self.profile_json.load(ranked_ids)
+        else:
+            profiles = { user.user_id: user.to_dict() for user in await self._fetch_users(ranked_ids) }
+        for user_id in ranked_ids:
+            if user_id in profiles:
+                yield { "type": "users_found", "message": profiles[user_id] }
 
-                    return 
-                # --- End Completion Check ---
+        await self._save_message(session_id, { "role": "assistant", "content": response })
+        yield { "type": "end", "message": "Task completed successfully." }
 
-                # Loop continues if not finished and no clarification needed
 
+    async def _run_fast_path(self, session_id: UUID, decision: Dict[str, Any]):
+        """
+        Answers a routed query straight from the retrieval layer, without LLM
+        calls. Yields nothing when the retrieval finds no one, so the caller
+        falls back to the agent, which can broaden the search.
+        """
+        try:
+            if decision["route"] == "filter":
+                users = await self._structured_search(decision["filters"], fast_path_config.MAX_RESULTS)
+                described = ", ".join(f"{field.replace('_', ' ')} '{value}'" for field, value in decision["filters"].items())
+            else:
+                users = await self._dispatch_action(
+                    "search_rag_service",
+                    "search_rag_service",
+                    { "query": decision["query"], "namespace": decision["namespace"] }
+                )
+                scores = self.context["scores"]
+                users.sort(key=lambda user: scores.get(user.user_id, 0.0), reverse=True)
+                users = users[:fast_path_config.MAX_RESULTS]
+                described = f"'{decision['query']}'"
         except Exception as e:
-            print(f"[ERROR] Unhandled exception in agent run loop for session {session_id}: {e}")
-            import traceback
-            traceback.print_exc()
-            yield { "type": "error", "message": f"An unexpected error occurred during processing: {e}" }
-            yield { "type": "end", "message": "Task ended due to an error." }
-            # if 'memory' in self.context:
-            #     await self._save_session(session_id)
-                 # await self._save_history(session_id, self.context['memory'])
+            print(f"[WARN] Fast path failed, falling back to the agent: {e}")
+            metrics.incr("fast_path.error")
+            return
 
-        finally:
-            print(f"[RUN END]: Session {session_id} processing finished.")
+        if not users:
+            print(f"[ROUTER]: Fast path found no one for {decision}, falling back to the agent")
+            metrics.incr("fast_path.empty")
+            return
+
+        metrics.incr("fast_path.served")
+        response = f"Found {len(users)} {'person' if len(users) == 1 else 'people'} matching {described}."
+        yield { "type": "status", "message": "Matched a direct search" }
+        yield { "type": "response", "message": response }
+        for user in users:
+            yield { "type": "users_found", "message": user.to_dict() }
+
+        await self._save_message(session_id, { "role": "assistant", "content": response })
+        yield { "type": "end", "message": "Task completed successfully." }
 
 
     async def _generate_thought(self):
         memory = self.context.get('memory', [])
         formatted_hist = self._formatted_history(memory)
 
-        THOUGHT_PROMPT = self.prompt_manager.get_prompt(
+        THOUGHT_PROMPT = self.prompt_manager.get_messages(
             "THOUGHT_PROMPT",
             query=self.context.get('user_query', ''),
             observation_history=formatted_hist
         )
-        async for chunk in self._llm_call(user_prompt=THOUGHT_PROMPT):
+        async for chunk in self._llm_call(messages=THOUGHT_PROMPT, stage="thought"):
             yield chunk
 
 
     async def _determine_action(self, thought):
         iteration = len(self.context.get('memory', []))
-        ACTION_PROMPT = self.prompt_manager.get_prompt("ACTION_PROMPT", thought=thought, iteration=iteration)
-        async for chunk in self._llm_call(ACTION_PROMPT):
+        ACTION_PROMPT = self.prompt_manager.get_messages(
+            "ACTION_PROMPT",
+            thought=thought,
+            iteration=iteration,
+            max_steps=agent_config.MAX_ITERATIONS
+        )
+        async for chunk in self._llm_call(messages=ACTION_PROMPT, stage="action"):
             yield chunk
 
 
@@ -248,31 +571,40 @@ class Astralis:
     async def _generate_final_response(self):
         memory = self.context.get('memory', [])
         formatted_hist = self._formatted_history(memory)
-        RESPONSE_PROMPT = self.prompt_manager.get_prompt(
+        RESPONSE_PROMPT = self.prompt_manager.get_messages(
             "RESPONSE_PROMPT",
             query=self.context.get('user_query', ''),
             observation_history=formatted_hist
         )
-        async for chunk in self._llm_call(RESPONSE_PROMPT):
+        async for chunk in self._llm_call(messages=RESPONSE_PROMPT, stage="response"):
             yield chunk
 
     async def _generate_final_users(self, final_response):
         memory = self.context.get('memory', [])
         formatted_hist = self._formatted_history(memory) + final_response
-        FORMAT_USERS_PROMPT = self.prompt_manager.get_prompt(
+        FORMAT_USERS_PROMPT = self.prompt_manager.get_messages(
             "FORMAT_USERS_PROMPT",
             observation_history=formatted_hist
         )
         final_chunks = ""
-        async for chunk in self._llm_call(FORMAT_USERS_PROMPT):
+        async for chunk in self._llm_call(messages=FORMAT_USERS_PROMPT, stage="format_users"):
             final_chunks += chunk
 
         print(f"[USERS]: {final_chunks}")
         user_ids = self._extract_xml(final_chunks, "user_id")
         user_ids = json.loads(user_ids)
+        if self.profile_json:
+            profiles = await self.profile_json.load(user_ids)
+            for user_id in user_ids:
+                if user_id in profiles:
+                    yield user_id, profiles[user_id]
+            return
         for user_id in user_ids:
             user = await self._get_user_profile(user_id)
-            yield user.to_dict()
+            if user is None:
+                # A hallucinated or deleted id, skipped as on the profile_json path.
+                continue
+            yield user_id, user.to_dict()
 
 
     # async def stream_response_and_users_parallel(self):
@@ -326,27 +658,86 @@ class Astralis:
     #                     users_task = None
 
 
-    async def _llm_call(self, user_prompt: str = ''):
-        if not user_prompt:
+    async def _llm_call(self, user_prompt: str = '', messages: List[Dict[str, str]] | None = None, stage: str = ''):
+        """
+        Streams a completion. Prefer `messages` from PromptManager.get_messages,
+        which keeps the static system prefix stable so it can be served from the
+        provider's prompt cache; `user_prompt` is sent as a single user message.
+        Raises LLMError when no model in the stage's chain can answer.
+        """
+        if messages is None:
+            messages = [{ "role": "user", "content": user_prompt }] if user_prompt else []
+        if not messages:
             print("[WARN] LLM call attempted with empty prompt.")
             yield ""
             return
 
-        try:
-            response = await self.client.chat.completions.create(
-                messages=[
-                    { "role": "user", "content": user_prompt }
-                ],
-                model=self.model,
-                stream=True,
-                temperature=0.1,
-            )
-            async for chunk in response:
-                if chunk.choices and chunk.choices[0].delta and chunk.choices[0].delta.content is not None:
-                    yield chunk.choices[0].delta.content
-        except Exception as e:
-            print(f"[ERROR] LLM API call failed: {e}")
-            yield f"Error communicating with LLM: {e}"
+        params = { "temperature": 0.1 }
+        cache_key = None
+        models = self.model_router.candidates(stage) if self.model_router else [self.model]
+        if self.llm_cache and self.llm_cache.enabled_for(stage):
+            primary = self.model_router.primary(stage) if self.model_router else self.model
+            cache_key = self.llm_cache.key(primary, messages, params)
+            cached = await self.llm_cache.get(cache_key, stage)
+            if cached is not None:
+                print(f"[LLM CACHE]: Replaying cached {stage} completion")
+                async for chunk in self.llm_cache.replay(cached):
+                    yield chunk
+                return
+
+        for attempt, model in enumerate(models):
+            started = time.monotonic()
+            streamed = False
+            try:
+                completion = []
+                finish_reason = None
+                async for chunk in self.llm.stream(model, messages, stage, priority=self.priority, **params):
+                    if chunk.choices and chunk.choices[0].delta and chunk.choices[0].delta.content is not None:
+                        streamed = True
+                        completion.append(chunk.choices[0].delta.content)
+                        yield chunk.choices[0].delta.content
+                    if chunk.choices and chunk.choices[0].finish_reason:
+                        finish_reason = chunk.choices[0].finish_reason
+                    if chunk.usage:
+                        self._record_usage(stage, chunk.usage, model)
+
+                if self.model_router:
+                    self.model_router.record_success(stage, model, (time.monotonic() - started) * 1000)
+                # Only complete answers are cached, never truncated or failed streams.
+                if cache_key and finish_reason == "stop":
+                    await self.llm_cache.set(cache_key, "".join(completion))
+                return
+            except LLMError as e:
+                if self.model_router:
+                    self.model_router.record_failure(stage, model)
+                # Output already streamed cannot be taken back, so only fall back before the first token.
+                if not streamed and attempt + 1 < len(models):
+                    print(f"[WARN] {model} failed for {stage or 'llm'} call, falling back to {models[attempt + 1]}: {e}")
+                    continue
+                print(f"[ERROR] LLM API call failed: {e}")
+                raise
+
+
+    def _record_usage(self, stage: str, usage, model: str | None = None):
+        details = getattr(usage, "prompt_tokens_details", None)
+        cached_tokens = getattr(details, "cached_tokens", None) or 0
+        model = model or self.model
+        if self.model_router:
+            self.model_router.record_usage(stage, model, usage.prompt_tokens, usage.completion_tokens, cached_tokens)
+        entry = {
+            "stage": stage,
+            "model": model,
+            "prompt_tokens": usage.prompt_tokens,
+            "cached_tokens": cached_tokens,
+            "completion_tokens": usage.completion_tokens,
+        }
+        self.context.setdefault("usage", []).append(entry)
+        if "scheduler" in self.context:
+            self.context["scheduler"].record_tokens(usage.prompt_tokens + usage.completion_tokens)
+        print(
+            f"[USAGE]: {stage or 'llm'} ({model}) prompt={usage.prompt_tokens} "
+            f"cached={cached_tokens} completion={usage.completion_tokens}"
+        )
 
 
     async def _load_history(self, session_id: UUID):
@@ -375,6 +766,100 @@ class Astralis:
                 )
 
 
+    def _result_refs(self, result_users: List[Profile]) -> List[Dict[str, Any]]:
+        scores = self.context.get('scores', {})
+        return [
+            { "user_id": user.user_id, "score": scores.get(user.user_id) }
+            for user in result_users
+        ]
+
+
+    def _compact_memory(self) -> List[Dict[str, Any]]:
+        """The thought chain with results reduced to (user_id, score) refs."""
+        return [
+            {
+                "thought": step.get("thought"),
+                "action": step.get("action"),
+                "action_input": step.get("action_input", {}),
+                "result_refs": step.get("result_refs", [])
+            }
+            for step in self.context.get('memory', [])
+        ]
+
+
+    async def _save_memory(self, session_id: UUID, compact: List[Dict[str, Any]] | None = None):
+        """
+        Persists the thought chain so a clarification turn can resume it.
+        Results are stored as (user_id, score) refs rather than full profiles.
+        """
+        memory_key = MEMORY_KEY.format(session_id=session_id)
+        if compact is None:
+            compact = self._compact_memory()
+        try:
+            await self.redis_client.set(memory_key, json.dumps(compact), ex=SESSION_EXPIRATION_SECONDS)
+            print(f"[CONTEXT]: Saved {len(compact)} memory steps for session {session_id}")
+        except TypeError as e:
+            print(f"[ERROR]: Failed to serialize memory for session {session_id}: {e}")
+        except redis.exceptions.RedisError as e:
+            print(f"[ERROR]: Redis error saving memory for session {session_id}: {e}")
+
+
+    async def _load_memory(self, session_id: UUID) -> List[Dict[str, Any]]:
+        """
+        Restores a paused thought chain and re-hydrates its results from
+        current profile data in one batch.
+        """
+        memory_key = MEMORY_KEY.format(session_id=session_id)
+        try:
+            memory_json = await self.redis_client.get(memory_key)
+        except redis.exceptions.RedisError as e:
+            print(f"[ERROR]: Redis error loading memory for session {session_id}: {e}")
+            return []
+
+        if not memory_json:
+            return []
+
+        try:
+            compact = json.loads(memory_json)
+        except json.JSONDecodeError:
+            print(f"[ERROR]: Failed to decode memory JSON for session {session_id}. Discarding.")
+            await self._clear_memory(session_id)
+            return []
+
+        ref_ids = [ref["user_id"] for step in compact for ref in step.get("result_refs", [])]
+        if self.profile_json:
+            profiles = { user_id: json.loads(profile) for user_id, profile in (await self.profile_json.load(ref_ids, LLM)).items() }
+        else:
+            users = await self._fetch_users(ref_ids) if ref_ids else []
+            profiles = { user.user_id: user.for_llm() for user in users }
+
+        memory = []
+        scores = self.context.setdefault('scores', {})
+        for step in compact:
+            refs = step.get("result_refs", [])
+            for ref in refs:
+                if ref.get("score") is not None:
+                    scores[ref["user_id"]] = ref["score"]
+            memory.append({
+                "thought": step.get("thought"),
+                "action": step.get("action"),
+                "action_input": step.get("action_input", {}),
+                "result": [profiles[ref["user_id"]] for ref in refs if ref["user_id"] in profiles],
+                "result_refs": refs
+            })
+
+        print(f"[CONTEXT]: Restored {len(memory)} memory steps for session {session_id}")
+        return memory
+
+
+    async def _clear_memory(self, session_id: UUID):
+        memory_key = MEMORY_KEY.format(session_id=session_id)
+        try:
+            await self.redis_client.delete(memory_key)
+        except redis.exceptions.RedisError as e:
+            print(f"[ERROR]: Redis error clearing memory for session {session_id}: {e}")
+
+
     async def _save_message(self, session_id, message):
         async with self.psql_db_factory() as session:
             try:
@@ -455,7 +940,145 @@ class Astralis:
         match = re.search(f'<{tag}>(.*?)</{tag}>', text, re.DOTALL | re.IGNORECASE)
         return match.group(1).strip() if match else ""
 
-    async def _execute_action(self, action: str, action_input: Dict[str, Any]) -> List[User]:
+    def _parse_actions(self, raw_action: str) -> Tuple[List[Tuple[str, Dict[str, Any]]], str | None]:
+        """
+        Parses the action step into (action, input) pairs. The model emits
+        either one <action>/<input> pair, or an <actions> JSON list of
+        independent {"action", "input"} objects to run concurrently.
+        Returns the actions and an error message; on error the step finishes.
+        """
+        closed_raw_action = self._ensure_closing_tags(raw_action, "actions")
+        actions_text = self._extract_xml(closed_raw_action, "actions")
+        if actions_text:
+            print(f"[ACTIONS]: {actions_text}")
+            try:
+                parsed = json.loads(actions_text)
+            except json.JSONDecodeError:
+                print(f"[ERROR]: Failed to parse actions JSON: {actions_text}")
+                return [("finish", {})], f"Invalid actions format received: {actions_text}"
+
+            if isinstance(parsed, dict):
+                parsed = [parsed]
+            actions = []
+            for item in parsed if isinstance(parsed, list) else []:
+                if isinstance(item, dict) and item.get("action"):
+                    name = str(item["action"]).strip('[]').strip()
+                    actions.append((name, item.get("input") or {}))
+                else:
+                    print(f"[WARN] Skipping malformed action entry: {item}")
+
+            if len(actions) > 1 and any(name in CONTROL_ACTIONS for name, _ in actions):
+                # finish / request_clarification must stand alone; run the searches first.
+                print("[WARN] Control action combined with other actions. Deferring it to the next step.")
+                actions = [(name, inputs) for name, inputs in actions if name not in CONTROL_ACTIONS]
+            if not actions:
+                return [("finish", {})], f"No valid actions received: {actions_text}"
+            return actions, None
+
+        closed_raw_action = self._ensure_closing_tags(raw_action, "action")
+        closed_raw_action = self._ensure_closing_tags(closed_raw_action, "input")
+        action_raw = self._extract_xml(closed_raw_action, "action").strip()
+        action = action_raw.strip('[]').strip()
+        input_text = self._extract_xml(closed_raw_action, "input").strip()
+        print(f"[INPUTS]: {input_text}")
+
+        # Parse action inputs carefully
+        action_inputs: Dict[str, Any] = {}
+        if action not in ["finish"] and input_text:
+            try:
+                action_inputs = json.loads(input_text)
+                print(f"Action inputs parsed: {action_inputs}")
+            except json.JSONDecodeError:
+                print(f"[ERROR]: Failed to parse action input JSON: {input_text}")
+                return [("finish", {})], f"Invalid action input format received: {input_text}"
+        return [(action, action_inputs)], None
+
+
+    async def _execute_action_bounded(self, action: str, action_input: Dict[str, Any]) -> List[Profile]:
+        return await self.context["scheduler"].bounded(
+            "execute",
+            self._execute_action(action, action_input),
+            default=agent_config.ACTION_TIMEOUT_SECONDS
+        )
+
+
+    async def _execute_action_incremental(
+        self,
+        action: str,
+        action_input: Dict[str, Any],
+        result: List[Profile]
+    ) -> AsyncGenerator[List[Dict[str, Any]], None]:
+        """
+        _execute_action_bounded in incremental hydration mode: yields the user
+        cards of each profile batch as soon as it and the batches ranked before
+        it have loaded, then fills `result` with the action's users. Errors are
+        raised as by _execute_action_bounded.
+        """
+        queue: asyncio.Queue = asyncio.Queue()
+        context = contextvars.copy_context()
+        context.run(_hydration_queue.set, queue)
+        task = asyncio.create_task(self._execute_action_bounded(action, action_input), context=context)
+        try:
+            while not task.done():
+                batch = asyncio.ensure_future(queue.get())
+                done, _ = await asyncio.wait({ task, batch }, return_when=asyncio.FIRST_COMPLETED)
+                if batch in done:
+                    yield [user.to_dict() for user in batch.result()]
+                else:
+                    batch.cancel()
+            users = task.result()
+            while not queue.empty():
+                yield [user.to_dict() for user in queue.get_nowait()]
+            result.extend(users)
+        finally:
+            if not task.done():
+                task.cancel()
+
+
+    async def _execute_actions(
+        self,
+        actions: List[Tuple[str, Dict[str, Any]]]
+    ) -> Tuple[List[Profile], List[Dict[str, Any]], List[str]]:
+        """
+        Runs independent actions concurrently, each with its own timeout.
+        Returns the merged, de-duplicated users (in action order), a per-action
+        summary for the thought chain, and the failure messages.
+        """
+        results = await asyncio.gather(
+            *(self._execute_action_bounded(name, inputs) for name, inputs in actions),
+            return_exceptions=True
+        )
+
+        merged: List[Profile] = []
+        seen = set()
+        summary = []
+        failures = []
+        for (name, inputs), result in zip(actions, results):
+            entry: Dict[str, Any] = { "action": name, "input": inputs }
+            if isinstance(result, BaseException):
+                message = self._describe_error(result)
+                print(f"[ERROR] Parallel action {name} failed: {message}")
+                entry["error"] = message
+                failures.append(f"{name}: {message}")
+            else:
+                entry["found"] = len(result)
+                for user in result:
+                    if user.user_id not in seen:
+                        seen.add(user.user_id)
+                        merged.append(user)
+            summary.append(entry)
+        return merged, summary, failures
+
+
+    def _describe_error(self, error: BaseException) -> str:
+        if isinstance(error, HTTPException):
+            return str(error.detail)
+        if isinstance(error, StageTimeout):
+            return f"timed out after {error.timeout:.1f}s"
+        return str(error)
+
+
+    async def _execute_action(self, action: str, action_input: Dict[str, Any]) -> List[Profile]:
         if isinstance(action, str):
             action_type = re.sub(r"[<>]", "", action.strip().lower())
         elif isinstance(action, dict):
@@ -466,19 +1089,112 @@ class Astralis:
 
         print(f"Executing action: {action} with input: {action_input}")
 
+        if action_type not in MEMOIZED_ACTIONS:
+            return self._remember_profiles(await self._dispatch_action(action_type, action, action_input))
+
+        # Run-scoped memo: a repeated action (same normalized input) on a later
+        # iteration, or while the first call is still running, shares its result.
+        memo = self.context.setdefault("action_memo", {})
+        key = self._action_key(action_type, self._memo_input(action_type, action_input))
+        task = memo.get(key)
+        if task is None:
+            task = asyncio.create_task(self._dispatch_action(action_type, action, action_input))
+            memo[key] = task
+        else:
+            print(f"[MEMO]: Reusing result of earlier {action_type} call")
+            metrics.incr("action_memo.hit")
+            if self.context.get("prefetched", {}).pop(key, None) is not None:
+                metrics.incr("prefetch.used")
+
+        try:
+            return self._remember_profiles(await asyncio.shield(task))
+        except Exception:
+            # Failed calls are not memoized, so a later iteration can retry.
+            if memo.get(key) is task:
+                del memo[key]
+            raise
+
+
+    def _remember_profiles(self, users: List[Profile]) -> List[Profile]:
+        profiles = self.context.setdefault("profiles", {})
+        for user in users:
+            profiles[user.user_id] = user
+        return users
+
+
+    def _memo_input(self, action_type: str, action_input) -> Dict[str, Any]:
+        """The part of an action's input that determines its result."""
+        if not isinstance(action_input, dict):
+            return { "value": action_input }
+        if action_type == "search_rag_service":
+            # top_k is fixed server-side, so it must not split the memo.
+            return { "query": action_input.get("query"), "namespace": action_input.get("namespace") }
+        return action_input
+
+
+    def _start_prefetch(self):
+        """
+        Speculatively runs the raw user query against each prefetch namespace,
+        including the profile load, while the first thought is still streaming.
+        The tasks go into the run's action memo, so a matching first
+        search_rag_service is served from them.
+        """
+        if not prefetch_config.ENABLED or self.context.get("memory"):
+            return
+        query = " ".join(self.context.get("user_query", "").split())
+        if not query:
+            return
+
+        memo = self.context.setdefault("action_memo", {})
+        prefetched = self.context.setdefault("prefetched", {})
+        for namespace in prefetch_config.NAMESPACES:
+            action_input = { "query": query, "namespace": namespace }
+            key = self._action_key("search_rag_service", self._memo_input("search_rag_service", action_input))
+            if key in memo:
+                continue
+            task = asyncio.create_task(self._dispatch_action("search_rag_service", "search_rag_service", action_input))
+            task.add_done_callback(lambda t, key=key: self._on_prefetch_done(key, t))
+            memo[key] = task
+            prefetched[key] = task
+        metrics.incr("prefetch.started", len(prefetched))
+        print(f"[PREFETCH]: Started {len(prefetched)} speculative searches for '{query}'")
+
+
+    def _on_prefetch_done(self, key: str, task: asyncio.Task):
+        if task.cancelled():
+            return
+        if task.exception() is not None:
+            # A failed guess must not fail the real action: drop it so it re-runs.
+            print(f"[WARN] Prefetch failed: {task.exception()}")
+            metrics.incr("prefetch.failed")
+            memo = self.context.get("action_memo", {})
+            if memo.get(key) is task:
+                del memo[key]
+            self.context.get("prefetched", {}).pop(key, None)
+
+
+    def _settle_prefetch(self):
+        """Counts prefetches the agent never asked for and cancels any still running."""
+        prefetched = self.context.pop("prefetched", {})
+        if not prefetched:
+            return
+        metrics.incr("prefetch.wasted", len(prefetched))
+        for task in prefetched.values():
+            if not task.done():
+                task.cancel()
+        print(f"[PREFETCH]: {len(prefetched)} speculative searches were not used")
+
+
+    async def _dispatch_action(self, action_type: str, action, action_input) -> List[Profile]:
         if action_type == "query_graph":
             query = action_input.get("query")
             variables = action_input.get("variables", [])
             try:
-                user_ids = []
-                records = await self.rag_service.query_graph(query)
-                for record in records:
-                    for var in variables:
-                        user_ids.append(record.data()[var]["user_id"])
-
+                key = self._action_key(action_type, { "query": query, "variables": variables })
+                user_ids = await self._shared_retrieval(key, lambda: self._graph_search(query, variables))
 
                 print(user_ids)
-                unique_user_ids = list(set(user_ids))
+                unique_user_ids = list(dict.fromkeys(user_ids))
                 print(f"Found {len(unique_user_ids)} unique user IDs from vector search.")
 
                 if not unique_user_ids:
@@ -506,21 +1222,22 @@ class Astralis:
                 raise HTTPException(status_code=400, detail=f"Invalid namespace '{namespace}'. Allowed: {allowed_namespaces}")
 
             try:
-                vector_results = self.rag_service.query_vector(
-                    query=str(query),
-                    namespace=str(namespace),
-                    top_k=int(top_k)
+                key = self._action_key(action_type, { "query": query, "namespace": namespace, "top_k": top_k })
+                matches = await self._shared_retrieval(
+                    key,
+                    lambda: self._vector_search(str(query), str(namespace), int(top_k))
                 )
 
-                user_ids = []
-                if vector_results and 'matches' in vector_results:
-                    for match in vector_results['matches']:
-                        if 'metadata' in match and 'user_id' in match['metadata']:
-                            user_ids.append(match['metadata']['user_id'])
-                        else:
-                            print(f"[WARN] Vector match missing metadata or user_id: {match.get('id')}")
+                best: Dict[str, float] = {}
+                scores = self.context.setdefault('scores', {})
+                for match_user_id, score in matches:
+                    best.setdefault(match_user_id, float("-inf"))
+                    if score is not None:
+                        scores[match_user_id] = max(score, scores.get(match_user_id, score))
+                        best[match_user_id] = max(score, best[match_user_id])
 
-                unique_user_ids = list(set(user_ids))
+                # Best match first (a user can match on several chunks); ties keep match order.
+                unique_user_ids = sorted(best, key=lambda user_id: -best[user_id])
                 print(f"Found {len(unique_user_ids)} unique user IDs from vector search.")
 
                 if not unique_user_ids:
@@ -563,131 +1280,22 @@ class Astralis:
 
             if not isinstance(filters, dict) or not filters:
                  print("[WARN] filter_structured called without filters. Returning original list.")
-                 tasks = [self._get_user_profile(uid) for uid in user_ids]
-                 fetched_users_results = await asyncio.gather(*tasks, return_exceptions=True)
-                 fetched_users = [res for res in fetched_users_results if isinstance(res, User)]
-                 return fetched_users
+                 return await self._filtered_profiles(None, {}, user_ids=user_ids)
 
             print(f"Applying structured filters: {filters} to {len(user_ids)} user IDs.")
-
-            # Base query to select user IDs from the input list
-            query = select(User.user_id).where(User.user_id.in_(user_ids)).distinct()
-
-            filter_conditions = []
-
-            # --- Filter Translation Logic ---
-
-            # Location Filter (Experience)
-            if "location" in filters:
-                location_filter = filters["location"]
-                if isinstance(location_filter, str) and location_filter.strip():
-                    location_subquery = (
-                        select(Experience.experience_id)
-                        .where(
-                            Experience.user_id == User.user_id,
-                            Experience.location.ilike(f"%{location_filter.strip()}%")
-                        )
-                        .exists()
-                    )
-                    filter_conditions.append(location_subquery)
-                    print(f"  - Added location filter: ILIKE '%{location_filter.strip()}%'")
-                else:
-                    print(f"[WARN] Invalid or empty location filter value: {location_filter}. Skipping.")
-
-            # Company Name Filter (Experience)
-            if "company_name" in filters:
-                company_filter = filters["company_name"]
-                if isinstance(company_filter, str) and company_filter.strip():
-                    company_subquery = (
-                        select(Experience.experience_id)
-                        .where(
-                            Experience.user_id == User.user_id,
-                            Experience.company_name.ilike(f"%{company_filter.strip()}%")
-                        )
-                        .exists()
-                    )
-                    filter_conditions.append(company_subquery)
-                    print(f"  - Added company_name filter: ILIKE '%{company_filter.strip()}%'")
-                else:
-                    print(f"[WARN] Invalid or empty company_name filter value: {company_filter}. Skipping.")
-
-            # Job Title Filter (Experience)
-            if "job_title" in filters:
-                title_filter = filters["job_title"]
-                if isinstance(title_filter, str) and title_filter.strip():
-                     title_subquery = (
-                         select(Experience.experience_id)
-                         .where(
-                             Experience.user_id == User.user_id,
-                             Experience.job_title.ilike(f"%{title_filter.strip()}%")
-                         )
-                         .exists()
-                     )
-                     filter_conditions.append(title_subquery)
-                     print(f"  - Added job_title filter: ILIKE '%{title_filter.strip()}%'")
-                else:
-                     print(f"[WARN] Invalid or empty job_title filter value: {title_filter}. Skipping.")
-
-            # Skill Filter (Skill)
-            if "skill" in filters:
-                skill_filter = filters["skill"]
-                if isinstance(skill_filter, str) and skill_filter.strip():
-                    skill_subquery = (
-                        select(Skill.skill_id)
-                        .where(
-                            Skill.user_id == User.user_id,
-                            func.lower(Skill.skill_name) == func.lower(skill_filter.strip())
-                        )
-                        .exists()
-                    )
-                    filter_conditions.append(skill_subquery)
-                    print(f"  - Added skill filter: = '{skill_filter.strip()}' (case-insensitive)")
-                else:
-                    print(f"[WARN] Invalid or empty skill filter value: {skill_filter}. Skipping.")
-
-            ### IMPORTANT: Add more supported filter translations here in the future... ###
-
-            # --- End Filter Translation ---
-
-            # Apply the combined filters if any were added
-            if filter_conditions:
-                query = query.where(and_(*filter_conditions))
-                print(f"Applied {len(filter_conditions)} filter conditions.")
-            else:
+            if self.columnar_index:
+                matched_ids = await self.columnar_index.filter_ids(user_ids, filters)
+                if matched_ids is not None:
+                    print(f"Columnar index matched {len(matched_ids)} user IDs.")
+                    return await self._profiles_by_id(matched_ids)
+
+            condition = compile_filters(filters, self.aliases)
+            if condition is None:
                  print("[INFO] No valid filters applied.")
-                 pass
 
-            # Execute the query to get the filtered user IDs
-            filtered_ids = []
-            try:
-                async with self.psql_db_factory() as session:
-                    print(f"Executing filter query...")
-                    # Optional: Print compiled SQL for debugging
-                    # from sqlalchemy.dialects import postgresql
-                    # print(query.compile(dialect=postgresql.dialect(), compile_kwargs={"literal_binds": True}))
-                    result = await session.execute(query)
-                    filtered_ids = result.scalars().all()
-                print(f"Filter query returned {len(filtered_ids)} user IDs.")
-            except Exception as e:
-                 print(f"[ERROR] Database error during structured filtering: {e}")
-                 raise HTTPException(status_code=500, detail=f"Database error during filtering: {e}")
-
-            filtered_users: List[User] = []
-            if filtered_ids:
-                unique_filtered_ids = list(set(filtered_ids))
-                if len(unique_filtered_ids) < len(filtered_ids):
-                    print(f"[INFO] Deduplicated filtered IDs from {len(filtered_ids)} to {len(unique_filtered_ids)}")
-
-                tasks = [self._get_user_profile(uid) for uid in unique_filtered_ids]
-                fetched_users_results = await asyncio.gather(*tasks, return_exceptions=True)
-                for i, res in enumerate(fetched_users_results):
-                     if isinstance(res, User):
-                         filtered_users.append(res)
-                     elif isinstance(res, Exception):
-                         print(f"[ERROR] Failed to fetch profile post-filter for user_id {unique_filtered_ids[i]}: {res}")
-            else:
+            filtered_users = await self._filtered_profiles(condition, filters, user_ids=user_ids)
+            if not filtered_users:
                  print("No users matched the structured filters.")
-
             return filtered_users
 
         elif action_type == "request_clarification":
@@ -708,50 +1316,248 @@ class Astralis:
             print(f"[WARN] Unknown action received: {action}")
             return []
 
-    async def _fetch_users(self, user_ids):
-        unique_user_ids = list(set(user_ids))
+    async def _structured_search(self, filters: Dict[str, Any], limit: int) -> List[Profile]:
+        """Users matching the filters across the whole table, not a candidate list."""
+        condition = compile_filters(filters, self.aliases)
+        if condition is None:
+            return []
+        users = await self._filtered_profiles(condition, filters, limit=limit)
+        print(f"Structured search returned {len(users)} users.")
+        return users
+
+
+    async def _profiles_by_id(self, user_ids: List[str]) -> List[Profile]:
+        """Profiles in `user_ids` order, reusing ones this run already loaded."""
+        profiles = self.context.setdefault("profiles", {})
+        missing = [user_id for user_id in user_ids if user_id not in profiles]
+        if missing:
+            self._remember_profiles(await self._filtered_profiles(None, {}, user_ids=missing))
+        return [profiles[user_id] for user_id in user_ids if user_id in profiles]
+
+
+    async def _filtered_profiles(
+        self,
+        condition,
+        filters: Dict[str, Any],
+        user_ids: List[str] | None = None,
+        limit: int | None = None
+    ) -> List[ProfileView]:
+        """
+        Filters and loads full profiles in one session: a single statement
+        selects the matching users, best experience match first, and their
+        profiles are then batch-loaded as read models. Without a ranking
+        filter, candidates keep the order of `user_ids`.
+        """
+        query = select(User.user_id)
+        if user_ids is not None:
+            query = query.where(User.user_id.in_(user_ids))
+        if condition is not None:
+            query = query.where(condition)
+        rank = experience_rank(rank_filters(filters)) if filters else None
+        if rank is not None:
+            query = query.order_by(rank.desc().nulls_last(), User.user_id)
+        else:
+            query = query.order_by(User.user_id)
+        if limit is not None:
+            query = query.limit(limit)
+
+        try:
+            async with self.psql_db_factory() as session:
+                # Optional: Print compiled SQL for debugging
+                # from sqlalchemy.dialects import postgresql
+                # print(query.compile(dialect=postgresql.dialect(), compile_kwargs={"literal_binds": True}))
+                matched_ids = list((await session.execute(query)).scalars().all())
+                profiles = await load_profiles(session, matched_ids)
+                users = [profiles[user_id] for user_id in matched_ids if user_id in profiles]
+        except Exception as e:
+            print(f"[ERROR] Database error during structured filtering: {e}")
+            raise HTTPException(status_code=500, detail=f"Database error during filtering: {e}")
+
+        print(f"Filter query returned {len(users)} users.")
+        if rank is None and user_ids is not None:
+            position = { user_id: i for i, user_id in enumerate(dict.fromkeys(user_ids)) }
+            users.sort(key=lambda user: position.get(user.user_id, len(position)))
+        return users
+
+
+    async def _vector_search(self, query: str, namespace: str, top_k: int) -> List[List[Any]]:
+        """Vector search reduced to JSON-safe [user_id, score] pairs, so it can be shared across workers."""
+        vector_results = await asyncio.to_thread(
+            self.rag_service.query_vector,
+            query=query,
+            namespace=namespace,
+            top_k=top_k
+        )
+
+        matches = []
+        if vector_results and 'matches' in vector_results:
+            for match in vector_results['matches']:
+                if 'metadata' in match and 'user_id' in match['metadata']:
+                    matches.append([match['metadata']['user_id'], match.get('score')])
+                else:
+                    print(f"[WARN] Vector match missing metadata or user_id: {match.get('id')}")
+        return matches
+
+
+    async def _graph_search(self, query: str, variables: List[str]) -> List[str]:
+        records = await self.rag_service.query_graph(query)
+        if isinstance(records, str):
+            raise RuntimeError(records)
+
+        user_ids = []
+        for record in records:
+            for var in variables:
+                user_ids.append(record.data()[var]["user_id"])
+        return user_ids
+
+
+    async def _shared_retrieval(self, key: str, fn):
+        """
+        Retrieval shared across sessions: served from the version-stamped action
+        cache when possible, otherwise computed once across concurrent callers.
+        """
+        if self.action_cache:
+            cached = await self.action_cache.get(key)
+            if cached is not None:
+                return cached
+
+        async def compute():
+            result = await fn()
+            if self.action_cache:
+                await self.action_cache.set(key, result)
+            return result
+
+        if self.single_flight is None:
+            return await compute()
+        return await self.single_flight.do(key, compute)
+
+
+    def _action_key(self, action_type: str, action_input: Dict[str, Any]) -> str:
+        """Stable key for an action: whitespace-normalized inputs, sorted keys."""
+        def normalize(value):
+            if isinstance(value, str):
+                return " ".join(value.split())
+            if isinstance(value, dict):
+                return { k: normalize(v) for k, v in value.items() }
+            if isinstance(value, list):
+                items = [normalize(v) for v in value]
+                # Lists of ids/variables are sets as far as the actions are concerned.
+                if all(isinstance(v, (str, int, float)) for v in items):
+                    return sorted(items, key=str)
+                return items
+            return value
+
+        payload = json.dumps(normalize(action_input), sort_keys=True, separators=(",", ":"), default=str)
+        return f"action:{action_type}:" + hashlib.sha256(payload.encode()).hexdigest()
+
+
+    async def _fetch_users(self, user_ids) -> List[Profile]:
+        """Profiles of the distinct user_ids, in the order given: callers pass them ranked."""
+        unique_user_ids = list(dict.fromkeys(user_ids))
         print(f"Found {len(unique_user_ids)} unique user IDs from vector search.")
 
         if not unique_user_ids:
             return []
 
-        tasks = [self._get_user_profile(uid) for uid in unique_user_ids]
-        fetched_users_results = await asyncio.gather(*tasks, return_exceptions=True)
+        queue = _hydration_queue.get()
+        batch_size = max(1, hydration_config.BATCH_SIZE)
+        if queue is None or len(unique_user_ids) <= batch_size:
+            return await self._hydrate(unique_user_ids)
 
-        fetched_users = []
-        for i, result in enumerate(fetched_users_results):
-            if isinstance(result, User):
-                fetched_users.append(result)
-            elif isinstance(result, Exception):
-                print(f"[ERROR] Failed to fetch profile for user_id {unique_user_ids[i]}: {result}")
-
-        return fetched_users
+        # Incremental mode: batches load concurrently and are reported in rank order.
+        batches = [unique_user_ids[i:i + batch_size] for i in range(0, len(unique_user_ids), batch_size)]
+        tasks = [asyncio.create_task(self._hydrate(batch)) for batch in batches]
+        users: List[Profile] = []
+        try:
+            for task in tasks:
+                loaded = await task
+                queue.put_nowait(loaded)
+                users.extend(loaded)
+        finally:
+            for task in tasks:
+                task.cancel()
+        return users
+
+
+    async def _hydrate(self, user_ids: List[str]) -> List[Profile]:
+        """Profiles of distinct user_ids, in their order: per-worker cache, shared cache, documents, then tables."""
+        fetched: Dict[str, Profile] = self.profile_cache.get_many(user_ids) if self.profile_cache else {}
+        missing = [user_id for user_id in user_ids if user_id not in fetched]
+        loaded_since = time.monotonic()
+        stamp = None
+        shared: Dict[str, Profile] = {}
+        if missing and self.shared_profile_cache:
+            shared, stamp = await self.shared_profile_cache.get_many(missing)
+            missing = [user_id for user_id in missing if user_id not in shared]
+
+        loaded: Dict[str, Profile] = {}
+        if missing and self.profile_documents:
+            try:
+                loaded.update(await self.profile_documents.get_many(missing))
+            except Exception as e:
+                print(f"[WARN] Profile document read failed for {len(missing)} users, loading from tables: {e}")
+            missing = [user_id for user_id in missing if user_id not in loaded]
+
+        if missing:
+            loaded.update(await self._load_profiles(missing))
+        if loaded and self.shared_profile_cache:
+            await self.shared_profile_cache.put_many(loaded.values(), stamp)
+        # Only what was read below the per-worker cache is put back: re-putting
+        # its own hits would renew their TTL and re-measure them on every read.
+        loaded.update(shared)
+        if self.profile_cache:
+            self.profile_cache.put_many(loaded.values(), loaded_since)
+        fetched.update(loaded)
+        return [fetched[user_id] for user_id in user_ids if user_id in fetched]
+
+
+    async def _get_user_profile(self, user_id: str) -> Profile | None:
+        print(f"Fetching profile for user_id: {user_id}")
+        if self.profile_cache:
+            cached = self.profile_cache.get(user_id)
+            if cached:
+                return cached
+        loaded_since = time.monotonic()
+        stamp = None
+        if self.shared_profile_cache:
+            shared, stamp = await self.shared_profile_cache.get_many([user_id])
+            profile = shared.get(user_id)
+            if profile:
+                if self.profile_cache:
+                    self.profile_cache.put_many([profile], loaded_since)
+                return profile
+        profile = await self._read_user_profile(user_id)
+        if profile and self.shared_profile_cache:
+            await self.shared_profile_cache.put_many([profile], stamp)
+        if profile and self.profile_cache:
+            self.profile_cache.put_many([profile], loaded_since)
+        return profile
+
+
+    async def _read_user_profile(self, user_id: str) -> Profile | None:
+        if self.profile_documents:
+            try:
+                document = await self.profile_documents.get(user_id)
+                if document:
+                    return document
+            except Exception as e:
+                print(f"[WARN] Profile document read failed for {user_id}, loading from tables: {e}")
 
+        profiles = await self._load_profiles([user_id])
+        if user_id not in profiles:
+            print(f"[INFO] User profile not found for id: {user_id}")
+            return None
+        return profiles[user_id]
 
-    async def _get_user_profile(self, user_id: str) -> User | None:
-        print(f"Fetching profile for user_id: {user_id}")
-        query = (
-            select(User)
-            .options(
-                selectinload(User.projects),
-                selectinload(User.educations),
-                selectinload(User.experiences),
-                selectinload(User.skills)
-            )
-            .where(User.user_id == user_id)
-        )
 
+    async def _load_profiles(self, user_ids: List[str]) -> Dict[str, ProfileView]:
+        """Read models for the given users, all loaded in one session."""
         async with self.psql_db_factory() as session:
             try:
-                result = await session.execute(query)
-                user = result.scalars().first()
-                if not user:
-                    print(f"[INFO] User profile not found for id: {user_id}")
-                    return None
-                return user
+                return await load_profiles(session, user_ids)
             except Exception as e:
-                print(f"[ERROR] Database error fetching profile {user_id}: {e}")
-                raise HTTPException(status_code=500, detail=f"Database error fetching profile {user_id}")
+                print(f"[ERROR] Database error fetching {len(user_ids)} profiles: {e}")
+                raise HTTPException(status_code=500, detail=f"Database error fetching profiles {user_ids[:5]}")
 
     # async def _load_history(self, session_id: str) -> List[Dict[str, Any]]:
     #     """Loads conversation history from Redis."""
@@ -26,6 +26,165 @@ class NeoConfig:
     AURA_INSTANCENAME: str = settings.AURA_INSTANCENAME
 
 
+class LLMCacheConfig:
+    """Configuration for the LLM response cache."""
+    ENABLED: bool = settings.LLM_CACHE_ENABLED
+    TTL_SECONDS: int = settings.LLM_CACHE_TTL_SECONDS
+    STAGES: set = { s.strip() for s in settings.LLM_CACHE_STAGES.split(",") if s.strip() }
+    REPLAY_CHUNK_SIZE: int = 24  # Characters per replayed chunk
+
+
+class SemanticCacheConfig:
+    """Configuration for the semantic query cache."""
+    ENABLED: bool = settings.SEMANTIC_CACHE_ENABLED
+    THRESHOLD: float = settings.SEMANTIC_CACHE_THRESHOLD  # Cosine similarity needed for a hit
+    TTL_SECONDS: int = settings.SEMANTIC_CACHE_TTL_SECONDS
+    MAX_ENTRIES: int = settings.SEMANTIC_CACHE_MAX_ENTRIES
+
+
+class SingleFlightConfig:
+    """Configuration for coalescing identical concurrent searches."""
+    ENABLED: bool = settings.SINGLE_FLIGHT_ENABLED
+    LOCK_TTL_SECONDS: int = settings.SINGLE_FLIGHT_LOCK_TTL_SECONDS  # Upper bound on one leader's run
+    RESULT_TTL_SECONDS: int = 10  # How long a finished action result stays readable by followers
+    WAIT_TIMEOUT_SECONDS: float = settings.SINGLE_FLIGHT_WAIT_TIMEOUT_SECONDS  # Follower gives up on a silent leader
+    HEARTBEAT_SECONDS: float = settings.SINGLE_FLIGHT_HEARTBEAT_SECONDS  # Streaming leader's keep-alive during silent stages
+
+
+class ActionCacheConfig:
+    """Configuration for the cross-session retrieval result cache."""
+    ENABLED: bool = settings.ACTION_CACHE_ENABLED
+    TTL_SECONDS: int = settings.ACTION_CACHE_TTL_SECONDS
+
+
+class AgentConfig:
+    """Configuration for the Astralis run loop."""
+    ACTION_TIMEOUT_SECONDS: float = settings.AGENT_ACTION_TIMEOUT_SECONDS  # Per executed action
+    MAX_ITERATIONS: int = settings.AGENT_MAX_ITERATIONS
+    DEADLINE_SECONDS: float = settings.AGENT_DEADLINE_SECONDS  # Wall clock for the loop; finalization gets its own timeouts
+    TOKEN_BUDGET: int = settings.AGENT_TOKEN_BUDGET  # Prompt + completion tokens across all LLM calls
+    STAGE_TIMEOUTS: dict = {
+        stage.strip(): float(seconds)
+        for stage, seconds in (item.split(":") for item in settings.AGENT_STAGE_TIMEOUTS.split(",") if item.strip())
+    }
+
+
+class PrefetchConfig:
+    """Configuration for speculative retrieval at the start of a run."""
+    ENABLED: bool = settings.PREFETCH_ENABLED
+    NAMESPACES: list = [ns.strip() for ns in settings.PREFETCH_NAMESPACES.split(",") if ns.strip()]
+
+
+class HydrationConfig:
+    """Configuration for loading the profiles of an action's results."""
+    INCREMENTAL: bool = settings.HYDRATION_INCREMENTAL  # Emit users_partial events as batches load
+    BATCH_SIZE: int = settings.HYDRATION_BATCH_SIZE  # Profiles per batch in incremental mode
+
+
+class FastPathConfig:
+    """Configuration for routing simple queries around the agent loop."""
+    ENABLED: bool = settings.FAST_PATH_ENABLED
+    FILTER_THRESHOLD: float = settings.FAST_PATH_FILTER_THRESHOLD  # Classifier confidence for a parsed filter query
+    VECTOR_THRESHOLD: float = settings.FAST_PATH_VECTOR_THRESHOLD  # Stricter: keyword queries have no parse to back them
+    MAX_VECTOR_WORDS: int = 4
+    MAX_RESULTS: int = settings.FAST_PATH_MAX_RESULTS
+
+
+def _stage_map(value: str) -> dict:
+    """Parses "stage:value,stage:value" settings."""
+    pairs = (item.split(":", 1) for item in value.split(",") if item.strip())
+    return { stage.strip(): setting.strip() for stage, setting in pairs }
+
+
+class ModelRoutingConfig:
+    """Configuration for per-stage model selection."""
+    DEFAULT_MODEL: str = settings.OPENAI_MODEL
+    STAGE_MODELS: dict = {
+        stage: [model.strip() for model in chain.split("|") if model.strip()]
+        for stage, chain in _stage_map(settings.LLM_STAGE_MODELS).items()
+    }
+    POLICY: str = settings.LLM_ROUTING_POLICY
+    LATENCY_BUDGETS_MS: dict = { stage: float(ms) for stage, ms in _stage_map(settings.LLM_STAGE_LATENCY_BUDGETS_MS).items() }
+    COOLDOWN_SECONDS: float = settings.LLM_MODEL_COOLDOWN_SECONDS
+    LATENCY_WINDOW_SECONDS: float = settings.LLM_LATENCY_WINDOW_SECONDS  # Latency samples older than this no longer demote a model
+
+
+class LLMClientConfig:
+    """Configuration for streaming LLM calls."""
+    FIRST_TOKEN_TIMEOUT_SECONDS: float = settings.LLM_FIRST_TOKEN_TIMEOUT_SECONDS
+    CHUNK_TIMEOUT_SECONDS: float = settings.LLM_CHUNK_TIMEOUT_SECONDS  # Longest allowed gap between chunks
+    MAX_RETRIES: int = settings.LLM_MAX_RETRIES  # Only before the first chunk
+    RETRY_BASE_DELAY_SECONDS: float = settings.LLM_RETRY_BASE_DELAY_SECONDS
+    HEDGE_ENABLED: bool = settings.LLM_HEDGE_ENABLED  # Duplicate a request that has not started by the p95 TTFT
+
+
+class LLMLimitConfig:
+    """Configuration for the shared LLM rate limiter."""
+    ENABLED: bool = settings.LLM_LIMIT_ENABLED
+    REQUESTS_PER_MINUTE: int = settings.LLM_LIMIT_REQUESTS_PER_MINUTE
+    TOKENS_PER_MINUTE: int = settings.LLM_LIMIT_TOKENS_PER_MINUTE
+    COMPLETION_ESTIMATE: int = settings.LLM_LIMIT_COMPLETION_ESTIMATE  # Charged up front, corrected from usage
+    TOKENS_PER_CALL_ESTIMATE: int = 2000  # For admission estimates only
+    ADMISSION_MAX_WAIT_SECONDS: float = settings.LLM_ADMISSION_MAX_WAIT_SECONDS  # Reject new runs above this queue wait
+
+
+
+class ColumnarIndexConfig:
+    """Configuration for the in-process columnar filter index."""
+    ENABLED: bool = settings.COLUMNAR_INDEX_ENABLED
+    REFRESH_SECONDS: float = settings.COLUMNAR_INDEX_REFRESH_SECONDS  # Incremental refresh from profile_changes
+    REBUILD_SECONDS: float = settings.COLUMNAR_INDEX_REBUILD_SECONDS  # Full reload, also catches late-committed changes
+    CHECK_RATE: float = settings.COLUMNAR_INDEX_CHECK_RATE
+
+
+class CanonicalConfig:
+    """Configuration for resolving filter values to canonical entities."""
+    ENABLED: bool = settings.CANONICAL_ALIASES_ENABLED
+    REFRESH_SECONDS: float = settings.CANONICAL_ALIASES_REFRESH_SECONDS
+
+
+class ProfileJSONConfig:
+    """Configuration for the SQL-side profile JSON read path."""
+    ENABLED: bool = settings.PROFILE_SQL_JSON_ENABLED
+
+
+class ProfileDocumentsConfig:
+    """Configuration for serving profiles from profile_documents."""
+    ENABLED: bool = settings.PROFILE_DOCUMENTS_ENABLED
+    REFRESH_SECONDS: float = settings.PROFILE_DOCUMENTS_REFRESH_SECONDS  # How often stale documents are rebuilt
+
+
+class ProfileCacheConfig:
+    """Configuration for the per-worker profile cache."""
+    ENABLED: bool = settings.PROFILE_CACHE_ENABLED
+    MAX_ENTRIES: int = settings.PROFILE_CACHE_MAX_ENTRIES
+    TTL_SECONDS: float = settings.PROFILE_CACHE_TTL_SECONDS
+    WATCH_SECONDS: float = settings.PROFILE_CACHE_WATCH_SECONDS  # How often profile_changes is tailed for invalidations
+
+
+class SharedProfileCacheConfig:
+    """Configuration for the profile cache shared by all workers in Redis."""
+    ENABLED: bool = settings.SHARED_PROFILE_CACHE_ENABLED
+    TTL_SECONDS: int = settings.SHARED_PROFILE_CACHE_TTL_SECONDS
+
+
 embedding_config    = EmbeddingConfig()
 pincone_config      = PineconeConfig()
 neo_config          = NeoConfig()
+llm_cache_config    = LLMCacheConfig()
+single_flight_config = SingleFlightConfig()
+action_cache_config = ActionCacheConfig()
+agent_config        = AgentConfig()
+prefetch_config     = PrefetchConfig()
+hydration_config    = HydrationConfig()
+fast_path_config    = FastPathConfig()
+model_routing_config = ModelRoutingConfig()
+llm_client_config   = LLMClientConfig()
+llm_limit_config    = LLMLimitConfig()
+columnar_index_config = ColumnarIndexConfig()
+canonical_config    = CanonicalConfig()
+profile_json_config = ProfileJSONConfig()
+profile_documents_config = ProfileDocumentsConfig()
+profile_cache_config = ProfileCacheConfig()
+shared_profile_cache_config = SharedProfileCacheConfig()
+semantic_cache_config = SemanticCacheConfig()
@@ -7,13 +7,33 @@ from openai import AsyncOpenAI
 from sqlalchemy.ext.asyncio import async_sessionmaker, AsyncSession
 from config import Config, get_settings
 from search.services import embedding_engine
-from search.agents.astralis import Astralis
+from search.agents.astralis import Astralis, PROMPT_PLACEHOLDERS
 from search.services.rag_service import RAGService
 from database.client import get_async_session_factory
 from sentence_transformers import SentenceTransformer
 from search.services.prompt_manager import PromptManager
 from search.services.pinecone_manager import PineconeManager
 from search.services.neo_manager import NeoManager
+from search.services.llm_cache import LLMResponseCache
+from search.services.semantic_cache import SemanticQueryCache
+from search.services.single_flight import SingleFlight
+from search.services.action_cache import ActionResultCache
+from search.services.query_router import QueryRouter
+from search.services.model_router import ModelRouter
+from search.services.llm_client import LLMClient
+from search.services.llm_limiter import LLMLimiter
+from search.services.columnar_index import ColumnarIndex
+from search.services.canonical import AliasMap
+from search.services.profile_json import ProfileJSONLoader
+from search.services.profile_documents import ProfileDocumentStore
+from search.services.profile_cache import ProfileCache
+from search.services.shared_profile_cache import SharedProfileCache
+from search.config import (
+    llm_cache_config, semantic_cache_config, single_flight_config, action_cache_config,
+    fast_path_config, model_routing_config, llm_client_config, llm_limit_config, columnar_index_config,
+    canonical_config, profile_json_config, profile_documents_config, profile_cache_config,
+    shared_profile_cache_config
+)
 from typing import AsyncGenerator
 
 
@@ -48,8 +68,16 @@ def get_llm(settings: Config = Depends(get_settings)) -> AsyncOpenAI:
         _openai_client = AsyncOpenAI(api_key=settings.OPENAI_API_KEY)
     return _openai_client
 
+_prompt_manager = None
+
 def get_prompt_manager() -> PromptManager:
-    return PromptManager(template_file="search/prompts.yaml")
+    global _prompt_manager
+    if _prompt_manager is None:
+        _prompt_manager = PromptManager(
+            template_file="search/prompts.yaml",
+            required_placeholders=PROMPT_PLACEHOLDERS
+        )
+    return _prompt_manager
 
 
 _redis_pool = None
@@ -72,13 +100,238 @@ async def get_redis_client(settings: Config = Depends(get_settings)) -> AsyncGen
     else:
         raise HTTPException(status_code=503, detail="Redis client not available.")
 
+def get_llm_cache(redis_client: redis.Redis = Depends(get_redis_client)) -> LLMResponseCache | None:
+    if not llm_cache_config.ENABLED:
+        return None
+    return LLMResponseCache(
+        redis_client,
+        ttl_seconds=llm_cache_config.TTL_SECONDS,
+        stages=llm_cache_config.STAGES,
+        replay_chunk_size=llm_cache_config.REPLAY_CHUNK_SIZE
+    )
+
+_semantic_cache = None
+
+def get_semantic_cache(
+    redis_client: redis.Redis = Depends(get_redis_client),
+    embedding_engine: SentenceTransformer = Depends(embedding_engine.get_embedding_engine)
+) -> SemanticQueryCache | None:
+    """Process-wide, since each instance mirrors the cached embeddings locally."""
+    global _semantic_cache
+    if not semantic_cache_config.ENABLED:
+        return None
+    if _semantic_cache is None:
+        _semantic_cache = SemanticQueryCache(
+            redis_client,
+            embedding_engine,
+            threshold=semantic_cache_config.THRESHOLD,
+            ttl_seconds=semantic_cache_config.TTL_SECONDS,
+            max_entries=semantic_cache_config.MAX_ENTRIES
+        )
+    return _semantic_cache
+
+_single_flight = None
+
+def get_single_flight(redis_client: redis.Redis = Depends(get_redis_client)) -> SingleFlight | None:
+    """Process-wide, so concurrent requests in this worker share in-flight work."""
+    global _single_flight
+    if not single_flight_config.ENABLED:
+        return None
+    if _single_flight is None:
+        _single_flight = SingleFlight(
+            redis_client,
+            lock_ttl_seconds=single_flight_config.LOCK_TTL_SECONDS,
+            result_ttl_seconds=single_flight_config.RESULT_TTL_SECONDS,
+            wait_timeout=single_flight_config.WAIT_TIMEOUT_SECONDS,
+            heartbeat_seconds=single_flight_config.HEARTBEAT_SECONDS
+        )
+    return _single_flight
+
+def get_action_cache(redis_client: redis.Redis = Depends(get_redis_client)) -> ActionResultCache | None:
+    if not action_cache_config.ENABLED:
+        return None
+    return ActionResultCache(redis_client, ttl_seconds=action_cache_config.TTL_SECONDS)
+
+_query_router = None
+
+def get_query_router(
+    embedding_engine: SentenceTransformer = Depends(embedding_engine.get_embedding_engine)
+) -> QueryRouter | None:
+    """Process-wide, so the classifier's reference embeddings are computed once."""
+    global _query_router
+    if not fast_path_config.ENABLED:
+        return None
+    if _query_router is None:
+        _query_router = QueryRouter(
+            embedding_engine,
+            filter_threshold=fast_path_config.FILTER_THRESHOLD,
+            vector_threshold=fast_path_config.VECTOR_THRESHOLD,
+            max_vector_words=fast_path_config.MAX_VECTOR_WORDS
+        )
+    return _query_router
+
+_llm_limiter = None
+
+def get_llm_limiter(redis_client: redis.Redis = Depends(get_redis_client)) -> LLMLimiter | None:
+    """Process-wide, since it holds this worker's queue of waiting calls."""
+    global _llm_limiter
+    if not llm_limit_config.ENABLED:
+        return None
+    if _llm_limiter is None:
+        _llm_limiter = LLMLimiter(
+            redis_client,
+            requests_per_minute=llm_limit_config.REQUESTS_PER_MINUTE,
+            tokens_per_minute=llm_limit_config.TOKENS_PER_MINUTE,
+            tokens_per_call_estimate=llm_limit_config.TOKENS_PER_CALL_ESTIMATE
+        )
+    return _llm_limiter
+
+_llm_client = None
+
+def get_llm_client(
+    client: AsyncOpenAI = Depends(get_llm),
+    limiter: LLMLimiter | None = Depends(get_llm_limiter)
+) -> LLMClient:
+    global _llm_client
+    if _llm_client is None:
+        _llm_client = LLMClient(
+            client,
+            first_token_timeout=llm_client_config.FIRST_TOKEN_TIMEOUT_SECONDS,
+            chunk_timeout=llm_client_config.CHUNK_TIMEOUT_SECONDS,
+            max_retries=llm_client_config.MAX_RETRIES,
+            retry_base_delay=llm_client_config.RETRY_BASE_DELAY_SECONDS,
+            hedge_enabled=llm_client_config.HEDGE_ENABLED,
+            limiter=limiter,
+            completion_estimate=llm_limit_config.COMPLETION_ESTIMATE
+        )
+    return _llm_client
+
+_model_router = None
+
+def get_model_router() -> ModelRouter:
+    """Process-wide, so model cooldowns carry across runs."""
+    global _model_router
+    if _model_router is None:
+        _model_router = ModelRouter(
+            default_model=model_routing_config.DEFAULT_MODEL,
+            stage_models=model_routing_config.STAGE_MODELS,
+            policy=model_routing_config.POLICY,
+            latency_budgets_ms=model_routing_config.LATENCY_BUDGETS_MS,
+            cooldown_seconds=model_routing_config.COOLDOWN_SECONDS,
+            latency_window_seconds=model_routing_config.LATENCY_WINDOW_SECONDS
+        )
+    return _model_router
+
+_alias_map = None
+
+def get_alias_map(
+    psql_db_factory: async_sessionmaker[AsyncSession] = Depends(get_db_factory)
+) -> AliasMap | None:
+    """Process-wide, since it holds the alias tables in memory."""
+    global _alias_map
+    if not canonical_config.ENABLED:
+        return None
+    if _alias_map is None:
+        _alias_map = AliasMap(psql_db_factory, refresh_seconds=canonical_config.REFRESH_SECONDS)
+    return _alias_map
+
+_columnar_index = None
+
+def get_columnar_index(
+    psql_db_factory: async_sessionmaker[AsyncSession] = Depends(get_db_factory),
+    aliases: AliasMap | None = Depends(get_alias_map)
+) -> ColumnarIndex | None:
+    """Process-wide, since each worker holds its own in-memory copy."""
+    global _columnar_index
+    if not columnar_index_config.ENABLED:
+        return None
+    if _columnar_index is None:
+        _columnar_index = ColumnarIndex(
+            psql_db_factory,
+            refresh_seconds=columnar_index_config.REFRESH_SECONDS,
+            rebuild_seconds=columnar_index_config.REBUILD_SECONDS,
+            check_rate=columnar_index_config.CHECK_RATE,
+            aliases=aliases
+        )
+    return _columnar_index
+
+def get_profile_json_loader(
+    psql_db_factory: async_sessionmaker[AsyncSession] = Depends(get_db_factory)
+) -> ProfileJSONLoader | None:
+    if not profile_json_config.ENABLED:
+        return None
+    return ProfileJSONLoader(psql_db_factory)
+
+_profile_documents = None
+
+def get_profile_documents(
+    psql_db_factory: async_sessionmaker[AsyncSession] = Depends(get_db_factory)
+) -> ProfileDocumentStore | None:
+    """Process-wide, so each worker runs at most one refresher."""
+    global _profile_documents
+    if not profile_documents_config.ENABLED:
+        return None
+    if _profile_documents is None:
+        _profile_documents = ProfileDocumentStore(psql_db_factory, refresh_seconds=profile_documents_config.REFRESH_SECONDS)
+    return _profile_documents
+
+_shared_profile_cache = None
+
+def get_shared_profile_cache(settings: Config = Depends(get_settings)) -> SharedProfileCache | None:
+    """Process-wide, on its own pool: entries are binary, so responses are not decoded."""
+    global _shared_profile_cache
+    # Without the per-worker cache nothing tails profile_changes to invalidate it.
+    if not (shared_profile_cache_config.ENABLED and profile_cache_config.ENABLED):
+        return None
+    if _shared_profile_cache is None:
+        _shared_profile_cache = SharedProfileCache(
+            redis.from_url(settings.REDIS_URL),
+            ttl_seconds=shared_profile_cache_config.TTL_SECONDS
+        )
+    return _shared_profile_cache
+
+_profile_cache = None
+
+def get_profile_cache(
+    redis_client: redis.Redis = Depends(get_redis_client),
+    psql_db_factory: async_sessionmaker[AsyncSession] = Depends(get_db_factory),
+    shared_profile_cache: SharedProfileCache | None = Depends(get_shared_profile_cache)
+) -> ProfileCache | None:
+    """Process-wide: the cache lives in each worker's memory."""
+    global _profile_cache
+    if not profile_cache_config.ENABLED:
+        return None
+    if _profile_cache is None:
+        _profile_cache = ProfileCache(
+            redis_client,
+            psql_db_factory,
+            max_entries=profile_cache_config.MAX_ENTRIES,
+            ttl_seconds=profile_cache_config.TTL_SECONDS,
+            watch_seconds=profile_cache_config.WATCH_SECONDS,
+            shared=shared_profile_cache
+        )
+    return _profile_cache
+
 def get_astralis(
     settings: Config = Depends(get_settings),
     client: AsyncOpenAI = Depends(get_llm),
     psql_db_factory: async_sessionmaker[AsyncSession] = Depends(get_db_factory),
     rag_service: RAGService = Depends(get_rag_service),
     prompt_manager: PromptManager = Depends(get_prompt_manager),
-    redis_client: redis.Redis = Depends(get_redis_client)
+    redis_client: redis.Redis = Depends(get_redis_client),
+    llm_cache: LLMResponseCache | None = Depends(get_llm_cache),
+    semantic_cache: SemanticQueryCache | None = Depends(get_semantic_cache),
+    single_flight: SingleFlight | None = Depends(get_single_flight),
+    action_cache: ActionResultCache | None = Depends(get_action_cache),
+    query_router: QueryRouter | None = Depends(get_query_router),
+    model_router: ModelRouter = Depends(get_model_router),
+    llm: LLMClient = Depends(get_llm_client),
+    columnar_index: ColumnarIndex | None = Depends(get_columnar_index),
+    aliases: AliasMap | None = Depends(get_alias_map),
+    profile_json: ProfileJSONLoader | None = Depends(get_profile_json_loader),
+    profile_documents: ProfileDocumentStore | None = Depends(get_profile_documents),
+    profile_cache: ProfileCache | None = Depends(get_profile_cache),
+    shared_profile_cache: SharedProfileCache | None = Depends(get_shared_profile_cache)
 ) -> Astralis:
     return Astralis(
         model=settings.OPENAI_MODEL,
@@ -86,5 +339,18 @@ def get_astralis(
         psql_db=psql_db_factory,
         rag_service=rag_service,
         prompt_manager=prompt_manager,
-        redis_client=redis_client
+        redis_client=redis_client,
+        llm_cache=llm_cache,
+        semantic_cache=semantic_cache,
+        single_flight=single_flight,
+        action_cache=action_cache,
+        query_router=query_router,
+        model_router=model_router,
+        llm=llm,
+        columnar_index=columnar_index,
+        aliases=aliases,
+        profile_json=profile_json,
+        profile_documents=profile_documents,
+        profile_cache=profile_cache,
+        shared_profile_cache=shared_profile_cache
     )
@@ -23,3 +23,6 @@ class QueryResponse(BaseModel):
 
 class SessionCreateRequest(BaseModel):
     user_id: str
+
+class ProfileInvalidateRequest(BaseModel):
+    user_ids: List[str]
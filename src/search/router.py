@@ -1,8 +1,12 @@
 # src/search/router.py
 
 import json
+import math
 import uuid
+import base64
 import asyncio
+import binascii
+from datetime import datetime
 
 from sqlalchemy import select, and_, or_, func, text, inspect 
 from sqlalchemy.orm import selectinload, aliased
@@ -11,11 +15,23 @@ from database.models import User
 from search.agents.astralis import Astralis
 from fastapi.responses import StreamingResponse
 from search.services.rag_service import RAGService
-from typing import Optional, AsyncGenerator, Dict, Any 
-from search.models import QueryRequest, SessionCreateRequest
-from fastapi import APIRouter, Depends, Header, HTTPException 
+from typing import Optional, AsyncGenerator, Dict, Any, List, Tuple
+from search.models import QueryRequest, SessionCreateRequest, ProfileInvalidateRequest
+from fastapi import APIRouter, Depends, Header, HTTPException, Query, Response
 from sqlalchemy.ext.asyncio import async_sessionmaker, AsyncSession
-from search.dependencies import get_astralis, get_rag_service, get_db_factory
+from search.dependencies import (
+    get_astralis, get_rag_service, get_db_factory, get_redis_client, get_llm_limiter, get_profile_documents,
+    get_profile_cache
+)
+from search.services.llm_limiter import LLMLimiter, PRIORITY_INTERACTIVE
+from search.config import llm_limit_config
+from search.services.index_version import bump_index_version
+import redis.asyncio as redis
+from search.services.metrics import metrics
+from search.services.profile_json import dumps_event
+from search.services.profile_documents import ProfileDocumentStore
+from search.services.profile_cache import ProfileCache
+from database.read_models import Profile, load_profiles
 
 
 router = APIRouter(prefix="/search", tags=["search"])
@@ -25,23 +41,170 @@ async def hello():
     return { "message": "Hello from search api v1.0.1 with Sessions!" }
 
 
+@router.get("/metrics")
+async def get_metrics():
+    """Counters, hit rates and latency summaries for this worker."""
+    return metrics.snapshot()
+
+
+@router.post("/index/invalidate")
+async def invalidate_index_caches(
+    redis_client: redis.Redis = Depends(get_redis_client),
+    profile_cache: ProfileCache | None = Depends(get_profile_cache)
+):
+    """
+    Called by the indexing pipeline after profiles are re-indexed. Bumps the
+    index version, which invalidates every version-stamped search cache, and
+    clears every worker's profile cache.
+    """
+    version = await bump_index_version(redis_client)
+    if profile_cache:
+        await profile_cache.publish()
+    return { "index_version": version }
+
+
+@router.post("/profiles/invalidate")
+async def invalidate_profiles(
+    request: ProfileInvalidateRequest,
+    profile_cache: ProfileCache | None = Depends(get_profile_cache)
+):
+    """Drops the given profiles from every worker's profile cache, for writers that bypass profile_changes."""
+    if profile_cache:
+        await profile_cache.publish(request.user_ids)
+    return { "invalidated": len(request.user_ids) }
+
+
+SESSION_MESSAGE_COLUMNS = ("id", "session_id", "role", "content", "created_at")
+SESSION_PAGE_DEFAULT_LIMIT = 100
+SESSION_PAGE_MAX_LIMIT = 500
+
+
+def _encode_cursor(created_at: datetime, message_id: Any) -> str:
+    payload = json.dumps([created_at.isoformat(), message_id], default=str)
+    return base64.urlsafe_b64encode(payload.encode()).decode().rstrip("=")
+
+
+def _decode_cursor(cursor: str) -> Tuple[datetime, Any]:
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        created_at, message_id = json.loads(base64.urlsafe_b64decode(padded.encode()))
+        return datetime.fromisoformat(created_at), message_id
+    except (ValueError, TypeError, binascii.Error) as e:
+        raise HTTPException(status_code=400, detail=f"Invalid cursor: {e}")
+
+
+def _parse_fields(fields: Optional[str]) -> List[str]:
+    if not fields:
+        return list(SESSION_MESSAGE_COLUMNS)
+
+    requested = [f.strip() for f in fields.split(",") if f.strip()]
+    invalid = [f for f in requested if f not in SESSION_MESSAGE_COLUMNS]
+    if invalid:
+        raise HTTPException(
+            status_code=400,
+            detail=f"Invalid fields {invalid}. Allowed: {list(SESSION_MESSAGE_COLUMNS)}"
+        )
+    return requested
+
+
+def _session_messages_query(columns: List[str], after: Optional[str], limit: Optional[int]):
+    # created_at and id are always selected so the next cursor can be built,
+    # they are dropped again from the row if the caller did not ask for them.
+    selected = list(dict.fromkeys(columns + ["created_at", "id"]))
+    params: Dict[str, Any] = {}
+
+    keyset = ""
+    if after:
+        params["after_created_at"], params["after_id"] = _decode_cursor(after)
+        keyset = "AND (created_at, id) > (:after_created_at, :after_id)"
+
+    page = ""
+    if limit is not None:
+        params["limit"] = limit
+        page = "LIMIT :limit"
+
+    query = text(f"""
+        SELECT {", ".join(selected)} FROM chat_messages
+        WHERE session_id = :session_id
+        {keyset}
+        ORDER BY created_at, id
+        {page};
+    """)
+    return query, params
+
+
+def _project_message(row: Dict[str, Any], columns: List[str]) -> Dict[str, Any]:
+    message = {}
+    for column in columns:
+        value = row[column]
+        if isinstance(value, datetime):
+            value = value.isoformat()
+        elif isinstance(value, uuid.UUID):
+            value = str(value)
+        message[column] = value
+    return message
+
+
 @router.get("/sessions/{session_id}")
 async def get_session(
     session_id: str,
+    response: Response,
+    limit: Optional[int] = Query(None, ge=1, le=SESSION_PAGE_MAX_LIMIT),
+    after: Optional[str] = None,
+    fields: Optional[str] = None,
+    output: str = Query("json", alias="format", pattern="^(json|ndjson)$"),
     driver: async_sessionmaker[AsyncSession] = Depends(get_db_factory)
 ):
+    """
+    Returns a session's messages ordered by (created_at, id).
+
+    json:   without `limit`, every message after `after` (the whole session by
+            default). With `limit`, one page of at most `limit` messages; the
+            cursor for the next page is returned in the X-Next-Cursor header
+            (absent on the last page).
+    ndjson: streams every message after `after` (up to `limit` if given) one
+            JSON object per line, without materializing the session in memory.
+    """
+    columns = _parse_fields(fields)
+
+    if output == "ndjson":
+        query, params = _session_messages_query(columns, after, limit)
+        params["session_id"] = session_id
+
+        async def ndjson_generator() -> AsyncGenerator[str, None]:
+            async with driver() as session:
+                result = await session.stream(
+                    query.execution_options(yield_per=SESSION_PAGE_DEFAULT_LIMIT),
+                    params
+                )
+                async for row in result.mappings():
+                    yield json.dumps(_project_message(row, columns)) + "\n"
+
+        return StreamingResponse(ndjson_generator(), media_type="application/x-ndjson")
+
+    if limit is None:
+        query, params = _session_messages_query(columns, after, None)
+        params["session_id"] = session_id
+        async with driver() as session:
+            rows = (await session.execute(query, params)).mappings().all()
+        return [_project_message(row, columns) for row in rows]
+
+    page_size = limit
+    # Fetch one extra row to know whether another page exists.
+    query, params = _session_messages_query(columns, after, page_size + 1)
+    params["session_id"] = session_id
+
     async with driver() as session:
-        result = await session.execute(
-            text("""
-                SELECT * FROM chat_messages
-                WHERE session_id = :session_id
-                ORDER BY created_at;
-            """),
-            { "session_id": session_id }
-        )
-    messages = result.mappings().all()
+        result = await session.execute(query, params)
+        rows = result.mappings().all()
+
+    has_more = len(rows) > page_size
+    rows = rows[:page_size]
+    if has_more:
+        last = rows[-1]
+        response.headers["X-Next-Cursor"] = _encode_cursor(last["created_at"], last["id"])
 
-    return messages
+    return [_project_message(row, columns) for row in rows]
 
 
 @router.post("/sessions")
@@ -67,16 +230,29 @@ async def create_session(
 @router.post("/query")
 async def search(
     request: QueryRequest,
-    agent: Astralis = Depends(get_astralis)
+    agent: Astralis = Depends(get_astralis),
+    limiter: LLMLimiter | None = Depends(get_llm_limiter)
 ):
     query = request.query
     session_id = request.session_id
+
+    # Admission control: reject now rather than stream a run that would stall in the LLM queue.
+    if limiter:
+        wait = await limiter.estimated_wait(PRIORITY_INTERACTIVE)
+        if wait > llm_limit_config.ADMISSION_MAX_WAIT_SECONDS:
+            metrics.incr("llm_limiter.rejected")
+            print(f"[WARN] Rejecting search for session {session_id}: estimated LLM queue wait {wait:.1f}s")
+            raise HTTPException(
+                status_code=429,
+                detail="Search is busy, please retry shortly.",
+                headers={ "Retry-After": str(math.ceil(wait)) }
+            )
     async def event_generator() -> AsyncGenerator[str, None]:
         """Generate server-sent events with proper formatting and session context."""
         try:
             async for output in agent.run(query, session_id=session_id):
                 try:
-                    output_json = json.dumps(output)
+                    output_json = dumps_event(output)
                     yield f"data: {output_json}\n\n"
                 except TypeError as e:
                      print(f"[ERROR] Failed to serialize output chunk to JSON: {e} - Chunk: {output}")
@@ -137,28 +313,22 @@ async def test(agent: Astralis = Depends(get_astralis)):
 
 async def _get_user_profile(
     user_id: str,
-    psql_db_factory: async_sessionmaker[AsyncSession]
-) -> User | None:
+    psql_db_factory: async_sessionmaker[AsyncSession],
+    profile_documents: ProfileDocumentStore | None = None
+) -> Profile | None:
     print(f"Fetching profile for user_id: {user_id}")
-    query = (
-        select(User)
-        .options(
-            selectinload(User.projects),
-            selectinload(User.educations),
-            selectinload(User.experiences),
-            selectinload(User.skills)
-        )
-        .where(User.user_id == user_id)
-    )
+    if profile_documents:
+        document = await profile_documents.get(user_id)
+        if document:
+            return document
 
     async with psql_db_factory() as session:
         try:
-            result = await session.execute(query)
-            user = result.scalars().first()
-            if not user:
+            profiles = await load_profiles(session, [user_id])
+            if user_id not in profiles:
                 print(f"[INFO] User profile not found for id: {user_id}")
                 return None
-            return user
+            return profiles[user_id]
         except Exception as e:
             print(f"[ERROR] Database error fetching profile {user_id}: {e}")
             raise HTTPException(status_code=500, detail=f"Database error fetching profile {user_id}")
@@ -166,7 +336,8 @@ async def _get_user_profile(
 @router.get("/graph")
 async def graph(
     rag_service: RAGService = Depends(get_rag_service),
-    psql_db_factory: async_sessionmaker[AsyncSession] = Depends(get_db_factory)
+    psql_db_factory: async_sessionmaker[AsyncSession] = Depends(get_db_factory),
+    profile_documents: ProfileDocumentStore | None = Depends(get_profile_documents)
 ):
     query = """
     MATCH (p:Person)-[:HAS_EXPERIENCE]->(e1:Experience)
@@ -196,15 +367,15 @@ async def graph(
     if not unique_user_ids:
         return []
 
-    tasks = [_get_user_profile(uid, psql_db_factory) for uid in unique_user_ids]
+    tasks = [_get_user_profile(uid, psql_db_factory, profile_documents) for uid in unique_user_ids]
     fetched_users_results = await asyncio.gather(*tasks, return_exceptions=True)
 
     fetched_users = []
     for i, result in enumerate(fetched_users_results):
-        if isinstance(result, User):
-            fetched_users.append(result)
-        elif isinstance(result, Exception):
+        if isinstance(result, Exception):
             print(f"[ERROR] Failed to fetch profile for user_id {unique_user_ids[i]}: {result}")
+        elif result is not None:
+            fetched_users.append(result.to_dict())
 
     return fetched_users
 
@@ -0,0 +1,41 @@
+# src/search/services/action_cache.py
+
+import json
+import redis.asyncio as redis
+from typing import Any, Optional
+from search.services.metrics import metrics
+from search.services.index_version import get_index_version
+
+ACTION_CACHE_PREFIX = "actioncache:v{version}:"
+
+
+class ActionResultCache:
+    """
+    Short-lived, cross-session cache of retrieval results (vector and graph
+    user ids). Keys carry the search index version, so re-indexing profiles
+    makes every entry unreachable without a scan.
+    """
+
+    def __init__(self, redis_client: redis.Redis, ttl_seconds: int):
+        self.redis_client = redis_client
+        self.ttl_seconds = ttl_seconds
+
+    async def _versioned(self, key: str) -> str:
+        version = await get_index_version(self.redis_client)
+        return ACTION_CACHE_PREFIX.format(version=version) + key
+
+    async def get(self, key: str) -> Optional[Any]:
+        try:
+            cached = await self.redis_client.get(await self._versioned(key))
+        except redis.exceptions.RedisError as e:
+            print(f"[ERROR] Redis error reading action cache: {e}")
+            return None
+
+        metrics.incr(f"action_cache.{'hit' if cached is not None else 'miss'}")
+        return json.loads(cached) if cached is not None else None
+
+    async def set(self, key: str, result: Any):
+        try:
+            await self.redis_client.set(await self._versioned(key), json.dumps(result), ex=self.ttl_seconds)
+        except (TypeError, redis.exceptions.RedisError) as e:
+            print(f"[ERROR] Failed to write action cache: {e}")
@@ -0,0 +1,295 @@
+# src/search/services/canonical.py
+
+"""
+Canonical companies, job titles and skills.
+
+Raw profile strings are normalized ("Google LLC" -> "google", "Sr. Eng" ->
+"senior engineer", "JS" -> "javascript") and grouped into canonical entities
+(migration 0004). Every normalized spelling found in the data, plus the
+curated SEED_ALIASES, is stored as an alias of its entity, and experiences and
+skills rows carry the entity ids. AliasMap resolves filter values through the
+aliases in memory, so filter_structured compares indexed integer ids instead
+of scanning strings. Rows inserted since the last rebuild, and rows whose raw
+value was edited since (migration 0007 clears their id), have NULL ids and
+are matched on their raw strings until the next rebuild.
+
+Usage (from src/), after importing profiles and then periodically:
+    python -m search.services.canonical
+
+Rebuilding is idempotent: entity ids are stable across runs and only rows
+whose id changed are updated.
+"""
+
+import re
+import time
+import asyncio
+import unicodedata
+from collections import Counter
+from typing import Dict, List, Optional, Set, Tuple
+from sqlalchemy import select, func, text
+from sqlalchemy.dialects.postgresql import insert
+from sqlalchemy.ext.asyncio import async_sessionmaker, AsyncSession
+from database.models import Experience, Skill, CanonicalEntity, EntityAlias
+from database.client import get_async_session_factory
+from search.services.metrics import metrics
+
+COMPANY = "company"
+TITLE = "title"
+SKILL = "skill"
+
+# kind -> (raw column, canonical id column)
+SOURCES = {
+    COMPANY: (Experience.company_name, Experience.canonical_company_id),
+    TITLE: (Experience.job_title, Experience.canonical_title_id),
+    SKILL: (Skill.skill_name, Skill.canonical_skill_id),
+}
+
+# Whole-value aliases, normalized form -> canonical key.
+SEED_ALIASES = {
+    COMPANY: {
+        "alphabet": "google",
+        "google deepmind": "deepmind",
+        "facebook": "meta",
+        "meta platforms": "meta",
+        "aws": "amazon web services",
+        "msft": "microsoft",
+        "ibm research": "ibm",
+        "x": "twitter",
+    },
+    TITLE: {
+        "swe": "software engineer",
+        "sde": "software engineer",
+        "software development engineer": "software engineer",
+        "mle": "machine learning engineer",
+        "pm": "product manager",
+        "em": "engineering manager",
+    },
+    SKILL: {
+        "js": "javascript",
+        "ecmascript": "javascript",
+        "ts": "typescript",
+        "py": "python",
+        "python3": "python",
+        "golang": "go",
+        "k8s": "kubernetes",
+        "postgres": "postgresql",
+        "psql": "postgresql",
+        "ml": "machine learning",
+        "dl": "deep learning",
+        "ai": "artificial intelligence",
+        "nlp": "natural language processing",
+        "reactjs": "react",
+        "react.js": "react",
+        "nodejs": "node.js",
+        "node": "node.js",
+        "vuejs": "vue",
+        "vue.js": "vue",
+        "nextjs": "next.js",
+        "tf": "tensorflow",
+        "sklearn": "scikit-learn",
+        "gcp": "google cloud",
+        "aws": "amazon web services",
+        "cpp": "c++",
+        "c sharp": "c#",
+        "csharp": "c#",
+    },
+}
+
+# Legal-form words dropped from the end of company names.
+_COMPANY_SUFFIXES = { "inc", "incorporated", "llc", "ltd", "limited", "corp", "corporation", "co", "gmbh", "plc", "ag", "sa", "bv" }
+# Word-level expansions inside job titles.
+_TITLE_WORDS = {
+    "sr": "senior",
+    "snr": "senior",
+    "jr": "junior",
+    "eng": "engineer",
+    "engr": "engineer",
+    "dev": "developer",
+    "mgr": "manager",
+    "mgmt": "management",
+    "vp": "vice president",
+    "svp": "senior vice president",
+    "cto": "chief technology officer",
+    "ceo": "chief executive officer",
+    "cfo": "chief financial officer",
+    "coo": "chief operating officer",
+    "ml": "machine learning",
+    "ai": "artificial intelligence",
+}
+# Keep the characters that carry meaning in skills and titles: c++, c#, node.js.
+_SEPARATORS = re.compile(r"[^\w+#.]+")
+
+MAX_RESOLVED_IDS = 1000  # Broader title matches fall back to substring filtering
+MAX_CACHED_RESOLUTIONS = 4096
+BATCH_SIZE = 5000  # Rows per INSERT, under asyncpg's bind parameter limit
+
+
+def normalize(kind: str, value: str) -> str:
+    """Lowercased, punctuation-insensitive form of a raw value."""
+    text_value = unicodedata.normalize("NFKC", value).lower()
+    words = [word.strip(".") for word in _SEPARATORS.split(text_value)]
+    words = [word for word in words if word]
+    if kind == COMPANY:
+        if len(words) > 1 and words[0] == "the":
+            words = words[1:]
+        while len(words) > 1 and words[-1] in _COMPANY_SUFFIXES:
+            words = words[:-1]
+    elif kind == TITLE:
+        words = " ".join(_TITLE_WORDS.get(word, word) for word in words).split()
+    return " ".join(words)
+
+
+def canonical_key(kind: str, value: str) -> str:
+    """The key of the entity a raw value belongs to."""
+    normalized = normalize(kind, value)
+    return SEED_ALIASES[kind].get(normalized, normalized)
+
+
+class AliasMap:
+    """
+    In-memory alias tables for resolving filter values to canonical ids.
+
+    Companies and skills resolve only on an exact alias, so "google" matches
+    Google LLC but not "Googleplex Cafe". Titles resolve to every canonical
+    title containing all of the filter's words ("sr eng" -> "senior engineer",
+    "senior backend engineer", ...). Unknown values resolve to None and are
+    filtered on the raw strings. The tables load in the background and reload
+    every `refresh_seconds`; until the first load, nothing resolves.
+    """
+
+    def __init__(self, session_factory: async_sessionmaker[AsyncSession], refresh_seconds: float = 300.0):
+        self.session_factory = session_factory
+        self.refresh_seconds = refresh_seconds
+        self._aliases: Dict[str, Dict[str, int]] = {}
+        self._title_words: List[Tuple[Set[str], int]] = []
+        self._resolved: Dict[Tuple[str, str], Optional[List[int]]] = {}
+        self._loaded_at = 0.0
+        self._loading: Optional[asyncio.Task] = None
+
+    def resolve(self, kind: str, value: str) -> Optional[List[int]]:
+        """Canonical ids matching a filter value, or None to filter on raw strings."""
+        self._schedule_refresh()
+        if kind not in SOURCES or not self._aliases:
+            return None
+        normalized = normalize(kind, value)
+        cached = self._resolved.get((kind, normalized), False)
+        if cached is not False:
+            return cached
+
+        if kind == TITLE:
+            words = set(canonical_key(kind, value).split())
+            ids = [entity_id for title_words, entity_id in self._title_words if words and words <= title_words]
+        else:
+            aliases = self._aliases.get(kind, {})
+            entity_id = aliases.get(normalized, aliases.get(canonical_key(kind, value)))
+            ids = [entity_id] if entity_id is not None else []
+        if not ids or len(ids) > MAX_RESOLVED_IDS:
+            ids = None
+        metrics.incr(f"canonical.{kind}.{'resolved' if ids else 'unresolved'}")
+        if len(self._resolved) >= MAX_CACHED_RESOLUTIONS:
+            self._resolved.clear()
+        self._resolved[(kind, normalized)] = ids
+        return ids
+
+    def _schedule_refresh(self):
+        if self._loading is not None and not self._loading.done():
+            return
+        if self._loaded_at and time.monotonic() - self._loaded_at < self.refresh_seconds:
+            return
+        try:
+            self._loading = asyncio.get_running_loop().create_task(self.load())
+        except RuntimeError:
+            # Not called from the event loop (e.g. a snapshot build thread); the next call will load.
+            pass
+
+    async def load(self):
+        try:
+            async with self.session_factory() as session:
+                alias_rows = (await session.execute(select(EntityAlias.kind, EntityAlias.alias, EntityAlias.entity_id))).all()
+                title_rows = (await session.execute(
+                    select(CanonicalEntity.key, CanonicalEntity.entity_id).where(CanonicalEntity.kind == TITLE)
+                )).all()
+        except Exception as e:
+            print(f"[ERROR] Failed to load canonical aliases: {e}")
+            return
+        finally:
+            self._loaded_at = time.monotonic()
+
+        aliases: Dict[str, Dict[str, int]] = {}
+        for kind, alias, entity_id in alias_rows:
+            aliases.setdefault(kind, {})[alias] = entity_id
+        self._title_words = [(set(key.split()), entity_id) for key, entity_id in title_rows]
+        self._aliases = aliases
+        self._resolved = {}
+        print(f"[CANONICAL]: Loaded {len(alias_rows)} aliases for {len(aliases)} kinds.")
+
+
+async def rebuild(session: AsyncSession) -> Dict[str, Dict[str, int]]:
+    """Rebuilds entities and aliases from the profile data and backfills the id columns."""
+    stats = {}
+    for kind, (raw_column, id_column) in SOURCES.items():
+        result = await session.execute(
+            select(raw_column, func.count()).where(raw_column.isnot(None)).group_by(raw_column)
+        )
+        spellings: Dict[str, Counter] = {}
+        raw_keys: Dict[str, str] = {}  # Stored value, padding and all -> entity key
+        for raw, count in result.all():
+            key = canonical_key(kind, raw)
+            if key:
+                spellings.setdefault(key, Counter())[raw.strip()] += count
+                raw_keys[raw] = key
+
+        entity_ids: Dict[str, int] = {}
+        entities = [
+            { "kind": kind, "key": key, "name": counts.most_common(1)[0][0] }
+            for key, counts in spellings.items()
+        ]
+        for i in range(0, len(entities), BATCH_SIZE):
+            statement = insert(CanonicalEntity).values(entities[i:i + BATCH_SIZE])
+            statement = statement.on_conflict_do_update(
+                index_elements=[CanonicalEntity.kind, CanonicalEntity.key],
+                set_={ "name": statement.excluded.name }
+            ).returning(CanonicalEntity.key, CanonicalEntity.entity_id)
+            entity_ids.update((await session.execute(statement)).all())
+
+        aliases = { key: entity_ids[key] for key in entity_ids }
+        for key, counts in spellings.items():
+            for raw in counts:
+                aliases[normalize(kind, raw)] = entity_ids[key]
+        for alias, key in SEED_ALIASES[kind].items():
+            if key in entity_ids:
+                aliases[alias] = entity_ids[key]
+        alias_rows = [{ "kind": kind, "alias": alias, "entity_id": entity_id } for alias, entity_id in aliases.items()]
+        for i in range(0, len(alias_rows), BATCH_SIZE):
+            statement = insert(EntityAlias).values(alias_rows[i:i + BATCH_SIZE])
+            await session.execute(statement.on_conflict_do_update(
+                index_elements=[EntityAlias.kind, EntityAlias.alias],
+                set_={ "entity_id": statement.excluded.entity_id }
+            ))
+
+        # Rows are matched on their stored value exactly, as grouped above, so
+        # padding is handled by Python's strip() alone. Only rows whose id
+        # changes are written, so re-runs touch little.
+        raws = list(raw_keys)
+        table = raw_column.class_.__tablename__
+        result = await session.execute(
+            text(f"""
+                UPDATE {table} AS t SET {id_column.key} = m.entity_id
+                FROM unnest(CAST(:raws AS text[]), CAST(:ids AS integer[])) AS m(raw, entity_id)
+                WHERE t.{raw_column.key} = m.raw AND t.{id_column.key} IS DISTINCT FROM m.entity_id
+            """),
+            { "raws": raws, "ids": [entity_ids[raw_keys[raw]] for raw in raws] }
+        )
+        await session.commit()
+        stats[kind] = { "entities": len(entity_ids), "aliases": len(aliases), "rows_updated": result.rowcount }
+        print(f"[CANONICAL] {kind}: {stats[kind]}")
+    return stats
+
+
+async def main():
+    async with get_async_session_factory()() as session:
+        await rebuild(session)
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
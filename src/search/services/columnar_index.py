@@ -0,0 +1,448 @@
+# src/search/services/columnar_index.py
+
+import time
+import random
+import asyncio
+import numpy as np
+from datetime import date
+from typing import Any, Dict, List, Optional, Set, Tuple
+from sqlalchemy import select, text
+from sqlalchemy.ext.asyncio import async_sessionmaker, AsyncSession
+from database.models import User, Experience, Skill
+from database.profile_changes import prune
+from search.services.metrics import metrics
+from search.services.filter_compiler import (
+    FILTER_FIELDS, GROUP_AND, GROUP_OR, GROUP_NOT, PRESENT, FilterField, compile_filters, parse_date
+)
+from search.services.canonical import AliasMap
+
+EPOCH = date(1970, 1, 1)
+NULL_DAY = np.iinfo(np.int32).min  # A NULL date; below every real day, so it never passes a lower bound
+
+# Columns held per table. Text columns are dictionary-encoded (lowercased),
+# date columns are stored as days since the epoch and canonical entity ids as
+# is (0 for NULL). Users carry no columns; they record which user_ids exist.
+TABLES = {
+    User: { "text": [], "dates": [], "ids": [] },
+    Experience: {
+        "text": ["company_name", "job_title", "location"],
+        "dates": ["start_date", "end_date"],
+        "ids": ["canonical_company_id", "canonical_title_id"],
+    },
+    Skill: { "text": ["skill_name"], "dates": [], "ids": ["canonical_skill_id"] },
+}
+
+MAX_INCREMENTAL_USERS = 20000  # Beyond this many changed users a full reload is cheaper
+LOAD_BATCH_SIZE = 5000  # user_ids per IN (...) when loading changed users
+MAX_CACHED_MATCHES = 512  # Memoized substring matches per snapshot
+
+
+class _Unsupported(Exception):
+    """The filters use a field or value the index cannot evaluate; the SQL path must."""
+
+
+class _Dictionary:
+    """Append-only dictionary of lowercased strings. Code 0 is NULL."""
+
+    def __init__(self):
+        self.codes: Dict[str, int] = {}
+        self.values: List[str] = [""]
+
+    def encode(self, value: Optional[str]) -> int:
+        if value is None:
+            return 0
+        key = value.lower()
+        code = self.codes.get(key)
+        if code is None:
+            code = len(self.values)
+            self.codes[key] = code
+            self.values.append(key)
+        return code
+
+
+class _Table:
+    """One table's columns, sorted by user code, with per-user row offsets."""
+
+    def __init__(self, user: np.ndarray, columns: Dict[str, np.ndarray], n_users: int):
+        order = np.argsort(user, kind="stable")
+        self.user = user[order]
+        self.columns = { name: values[order] for name, values in columns.items() }
+        self.offsets = np.concatenate(([0], np.cumsum(np.bincount(self.user, minlength=n_users)))).astype(np.int64)
+
+    def __len__(self):
+        return len(self.user)
+
+    def has_rows(self, codes: np.ndarray) -> np.ndarray:
+        valid = (codes >= 0) & (codes < len(self.offsets) - 1)
+        safe = np.where(valid, codes, 0)
+        return valid & (self.offsets[safe + 1] > self.offsets[safe])
+
+    def rows_for(self, codes: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+        """Row indices of the given users, and which position in `codes` owns each row."""
+        valid = (codes >= 0) & (codes < len(self.offsets) - 1)
+        safe = np.where(valid, codes, 0)
+        starts = self.offsets[safe]
+        counts = np.where(valid, self.offsets[safe + 1] - starts, 0)
+        owner = np.repeat(np.arange(len(codes)), counts)
+        run_starts = np.repeat(np.cumsum(counts) - counts, counts)
+        rows = np.repeat(starts, counts) + (np.arange(len(owner)) - run_starts)
+        return rows, owner
+
+
+class _Snapshot:
+    """An immutable view of the index; refreshes build a new one and swap it in."""
+
+    def __init__(self, user_codes: Dict[str, int], n_users: int, tables: Dict[Any, _Table], dictionaries: Dict[Tuple[Any, str], _Dictionary]):
+        self.user_codes = user_codes
+        self.n_users = n_users
+        self.tables = tables
+        self.dictionaries = dictionaries
+        # Dictionary values as fixed-width arrays, for vectorized substring search.
+        self.lowered = { key: np.array(dictionary.values) for key, dictionary in dictionaries.items() }
+        self._matches: Dict[Tuple[Any, str, str], np.ndarray] = {}
+
+    def filter(self, user_ids: List[str], filters: Any, aliases: Optional[AliasMap] = None) -> List[str]:
+        """The candidates matching the filters, in candidate order. Raises _Unsupported."""
+        candidates = list(dict.fromkeys(user_ids))
+        codes = np.fromiter(
+            (self._user_code(user_id) for user_id in candidates),
+            dtype=np.int64,
+            count=len(candidates)
+        )
+        rows: Dict[Any, Tuple[np.ndarray, np.ndarray]] = {}
+        # Like the SQL path, ids without a users row never match, even under "not".
+        mask = self._evaluate(filters, codes, rows, aliases) & self.tables[User].has_rows(codes)
+        return [user_id for user_id, keep in zip(candidates, mask) if keep]
+
+    def _user_code(self, user_id: str) -> int:
+        code = self.user_codes.get(str(user_id), -1)
+        return code if code < self.n_users else -1
+
+    def _evaluate(self, node: Any, codes: np.ndarray, rows: Dict, aliases: Optional[AliasMap]) -> np.ndarray:
+        mask = np.ones(len(codes), dtype=bool)
+        if isinstance(node, list):
+            for item in node:
+                mask &= self._evaluate(item, codes, rows, aliases)
+            return mask
+        if not isinstance(node, dict) or not node:
+            # SQL drops empty or invalid groups instead of matching nobody.
+            raise _Unsupported(f"invalid filter group {node!r}")
+
+        row_conditions: Dict[Any, List[Tuple[FilterField, Any]]] = {}
+        for key, value in node.items():
+            if key == GROUP_AND:
+                mask &= self._evaluate(value if isinstance(value, list) else [value], codes, rows, aliases)
+            elif key == GROUP_OR:
+                nodes = value if isinstance(value, list) else [value]
+                if not nodes:
+                    raise _Unsupported("empty 'or' group")
+                either = np.zeros(len(codes), dtype=bool)
+                for item in nodes:
+                    either |= self._evaluate(item, codes, rows, aliases)
+                mask &= either
+            elif key == GROUP_NOT:
+                mask &= ~self._evaluate(value, codes, rows, aliases)
+            elif key in FILTER_FIELDS and FILTER_FIELDS[key].model in self.tables:
+                field = FILTER_FIELDS[key]
+                row_conditions.setdefault(field.model, []).append((field, value))
+            else:
+                raise _Unsupported(f"field {key}")
+
+        # Fields on the same table must be satisfied by the same row, as in SQL.
+        for model, conditions in row_conditions.items():
+            if model not in rows:
+                rows[model] = self.tables[model].rows_for(codes)
+            table_rows, owner = rows[model]
+            row_mask = np.ones(len(table_rows), dtype=bool)
+            for field, value in conditions:
+                row_mask &= self._condition(field, value, table_rows, aliases)
+            matched = np.zeros(len(codes), dtype=bool)
+            matched[owner[row_mask]] = True
+            mask &= matched
+        return mask
+
+    def _condition(self, field: FilterField, value: Any, table_rows: np.ndarray, aliases: Optional[AliasMap]) -> np.ndarray:
+        name = field.column.key
+        if name not in self.tables[field.model].columns:
+            raise _Unsupported(f"column {name}")
+        column = self.tables[field.model].columns[name][table_rows]
+
+        if isinstance(value, list) and field.operator != "date_range":
+            if not value:
+                raise _Unsupported(f"empty {name} list")
+            either = np.zeros(len(table_rows), dtype=bool)
+            for item in value:
+                either |= self._condition(field, item, table_rows, aliases)
+            return either
+        if field.operator == "contains":
+            raw = self._substring_codes(field.model, name, _text(value))[column]
+        elif field.operator == "iequals":
+            code = self.dictionaries[(field.model, name)].codes.get(_text(value).lower())
+            raw = column == code if code is not None else np.zeros(len(column), dtype=bool)
+        elif field.operator == "date_range":
+            return _date_mask(field, value, column)
+        else:
+            raise _Unsupported(f"operator {field.operator}")
+
+        if field.canonical is None or aliases is None:
+            return raw
+        kind, id_column = field.canonical
+        ids = aliases.resolve(kind, value)
+        if not ids:
+            return raw
+        canonical = self.tables[field.model].columns[id_column.key][table_rows]
+        # As in SQL: resolved ids, or the raw match for rows not canonicalized yet.
+        return np.isin(canonical, ids) | ((canonical == 0) & raw)
+
+    def _substring_codes(self, model, name: str, value: str) -> np.ndarray:
+        """A lookup table over the column's dictionary: which codes contain `value`."""
+        key = (model, name, value.lower())
+        matches = self._matches.get(key)
+        if matches is None:
+            matches = np.char.find(self.lowered[(model, name)], value.lower()) >= 0
+            matches[0] = False  # NULL never matches
+            if len(self._matches) >= MAX_CACHED_MATCHES:
+                self._matches.clear()
+            self._matches[key] = matches
+        return matches
+
+
+def _text(value: Any) -> str:
+    if isinstance(value, str) and value.strip():
+        return value.strip()
+    raise _Unsupported(f"value {value!r}")
+
+
+def _day(value: Any, end: bool) -> int:
+    parsed = parse_date(value, end=end)
+    if parsed is None:
+        raise _Unsupported(f"date {value!r}")
+    return (parsed - EPOCH).days
+
+
+def _date_mask(field: FilterField, value: Any, column: np.ndarray) -> np.ndarray:
+    """Mirrors filter_compiler's date_range, with NULL_DAY for NULL."""
+    if isinstance(value, str) and value.strip().lower() == PRESENT and field.open_ended:
+        return column == NULL_DAY
+    if isinstance(value, (str, int)):
+        value = { "from": value, "to": value }
+    if not isinstance(value, dict) or not (value.keys() & {"from", "to"}):
+        raise _Unsupported(f"date range {value!r}")
+
+    mask = np.ones(len(column), dtype=bool)
+    if value.get("from") is not None:
+        lower = column >= _day(value["from"], end=False)
+        mask &= (lower | (column == NULL_DAY)) if field.open_ended else lower
+    until = value.get("to")
+    if until is not None and not (field.open_ended and str(until).strip().lower() == PRESENT):
+        mask &= (column <= _day(until, end=True)) & (column != NULL_DAY)
+    return mask
+
+
+class ColumnarIndex:
+    """
+    In-process columnar copy of experiences and skills for filter_structured.
+
+    Text columns are dictionary-encoded into integer arrays, so a substring
+    filter is one vectorized search over the (small) dictionary and one
+    lookup per row, and a filter over a candidate list only touches the
+    candidates' rows. Field semantics come from the filter_compiler registry;
+    filters the index cannot evaluate return None and go to SQL.
+
+    The index loads in the background on first use and refreshes from the
+    profile_changes log (migration 0003), reloading only changed users, with
+    a periodic full reload. Until the first load completes every filter falls
+    back to SQL. A sample of filters is re-run through SQL and mismatches are
+    logged; a few are expected from refresh lag.
+    """
+
+    def __init__(
+        self,
+        session_factory: async_sessionmaker[AsyncSession],
+        refresh_seconds: float = 30.0,
+        rebuild_seconds: float = 3600.0,
+        check_rate: float = 0.0,
+        aliases: Optional[AliasMap] = None
+    ):
+        self.session_factory = session_factory
+        self.refresh_seconds = refresh_seconds
+        self.rebuild_seconds = rebuild_seconds
+        self.check_rate = check_rate
+        self.aliases = aliases
+
+        self._snapshot: Optional[_Snapshot] = None
+        self._cursor = 0
+        self._refreshed_at = 0.0
+        self._rebuilt_at = 0.0
+        self._refreshing: Optional[asyncio.Task] = None
+        self._checks: Set[asyncio.Task] = set()
+
+    async def filter_ids(self, user_ids: List[str], filters: Any) -> Optional[List[str]]:
+        """Matching user_ids in candidate order, or None if SQL must answer."""
+        self._schedule_refresh()
+        snapshot = self._snapshot
+        if snapshot is None:
+            metrics.incr("columnar_index.not_ready")
+            return None
+
+        started = time.perf_counter()
+        try:
+            matched = snapshot.filter(user_ids, filters, self.aliases)
+        except _Unsupported as e:
+            print(f"[INFO] Columnar index cannot evaluate filter ({e}), using SQL.")
+            metrics.incr("columnar_index.unsupported")
+            return None
+        metrics.observe("columnar_index.filter_ms", (time.perf_counter() - started) * 1000)
+
+        if self.check_rate and random.random() < self.check_rate:
+            check = asyncio.create_task(self.check(user_ids, filters, matched))
+            self._checks.add(check)
+            check.add_done_callback(self._checks.discard)
+        return matched
+
+    async def check(self, user_ids: List[str], filters: Any, matched: List[str]) -> bool:
+        """Re-runs a filter through the SQL compiler and compares the matched ids."""
+        condition = compile_filters(filters, self.aliases)
+        query = select(User.user_id).where(User.user_id.in_(user_ids))
+        if condition is not None:
+            query = query.where(condition)
+        try:
+            async with self.session_factory() as session:
+                expected = set((await session.execute(query)).scalars().all())
+        except Exception as e:
+            print(f"[ERROR] Columnar index consistency check failed to run: {e}")
+            return False
+
+        if expected == set(matched):
+            metrics.incr("columnar_index.check.ok")
+            return True
+        metrics.incr("columnar_index.check.mismatch")
+        missing = sorted(expected - set(matched))[:5]
+        extra = sorted(set(matched) - expected)[:5]
+        print(f"[WARN] Columnar index disagrees with SQL for {filters}: missing {missing}, extra {extra}")
+        return False
+
+    def _schedule_refresh(self):
+        if self._refreshing is not None and not self._refreshing.done():
+            return
+        if self._snapshot is not None and time.monotonic() - self._refreshed_at < self.refresh_seconds:
+            return
+        self._refreshing = asyncio.create_task(self.refresh())
+
+    async def refresh(self):
+        """Applies pending profile changes, or reloads everything when a full reload is due."""
+        started = time.monotonic()
+        full = self._snapshot is None or started - self._rebuilt_at >= self.rebuild_seconds
+        try:
+            if full:
+                await self._rebuild()
+            else:
+                await self._update()
+        except Exception as e:
+            print(f"[ERROR] Columnar index refresh failed: {e}")
+            metrics.incr("columnar_index.refresh_failed")
+        finally:
+            self._refreshed_at = time.monotonic()
+        metrics.observe("columnar_index.refresh_ms", (time.monotonic() - started) * 1000)
+
+    async def _rebuild(self):
+        async with self.session_factory() as session:
+            # Read the cursor first, so changes committed during the load are applied again next time.
+            cursor = await self._latest_change(session)
+            rows = { model: await self._load(session, model) for model in TABLES }
+            await prune(session)
+            await session.commit()
+
+        self._snapshot = await asyncio.to_thread(self._build, None, set(), rows)
+        self._cursor = cursor
+        self._rebuilt_at = time.monotonic()
+        self._report("Loaded")
+
+    async def _update(self):
+        async with self.session_factory() as session:
+            result = await session.execute(
+                text("SELECT change_id, user_id FROM profile_changes WHERE change_id > :cursor ORDER BY change_id"),
+                { "cursor": self._cursor }
+            )
+            changes = result.all()
+            if not changes:
+                return
+            changed = { user_id for _, user_id in changes }
+            rows = None
+            if len(changed) <= MAX_INCREMENTAL_USERS:
+                rows = { model: await self._load(session, model, list(changed)) for model in TABLES }
+        if rows is None:
+            return await self._rebuild()
+
+        self._snapshot = await asyncio.to_thread(self._build, self._snapshot, changed, rows)
+        self._cursor = changes[-1][0]
+        self._report(f"Applied changes for {len(changed)} users to")
+
+    async def _latest_change(self, session) -> int:
+        result = await session.execute(text("SELECT coalesce(max(change_id), 0) FROM profile_changes"))
+        return int(result.scalar())
+
+    async def _load(self, session, model, user_ids: Optional[List[str]] = None) -> List[Tuple]:
+        spec = TABLES[model]
+        columns = [model.user_id, *(getattr(model, name) for name in spec["text"] + spec["dates"] + spec["ids"])]
+        if user_ids is None:
+            return (await session.execute(select(*columns))).all()
+        rows = []
+        for i in range(0, len(user_ids), LOAD_BATCH_SIZE):
+            batch = user_ids[i:i + LOAD_BATCH_SIZE]
+            rows.extend((await session.execute(select(*columns).where(model.user_id.in_(batch)))).all())
+        return rows
+
+    def _build(self, previous: Optional[_Snapshot], changed: Set[str], rows: Dict[Any, List[Tuple]]) -> _Snapshot:
+        """Builds the next snapshot: the previous one minus changed users, plus their reloaded rows."""
+        if previous is None:
+            user_codes: Dict[str, int] = {}
+            dictionaries = { (model, name): _Dictionary() for model, spec in TABLES.items() for name in spec["text"] }
+        else:
+            # Codes and dictionaries are append-only, so older snapshots stay valid while they are shared.
+            user_codes, dictionaries = previous.user_codes, previous.dictionaries
+
+        def user_code(user_id) -> int:
+            code = user_codes.get(user_id)
+            if code is None:
+                code = user_codes[user_id] = len(user_codes)
+            return code
+
+        loaded = {}
+        for model, spec in TABLES.items():
+            table_rows = rows[model]
+            columns = {
+                name: np.fromiter((dictionaries[(model, name)].encode(row[1 + i]) for row in table_rows), dtype=np.int32, count=len(table_rows))
+                for i, name in enumerate(spec["text"])
+            }
+            offset = 1 + len(spec["text"])
+            for i, name in enumerate(spec["dates"]):
+                columns[name] = np.fromiter(
+                    ((row[offset + i] - EPOCH).days if row[offset + i] is not None else NULL_DAY for row in table_rows),
+                    dtype=np.int32,
+                    count=len(table_rows)
+                )
+            offset += len(spec["dates"])
+            for i, name in enumerate(spec["ids"]):
+                columns[name] = np.fromiter((row[offset + i] or 0 for row in table_rows), dtype=np.int32, count=len(table_rows))
+            user = np.fromiter((user_code(row[0]) for row in table_rows), dtype=np.int64, count=len(table_rows))
+            loaded[model] = (user, columns)
+
+        n_users = len(user_codes)
+        tables = {}
+        for model, (user, columns) in loaded.items():
+            if previous is not None:
+                old = previous.tables[model]
+                changed_codes = np.fromiter((user_codes[user_id] for user_id in changed if user_id in user_codes), dtype=np.int64)
+                keep = ~np.isin(old.user, changed_codes)
+                user = np.concatenate((old.user[keep], user))
+                columns = { name: np.concatenate((old.columns[name][keep], values)) for name, values in columns.items() }
+            tables[model] = _Table(user, columns, n_users)
+        return _Snapshot(user_codes, n_users, tables, dictionaries)
+
+    def _report(self, verb: str):
+        snapshot = self._snapshot
+        sizes = { model.__tablename__: len(table) for model, table in snapshot.tables.items() }
+        for name, size in sizes.items():
+            metrics.gauge(f"columnar_index.rows.{name}", size)
+        print(f"[COLUMNAR]: {verb} index: {snapshot.n_users} users, {sizes}")
@@ -0,0 +1,230 @@
+# src/search/services/filter_compiler.py
+
+"""
+Compiles filter_structured filters into a single SQL condition on User.
+
+Filterable fields are declared in FILTER_FIELDS (table, column, operator), so
+supporting a new field is one registry entry. Filters are a JSON object:
+
+    {"job_title": "engineer", "location": "berlin"}
+    {"or": [{"company_name": "google"}, {"company_name": "meta"}]}
+    {"skill": "python", "not": {"skill": "java"}}
+    {"company_name": "stripe", "start_date": {"from": "2020", "to": "2022-06"}}
+
+All keys of an object must hold. Fields on the same table inside one object
+must be satisfied by the same row (above, the Stripe role itself started in
+that range); put them in an "and" list to let different rows satisfy them.
+A list value on a text field matches any of its entries. Unknown fields and
+values that do not fit a field's operator are skipped with a warning.
+
+Fields with a canonical id column (company, title, skill) compare entity ids
+when an AliasMap resolves the value, so "google" no longer matches
+"Googleplex Cafe" and "JS" matches "JavaScript"; unresolved values keep the
+string match.
+"""
+
+import calendar
+from datetime import date
+from typing import Any, Callable, Dict, List, Optional, Tuple
+from sqlalchemy import and_, or_, not_, exists, func
+from sqlalchemy.sql.elements import ColumnElement
+from database.models import User, Experience, Education, Skill
+from search.services.canonical import AliasMap, COMPANY, TITLE, SKILL
+from search.services.search_index import (
+    TRIGRAM_FIELDS,
+    KEYWORDS_FIELD,
+    MIN_TRIGRAM_LENGTH,
+    substring_match,
+    keywords_query,
+)
+
+GROUP_AND = "and"
+GROUP_OR = "or"
+GROUP_NOT = "not"
+
+# Marks an ongoing role for end_date ranges: {"end_date": "present"}.
+PRESENT = "present"
+
+
+class FilterField:
+    """One filterable field: the table it lives on, its column and how values are matched."""
+
+    def __init__(self, model, column, operator: str, open_ended: bool = False, canonical: Optional[Tuple[str, Any]] = None):
+        if operator not in OPERATORS:
+            raise ValueError(f"Unknown filter operator: {operator}")
+        self.model = model
+        self.column = column
+        self.operator = operator
+        # A NULL date means "still ongoing", which satisfies any lower bound.
+        self.open_ended = open_ended
+        # (entity kind, canonical id column) for fields resolved through aliases.
+        self.canonical = canonical
+
+    def condition(self, name: str, value: Any, aliases: Optional[AliasMap] = None) -> Optional[ColumnElement]:
+        """The row-level condition for a value, or None if the value is invalid."""
+        if isinstance(value, list) and self.operator != "date_range":
+            conditions = [self.condition(name, item, aliases) for item in value]
+            conditions = [c for c in conditions if c is not None]
+            return or_(*conditions) if conditions else None
+
+        raw = OPERATORS[self.operator](self, name, value)
+        if raw is None or self.canonical is None or aliases is None:
+            return raw
+        kind, id_column = self.canonical
+        ids = aliases.resolve(kind, value)
+        if not ids:
+            return raw
+        # Rows written since the last canonicalization run have no id yet.
+        return or_(id_column.in_(ids), and_(id_column.is_(None), raw))
+
+
+def _text(name: str, value: Any) -> Optional[str]:
+    if isinstance(value, str) and value.strip():
+        return value.strip()
+    print(f"[WARN] Invalid or empty {name} filter value: {value}. Skipping.")
+    return None
+
+
+def _contains(field: FilterField, name: str, value: Any) -> Optional[ColumnElement]:
+    value = _text(name, value)
+    if value is None:
+        return None
+    if len(value) < MIN_TRIGRAM_LENGTH:
+        print(f"[WARN] Filter {name}='{value}' is shorter than a trigram and cannot use its index.")
+    return substring_match(field.column, value)
+
+
+def _iequals(field: FilterField, name: str, value: Any) -> Optional[ColumnElement]:
+    value = _text(name, value)
+    if value is None:
+        return None
+    return func.lower(field.column) == func.lower(value)
+
+
+def _matches(field: FilterField, name: str, value: Any) -> Optional[ColumnElement]:
+    value = _text(name, value)
+    if value is None:
+        return None
+    return field.column.op("@@")(keywords_query(value))
+
+
+def parse_date(value: Any, end: bool) -> Optional[date]:
+    """'YYYY', 'YYYY-MM' or 'YYYY-MM-DD'; partial dates cover their whole year or month."""
+    parts = str(value).strip().split("-")
+    try:
+        year = int(parts[0])
+        month = int(parts[1]) if len(parts) > 1 else (12 if end else 1)
+        if len(parts) > 2:
+            day = int(parts[2])
+        else:
+            day = calendar.monthrange(year, month)[1] if end else 1
+        return date(year, month, day)
+    except (ValueError, IndexError):
+        return None
+
+
+def _date_range(field: FilterField, name: str, value: Any) -> Optional[ColumnElement]:
+    if isinstance(value, str) and value.strip().lower() == PRESENT and field.open_ended:
+        return field.column.is_(None)
+    if isinstance(value, (str, int)):
+        # A bare date or year means "within that period".
+        value = { "from": value, "to": value }
+    if not isinstance(value, dict) or not (value.keys() & {"from", "to"}):
+        print(f"[WARN] Invalid {name} filter value: {value}. Expected {{'from': ..., 'to': ...}}. Skipping.")
+        return None
+
+    conditions = []
+    if value.get("from") is not None:
+        start = parse_date(value["from"], end=False)
+        if start is None:
+            print(f"[WARN] Invalid {name} 'from' date: {value['from']}. Skipping.")
+            return None
+        lower = field.column >= start
+        conditions.append(or_(lower, field.column.is_(None)) if field.open_ended else lower)
+    until = value.get("to")
+    if until is not None and not (field.open_ended and str(until).strip().lower() == PRESENT):
+        finish = parse_date(until, end=True)
+        if finish is None:
+            print(f"[WARN] Invalid {name} 'to' date: {until}. Skipping.")
+            return None
+        conditions.append(field.column <= finish)
+    return and_(*conditions) if conditions else None
+
+
+OPERATORS: Dict[str, Callable[[FilterField, str, Any], Optional[ColumnElement]]] = {
+    "contains": _contains,
+    "iequals": _iequals,
+    "matches": _matches,
+    "date_range": _date_range,
+}
+
+FILTER_FIELDS: Dict[str, FilterField] = {
+    "location": FilterField(Experience, Experience.location, "contains"),
+    "company_name": FilterField(Experience, Experience.company_name, "contains", canonical=(COMPANY, Experience.canonical_company_id)),
+    "job_title": FilterField(Experience, Experience.job_title, "contains", canonical=(TITLE, Experience.canonical_title_id)),
+    KEYWORDS_FIELD: FilterField(Experience, Experience.search_tsv, "matches"),
+    "start_date": FilterField(Experience, Experience.start_date, "date_range"),
+    "end_date": FilterField(Experience, Experience.end_date, "date_range", open_ended=True),
+    "skill": FilterField(Skill, Skill.skill_name, "iequals", canonical=(SKILL, Skill.canonical_skill_id)),
+    "institution_name": FilterField(Education, Education.institution_name, "contains"),
+    "degree_type": FilterField(Education, Education.degree_type, "contains"),
+    "degree_name": FilterField(Education, Education.degree_name, "contains"),
+}
+
+
+def compile_filters(filters: Any, aliases: Optional[AliasMap] = None) -> Optional[ColumnElement]:
+    """The condition on User for a filters object, or None when nothing valid remains."""
+    if isinstance(filters, list):
+        return _combine(and_, [compile_filters(node, aliases) for node in filters])
+    if not isinstance(filters, dict):
+        print(f"[WARN] Invalid filter group: {filters}. Skipping.")
+        return None
+
+    conditions: List[Optional[ColumnElement]] = []
+    rows: Dict[Any, List[ColumnElement]] = {}
+    for key, value in filters.items():
+        if key == GROUP_AND:
+            conditions.append(compile_filters(value if isinstance(value, list) else [value], aliases))
+        elif key == GROUP_OR:
+            nodes = value if isinstance(value, list) else [value]
+            conditions.append(_combine(or_, [compile_filters(node, aliases) for node in nodes]))
+        elif key == GROUP_NOT:
+            negated = compile_filters(value, aliases)
+            conditions.append(not_(negated) if negated is not None else None)
+        elif key in FILTER_FIELDS:
+            field = FILTER_FIELDS[key]
+            condition = field.condition(key, value, aliases)
+            if condition is not None:
+                rows.setdefault(field.model, []).append(condition)
+        else:
+            print(f"[WARN] Unsupported filter field: {key}. Skipping.")
+
+    for model, row_conditions in rows.items():
+        conditions.append(exists().where(model.user_id == User.user_id, *row_conditions))
+    return _combine(and_, conditions)
+
+
+def rank_filters(filters: Any) -> Dict[str, str]:
+    """The text filters that relevance ranking applies to, skipping negated groups."""
+    ranked: Dict[str, str] = {}
+
+    def collect(node):
+        if isinstance(node, list):
+            for item in node:
+                collect(item)
+        elif isinstance(node, dict):
+            for key, value in node.items():
+                if key in (GROUP_AND, GROUP_OR):
+                    collect(value)
+                elif (key in TRIGRAM_FIELDS or key == KEYWORDS_FIELD) and isinstance(value, str):
+                    ranked.setdefault(key, value)
+
+    collect(filters)
+    return ranked
+
+
+def _combine(op, conditions: List[Optional[ColumnElement]]) -> Optional[ColumnElement]:
+    conditions = [c for c in conditions if c is not None]
+    if not conditions:
+        return None
+    return conditions[0] if len(conditions) == 1 else op(*conditions)
@@ -0,0 +1,25 @@
+# src/search/services/index_version.py
+
+import redis.asyncio as redis
+
+INDEX_VERSION_KEY = "search:index_version"
+
+
+async def get_index_version(redis_client: redis.Redis) -> int:
+    """
+    Version stamp of the profile search indexes (Pinecone, Neo4j, Postgres).
+    Caches that depend on index contents embed it in their keys.
+    """
+    try:
+        version = await redis_client.get(INDEX_VERSION_KEY)
+    except redis.exceptions.RedisError as e:
+        print(f"[ERROR] Redis error reading index version: {e}")
+        return 0
+    return int(version) if version else 0
+
+
+async def bump_index_version(redis_client: redis.Redis) -> int:
+    """Call after profiles are re-indexed; every version-stamped cache entry becomes stale."""
+    version = await redis_client.incr(INDEX_VERSION_KEY)
+    print(f"[INDEX]: Bumped search index version to {version}")
+    return version
@@ -0,0 +1,68 @@
+# src/search/services/llm_cache.py
+
+import json
+import asyncio
+import hashlib
+import redis.asyncio as redis
+from typing import Any, AsyncGenerator, Dict, Iterable, List, Optional
+from search.services.metrics import metrics
+
+CACHE_KEY_PREFIX = "llmcache:"
+
+
+class LLMResponseCache:
+    """
+    Content-addressed cache of complete LLM responses.
+
+    Keys are a SHA-256 over (model, messages, params), so only byte-identical
+    requests share an entry. Hits are replayed as a chunked stream, keeping
+    the SSE event pattern the same as a live completion.
+    """
+
+    def __init__(
+        self,
+        redis_client: redis.Redis,
+        ttl_seconds: int,
+        stages: Iterable[str],
+        replay_chunk_size: int = 24
+    ):
+        self.redis_client = redis_client
+        self.ttl_seconds = ttl_seconds
+        self.stages = set(stages)
+        self.replay_chunk_size = replay_chunk_size
+
+    def enabled_for(self, stage: str) -> bool:
+        return stage in self.stages
+
+    @staticmethod
+    def key(model: str, messages: List[Dict[str, str]], params: Dict[str, Any]) -> str:
+        payload = json.dumps(
+            { "model": model, "messages": messages, "params": params },
+            sort_keys=True,
+            separators=(",", ":")
+        )
+        return CACHE_KEY_PREFIX + hashlib.sha256(payload.encode()).hexdigest()
+
+    async def get(self, key: str, stage: str) -> Optional[str]:
+        try:
+            cached = await self.redis_client.get(key)
+        except redis.exceptions.RedisError as e:
+            print(f"[ERROR] Redis error reading LLM cache: {e}")
+            return None
+
+        metrics.incr(f"llm_cache.{stage}.{'hit' if cached is not None else 'miss'}")
+        return cached
+
+    async def set(self, key: str, completion: str):
+        if not completion:
+            return
+        try:
+            await self.redis_client.set(key, completion, ex=self.ttl_seconds)
+        except redis.exceptions.RedisError as e:
+            print(f"[ERROR] Redis error writing LLM cache: {e}")
+
+    async def replay(self, completion: str) -> AsyncGenerator[str, None]:
+        for i in range(0, len(completion), self.replay_chunk_size):
+            yield completion[i:i + self.replay_chunk_size]
+            # Let the event loop flush each chunk to the client like a live stream.
+            await asyncio.sleep(0)
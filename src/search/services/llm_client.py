@@ -0,0 +1,226 @@
+# src/search/services/llm_client.py
+
+import time
+import random
+import asyncio
+import openai
+from openai import AsyncOpenAI
+from typing import Any, AsyncGenerator, Dict, List, Optional, Tuple
+from search.services.metrics import metrics
+from search.services.llm_limiter import LLMLimiter, PRIORITY_INTERACTIVE, estimate_tokens
+
+HEDGE_MIN_SAMPLES = 20  # TTFT observations needed before the hedge delay is trusted
+
+
+class LLMError(Exception):
+    """Base class for failed LLM calls. Never part of the model's output."""
+
+    def __init__(self, message: str, model: str = "", stage: str = ""):
+        super().__init__(message)
+        self.model = model
+        self.stage = stage
+
+
+class LLMTimeout(LLMError):
+    """The stream did not start, or stalled between chunks, within its timeout."""
+
+
+class LLMRequestError(LLMError):
+    """The provider rejected the request; retrying the same request will not help."""
+
+
+class LLMUnavailable(LLMError):
+    """The stream could not be started after all retries."""
+
+
+class LLMStreamError(LLMError):
+    """The stream failed after output had already been delivered."""
+
+
+def ttft_metric(stage: str, model: str) -> str:
+    return f"llm.{stage or 'llm'}.{model}.ttft_ms"
+
+
+class LLMClient:
+    """
+    Streaming chat completions with bounded waits.
+
+    A stream must deliver its first chunk within `first_token_timeout` and each
+    later chunk within `chunk_timeout`. Starting a stream is retried with
+    jittered exponential backoff on timeouts, connection errors, rate limits
+    and 5xx responses. With hedging on, if a stream has not started by the p95
+    time-to-first-token seen for that stage and model, a duplicate request is
+    sent and whichever starts first is used; the other is closed. Failures are
+    raised as LLMError subclasses. With a limiter, each call first waits for
+    its share of the cluster-wide request and token budgets.
+    """
+
+    def __init__(
+        self,
+        client: AsyncOpenAI,
+        first_token_timeout: float = 20.0,
+        chunk_timeout: float = 10.0,
+        max_retries: int = 2,
+        retry_base_delay: float = 0.5,
+        hedge_enabled: bool = False,
+        limiter: Optional[LLMLimiter] = None,
+        completion_estimate: int = 500
+    ):
+        self.client = client
+        self.first_token_timeout = first_token_timeout
+        self.chunk_timeout = chunk_timeout
+        self.max_retries = max_retries
+        self.retry_base_delay = retry_base_delay
+        self.hedge_enabled = hedge_enabled
+        self.limiter = limiter
+        self.completion_estimate = completion_estimate
+
+    async def stream(
+        self,
+        model: str,
+        messages: List[Dict[str, str]],
+        stage: str = "",
+        priority: int = PRIORITY_INTERACTIVE,
+        **params
+    ) -> AsyncGenerator[Any, None]:
+        """Yields raw completion chunks, including the final usage chunk."""
+        estimated_tokens = estimate_tokens(messages, self.completion_estimate)
+        if self.limiter:
+            await self.limiter.acquire(estimated_tokens, priority)
+
+        started = time.monotonic()
+        first_chunk, response, iterator = await self._start_with_retries(model, messages, stage, params)
+        metrics.observe(ttft_metric(stage, model), (time.monotonic() - started) * 1000)
+
+        used_tokens = None
+        try:
+            chunk = first_chunk
+            while True:
+                if getattr(chunk, "usage", None):
+                    used_tokens = chunk.usage.prompt_tokens + chunk.usage.completion_tokens
+                yield chunk
+                try:
+                    chunk = await asyncio.wait_for(iterator.__anext__(), timeout=self.chunk_timeout)
+                except StopAsyncIteration:
+                    return
+                except asyncio.TimeoutError:
+                    metrics.incr(f"llm.{stage or 'llm'}.{model}.stalls")
+                    raise LLMTimeout(f"{model} stream stalled for {self.chunk_timeout}s", model, stage)
+                except (LLMError, asyncio.CancelledError):
+                    raise
+                except Exception as e:
+                    raise LLMStreamError(f"{model} stream failed: {e}", model, stage) from e
+        finally:
+            await self._close(response)
+            if self.limiter and used_tokens is not None:
+                await self.limiter.settle(estimated_tokens, used_tokens)
+
+    async def _start_with_retries(self, model: str, messages, stage: str, params) -> Tuple[Any, Any, Any]:
+        attempt = 0
+        while True:
+            try:
+                return await self._start_hedged(model, messages, stage, params)
+            except LLMRequestError:
+                raise
+            except LLMError as e:
+                if attempt >= self.max_retries:
+                    raise LLMUnavailable(f"{model} unavailable after {attempt + 1} attempts: {e}", model, stage) from e
+                delay = self.retry_base_delay * (2 ** attempt) * random.uniform(0.5, 1.5)
+                attempt += 1
+                metrics.incr(f"llm.{stage or 'llm'}.{model}.retries")
+                print(f"[WARN] {model} {stage or 'llm'} call failed ({e}), retry {attempt} in {delay:.2f}s")
+                await asyncio.sleep(delay)
+
+    async def _start_hedged(self, model: str, messages, stage: str, params) -> Tuple[Any, Any, Any]:
+        """Starts the stream, with at most one hedge request. Returns (first chunk, stream, chunk iterator)."""
+        hedge_delay = self._hedge_delay(stage, model)
+        deadline = time.monotonic() + self.first_token_timeout
+        tasks = [asyncio.create_task(self._start(model, messages, stage, params))]
+        error: Optional[BaseException] = None
+        try:
+            while tasks:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    break
+                timeout = remaining if hedge_delay is None else min(remaining, hedge_delay)
+                done, _ = await asyncio.wait(tasks, timeout=timeout, return_when=asyncio.FIRST_COMPLETED)
+                for task in done:
+                    tasks.remove(task)
+                    if task.exception() is None:
+                        return task.result()
+                    error = task.exception()
+                    if isinstance(error, LLMRequestError):
+                        raise error
+
+                if hedge_delay is not None and not done:
+                    metrics.incr(f"llm.{stage or 'llm'}.{model}.hedged")
+                    print(f"[LLM]: {model} {stage or 'llm'} stream not started after {hedge_delay * 1000:.0f}ms, hedging")
+                    tasks.append(asyncio.create_task(self._start(model, messages, stage, params)))
+                # Hedge at most once; a request that failed outright is left to the retries.
+                hedge_delay = None
+        finally:
+            for task in tasks:
+                task.cancel()
+                task.add_done_callback(self._close_started)
+
+        if error is not None:
+            raise error
+        raise LLMTimeout(f"{model} produced no output within {self.first_token_timeout}s", model, stage)
+
+    async def _start(self, model: str, messages, stage: str, params) -> Tuple[Any, Any, Any]:
+        try:
+            response = await self.client.chat.completions.create(
+                messages=messages,
+                model=model,
+                stream=True,
+                stream_options={ "include_usage": True },
+                **params,
+            )
+        except openai.BadRequestError as e:
+            raise LLMRequestError(f"{model} rejected the request: {e}", model, stage) from e
+        except (openai.APIConnectionError, openai.RateLimitError, openai.InternalServerError) as e:
+            raise LLMError(f"{model} request failed: {e}", model, stage) from e
+        except openai.APIStatusError as e:
+            if e.status_code >= 500:
+                raise LLMError(f"{model} request failed: {e}", model, stage) from e
+            raise LLMRequestError(f"{model} rejected the request: {e}", model, stage) from e
+
+        iterator = response.__aiter__()
+        try:
+            first_chunk = await iterator.__anext__()
+        except StopAsyncIteration:
+            await self._close(response)
+            raise LLMError(f"{model} returned an empty stream", model, stage)
+        except asyncio.CancelledError:
+            await self._close(response)
+            raise
+        except Exception as e:
+            await self._close(response)
+            raise LLMError(f"{model} stream failed to start: {e}", model, stage) from e
+        return first_chunk, response, iterator
+
+    def _hedge_delay(self, stage: str, model: str) -> Optional[float]:
+        if not self.hedge_enabled:
+            return None
+        ttft = metrics.summary(ttft_metric(stage, model))
+        if ttft["count"] < HEDGE_MIN_SAMPLES:
+            return None
+        return ttft["p95"] / 1000
+
+    @staticmethod
+    def _close_started(task: asyncio.Task):
+        """Closes the stream of a losing request that started anyway."""
+        if task.cancelled() or task.exception() is not None:
+            return
+        _, response, _ = task.result()
+        asyncio.ensure_future(LLMClient._close(response))
+
+    @staticmethod
+    async def _close(response):
+        close = getattr(response, "close", None)
+        if close is None:
+            return
+        try:
+            await close()
+        except Exception as e:
+            print(f"[WARN] Failed to close LLM stream: {e}")
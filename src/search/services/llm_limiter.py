@@ -0,0 +1,172 @@
+# src/search/services/llm_limiter.py
+
+import heapq
+import asyncio
+import itertools
+import time
+import redis.asyncio as redis
+from typing import Dict, List, Tuple
+from search.services.metrics import metrics
+
+LIMITER_PREFIX = "llmlimit:"
+
+PRIORITY_INTERACTIVE = 0
+PRIORITY_BATCH = 1
+
+MAX_POLL_SECONDS = 0.25  # Longest sleep before re-checking the buckets
+
+# Two token buckets (requests and tokens per minute) refilled continuously from
+# Redis server time. Takes ARGV[3] requests and ARGV[4] tokens when both fit
+# (a request larger than the whole bucket only needs a full bucket), else
+# returns the seconds until they would. ARGV[5] = 1 takes unconditionally,
+# which settles actual usage and may leave the token bucket in debt.
+# Returns { wait seconds, requests left, tokens left } as strings.
+_TAKE = """
+local now_parts = redis.call("TIME")
+local now = tonumber(now_parts[1]) + tonumber(now_parts[2]) / 1000000
+local rpm = tonumber(ARGV[1])
+local tpm = tonumber(ARGV[2])
+local want_requests = tonumber(ARGV[3])
+local want_tokens = tonumber(ARGV[4])
+local force = ARGV[5] == "1"
+
+local function refill(key, per_minute)
+    local state = redis.call("HMGET", key, "level", "ts")
+    local level = tonumber(state[1])
+    local ts = tonumber(state[2])
+    if level == nil then
+        return per_minute
+    end
+    return math.min(per_minute, level + (now - ts) * per_minute / 60)
+end
+
+local requests = refill(KEYS[1], rpm)
+local tokens = refill(KEYS[2], tpm)
+local wait = 0
+if not force then
+    local need_tokens = math.min(want_tokens, tpm)
+    if requests < want_requests then
+        wait = math.max(wait, (want_requests - requests) * 60 / rpm)
+    end
+    if tokens < need_tokens then
+        wait = math.max(wait, (need_tokens - tokens) * 60 / tpm)
+    end
+end
+if wait == 0 then
+    requests = requests - want_requests
+    tokens = tokens - want_tokens
+end
+
+redis.call("HSET", KEYS[1], "level", requests, "ts", now)
+redis.call("HSET", KEYS[2], "level", tokens, "ts", now)
+redis.call("EXPIRE", KEYS[1], 120)
+redis.call("EXPIRE", KEYS[2], 120)
+return { tostring(wait), tostring(requests), tostring(tokens) }
+"""
+
+
+class LLMLimiter:
+    """
+    Cluster-wide requests-per-minute and tokens-per-minute limiter for LLM calls.
+
+    The budgets are Redis token buckets shared by every worker. Inside a
+    worker, callers wait in one priority queue (interactive ahead of batch,
+    FIFO within a priority) and only the head of the queue polls Redis, so a
+    burst turns into an ordered queue instead of a retry storm. Token use is
+    charged from an estimate up front and corrected with the real usage
+    afterwards. If Redis is unreachable the limiter lets calls through.
+    """
+
+    def __init__(
+        self,
+        redis_client: redis.Redis,
+        requests_per_minute: int,
+        tokens_per_minute: int,
+        tokens_per_call_estimate: int = 2000
+    ):
+        self.redis_client = redis_client
+        self.requests_per_minute = requests_per_minute
+        self.tokens_per_minute = tokens_per_minute
+        self.tokens_per_call_estimate = tokens_per_call_estimate
+        self._keys = [f"{LIMITER_PREFIX}requests", f"{LIMITER_PREFIX}tokens"]
+        self._queue: List[Tuple[int, int]] = []
+        self._sequence = itertools.count()
+        self._queue_changed = asyncio.Condition()
+
+    async def acquire(self, tokens: int, priority: int = PRIORITY_INTERACTIVE):
+        """Waits until one request and `tokens` tokens fit in the shared budgets."""
+        ticket = (priority, next(self._sequence))
+        started = time.monotonic()
+        async with self._queue_changed:
+            heapq.heappush(self._queue, ticket)
+            metrics.gauge("llm_limiter.queue_depth", len(self._queue))
+        try:
+            while True:
+                async with self._queue_changed:
+                    await self._queue_changed.wait_for(lambda: self._queue[0] == ticket)
+                wait = await self._take(1, tokens)
+                if wait <= 0:
+                    break
+                await asyncio.sleep(min(wait, MAX_POLL_SECONDS))
+        finally:
+            async with self._queue_changed:
+                self._queue.remove(ticket)
+                heapq.heapify(self._queue)
+                metrics.gauge("llm_limiter.queue_depth", len(self._queue))
+                self._queue_changed.notify_all()
+        metrics.observe(f"llm_limiter.wait_ms.p{priority}", (time.monotonic() - started) * 1000)
+
+    async def settle(self, estimated_tokens: int, actual_tokens: int):
+        """Corrects the token bucket once a call's real usage is known."""
+        delta = actual_tokens - estimated_tokens
+        if delta:
+            await self._take(0, delta, force=True)
+
+    async def estimated_wait(self, priority: int = PRIORITY_INTERACTIVE) -> float:
+        """Seconds a new call at `priority` would queue in this worker before it could start."""
+        levels = await self._levels()
+        if levels is None:
+            return 0.0
+        requests, tokens = levels
+        ahead = sum(1 for queued_priority, _ in self._queue if queued_priority <= priority)
+        needed = ahead + 1
+        request_wait = max(0.0, needed - requests) * 60 / self.requests_per_minute
+        token_wait = max(0.0, needed * self.tokens_per_call_estimate - tokens) * 60 / self.tokens_per_minute
+        return max(request_wait, token_wait)
+
+    async def _levels(self):
+        try:
+            _, requests, tokens = await self._eval(0, 0, force=False)
+        except redis.exceptions.RedisError as e:
+            print(f"[WARN] LLM limiter unavailable, not limiting: {e}")
+            return None
+        return requests, tokens
+
+    async def _take(self, requests: int, tokens: int, force: bool = False) -> float:
+        try:
+            wait, _, _ = await self._eval(requests, tokens, force)
+        except redis.exceptions.RedisError as e:
+            print(f"[WARN] LLM limiter unavailable, not limiting: {e}")
+            return 0.0
+        if wait > 0:
+            metrics.incr("llm_limiter.throttled")
+        return wait
+
+    async def _eval(self, requests: int, tokens: int, force: bool) -> Tuple[float, float, float]:
+        result = await self.redis_client.eval(
+            _TAKE,
+            2,
+            *self._keys,
+            self.requests_per_minute,
+            self.tokens_per_minute,
+            requests,
+            tokens,
+            "1" if force else "0"
+        )
+        return tuple(float(value) for value in result)
+
+
+def estimate_tokens(messages: List[Dict[str, str]], completion_tokens: int) -> int:
+    """Rough prompt size (4 characters per token) plus the expected completion."""
+    prompt_chars = sum(len(message.get("content") or "") for message in messages)
+    return prompt_chars // 4 + completion_tokens
@@ -0,0 +1,93 @@
+# src/search/services/metrics.py
+
+import threading
+from collections import deque
+from typing import Any, Deque, Dict
+
+RESERVOIR_SIZE = 512
+
+
+class _Summary:
+    """Count/sum/max plus a window of recent samples for percentiles."""
+
+    def __init__(self):
+        self.count = 0
+        self.total = 0.0
+        self.max = 0.0
+        self.recent: Deque[float] = deque(maxlen=RESERVOIR_SIZE)
+
+    def observe(self, value: float):
+        self.count += 1
+        self.total += value
+        self.max = max(self.max, value)
+        self.recent.append(value)
+
+    def percentile(self, p: float) -> float:
+        if not self.recent:
+            return 0.0
+        ordered = sorted(self.recent)
+        index = min(len(ordered) - 1, int(round(p * (len(ordered) - 1))))
+        return ordered[index]
+
+    def snapshot(self) -> Dict[str, float]:
+        return {
+            "count": self.count,
+            "avg": self.total / self.count if self.count else 0.0,
+            "p50": self.percentile(0.50),
+            "p95": self.percentile(0.95),
+            "max": self.max,
+        }
+
+
+class Metrics:
+    """
+    In-process counters, gauges and latency summaries for this worker.
+
+    Counters named `<name>.hit` / `<name>.miss` also get a derived
+    `<name>.hit_rate` in the snapshot.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._counters: Dict[str, float] = {}
+        self._gauges: Dict[str, float] = {}
+        self._summaries: Dict[str, _Summary] = {}
+
+    def incr(self, name: str, value: float = 1):
+        with self._lock:
+            self._counters[name] = self._counters.get(name, 0) + value
+
+    def gauge(self, name: str, value: float):
+        with self._lock:
+            self._gauges[name] = value
+
+    def observe(self, name: str, value: float):
+        with self._lock:
+            summary = self._summaries.get(name)
+            if summary is None:
+                summary = self._summaries[name] = _Summary()
+            summary.observe(value)
+
+    def summary(self, name: str) -> Dict[str, float]:
+        with self._lock:
+            summary = self._summaries.get(name)
+            return summary.snapshot() if summary else _Summary().snapshot()
+
+    def snapshot(self) -> Dict[str, Any]:
+        with self._lock:
+            counters = dict(self._counters)
+            gauges = dict(self._gauges)
+            summaries = { name: s.snapshot() for name, s in self._summaries.items() }
+
+        ratios = {}
+        for name in counters:
+            if name.endswith(".hit"):
+                base = name[:-len(".hit")]
+                hits = counters[name]
+                total = hits + counters.get(f"{base}.miss", 0)
+                ratios[f"{base}.hit_rate"] = hits / total if total else 0.0
+
+        return { "counters": counters, "gauges": gauges, "ratios": ratios, "timings": summaries }
+
+
+metrics = Metrics()
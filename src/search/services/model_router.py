@@ -0,0 +1,112 @@
+# src/search/services/model_router.py
+
+import time
+from collections import deque
+from typing import Deque, Dict, List, Mapping, Optional, Tuple
+from search.services.metrics import metrics
+
+POLICY_ORDERED = "ordered"
+POLICY_LATENCY = "latency"
+
+MIN_LATENCY_SAMPLES = 5  # Observations needed before a model can be judged too slow
+RECENT_LATENCY_SAMPLES = 200  # Most samples kept per stage and model within the window
+
+
+class ModelRouter:
+    """
+    Picks the model for each agent stage.
+
+    Every stage has a fallback chain (first entry preferred, the default model
+    always last). Under the "latency" policy, models whose p95 total latency
+    for the stage over the last `latency_window_seconds` exceeds its budget are
+    moved behind the ones within budget. As a demoted model rarely serves calls,
+    its samples age out of the window and it gets traffic again to be
+    re-judged. Under either policy, a model that just failed cools down and is
+    tried last until the cooldown passes. Per-stage, per-model latency and
+    error metrics are recorded in the shared metrics registry (LLMClient
+    records time to first token under the same prefix).
+    """
+
+    def __init__(
+        self,
+        default_model: str,
+        stage_models: Optional[Mapping[str, List[str]]] = None,
+        policy: str = POLICY_ORDERED,
+        latency_budgets_ms: Optional[Mapping[str, float]] = None,
+        cooldown_seconds: float = 30.0,
+        latency_window_seconds: float = 300.0
+    ):
+        if policy not in (POLICY_ORDERED, POLICY_LATENCY):
+            raise ValueError(f"Unknown model routing policy: {policy}")
+        self.default_model = default_model
+        self.policy = policy
+        self.latency_budgets_ms = dict(latency_budgets_ms or {})
+        self.cooldown_seconds = cooldown_seconds
+        self.latency_window_seconds = latency_window_seconds
+        self._chains: Dict[str, List[str]] = {}
+        for stage, models in (stage_models or {}).items():
+            chain = [model for model in models if model]
+            if default_model not in chain:
+                chain.append(default_model)
+            self._chains[stage] = chain
+        self._cooling_until: Dict[str, float] = {}
+        self._latencies: Dict[Tuple[str, str], Deque[Tuple[float, float]]] = {}  # (stage, model) -> (when, total ms)
+
+    def primary(self, stage: str) -> str:
+        """The configured first choice for a stage, stable regardless of health."""
+        return self.chain(stage)[0]
+
+    def chain(self, stage: str) -> List[str]:
+        return self._chains.get(stage, [self.default_model])
+
+    def candidates(self, stage: str) -> List[str]:
+        """The chain for a stage in the order models should be tried now."""
+        now = time.monotonic()
+        preferred, deferred, cooling = [], [], []
+        for model in self.chain(stage):
+            if self._cooling_until.get(model, 0.0) > now:
+                cooling.append(model)
+            elif self.policy == POLICY_LATENCY and self._over_budget(stage, model):
+                deferred.append(model)
+            else:
+                preferred.append(model)
+        return preferred + deferred + cooling
+
+    def _over_budget(self, stage: str, model: str) -> bool:
+        budget = self.latency_budgets_ms.get(stage)
+        if budget is None:
+            return False
+        samples = self._recent_latencies(stage, model)
+        if len(samples) < MIN_LATENCY_SAMPLES:
+            return False
+        ordered = sorted(samples)
+        return ordered[int(round(0.95 * (len(ordered) - 1)))] > budget
+
+    def _recent_latencies(self, stage: str, model: str) -> List[float]:
+        window = self._latencies.get((stage, model))
+        if not window:
+            return []
+        cutoff = time.monotonic() - self.latency_window_seconds
+        while window and window[0][0] < cutoff:
+            window.popleft()
+        return [ms for _, ms in window]
+
+    def record_success(self, stage: str, model: str, total_ms: float):
+        metrics.observe(self._metric(stage, model, "latency_ms"), total_ms)
+        window = self._latencies.setdefault((stage, model), deque(maxlen=RECENT_LATENCY_SAMPLES))
+        window.append((time.monotonic(), total_ms))
+        metrics.incr(self._metric(stage, model, "calls"))
+        self._cooling_until.pop(model, None)
+
+    def record_failure(self, stage: str, model: str):
+        metrics.incr(self._metric(stage, model, "errors"))
+        self._cooling_until[model] = time.monotonic() + self.cooldown_seconds
+
+    def record_usage(self, stage: str, model: str, prompt_tokens: int, completion_tokens: int, cached_tokens: int):
+        metrics.incr(self._metric(stage, model, "prompt_tokens"), prompt_tokens)
+        metrics.incr(self._metric(stage, model, "completion_tokens"), completion_tokens)
+        metrics.incr(self._metric(stage, model, "cached_tokens"), cached_tokens)
+
+    @staticmethod
+    def _metric(stage: str, model: str, name: str) -> str:
+        return f"llm.{stage or 'llm'}.{model}.{name}"
@@ -0,0 +1,242 @@
+# src/search/services/profile_cache.py
+
+"""
+Per-worker LRU cache of loaded profiles (database/read_models.py), in front of
+Astralis._get_user_profile and _fetch_users.
+
+Entries expire after `ttl_seconds` and the cache holds at most `max_entries`
+profiles. Changes reach every worker through Redis pub/sub on
+INVALIDATION_CHANNEL:
+  - One worker at a time (holding WATCH_LOCK_KEY) tails the profile_changes
+    log (migration 0003) and publishes the user_ids that changed, with its
+    cursor kept in Redis so the next holder resumes where it stopped.
+    The watcher also prunes the log (database/profile_changes.py).
+  - publish() is also called directly, e.g. when the search index is rebuilt.
+publish() also invalidates the shared Redis cache (shared_profile_cache.py),
+when there is one, before broadcasting.
+A worker that misses messages while disconnected clears its cache when it
+resubscribes. TTL bounds staleness if everything else fails.
+"""
+
+import json
+import time
+import uuid
+import asyncio
+import redis.asyncio as redis
+from collections import OrderedDict
+from typing import Dict, Iterable, List, Optional, Tuple
+from sqlalchemy import text
+from sqlalchemy.ext.asyncio import async_sessionmaker, AsyncSession
+from database.read_models import Profile
+from database.profile_changes import prune, PRUNE_INTERVAL_SECONDS
+from search.services.metrics import metrics
+from search.services.shared_profile_cache import SharedProfileCache
+
+INVALIDATION_CHANNEL = "profile_cache:invalidate"
+WATCH_LOCK_KEY = "profile_cache:watch_lock"
+WATCH_CURSOR_KEY = "profile_cache:watch_cursor"
+MAX_CHANGES_PER_POLL = 5000
+
+
+class ProfileCache:
+    """
+    In-process LRU of profiles with TTL and cross-worker invalidation.
+
+    A load that started before an invalidation of the same user is not cached
+    (see put_many's `loaded_since`), so a slow read cannot reinsert the old
+    profile after the change was broadcast. A load that starts after it must
+    not read an outdated copy either: profile documents are only returned once
+    rebuilt past the user's latest change (ProfileDocumentStore.get_many), as
+    the refresher may run several seconds after the watcher has broadcast.
+    """
+
+    def __init__(
+        self,
+        redis_client: redis.Redis,
+        session_factory: async_sessionmaker[AsyncSession],
+        max_entries: int = 5000,
+        ttl_seconds: float = 300.0,
+        watch_seconds: float = 2.0,
+        shared: SharedProfileCache | None = None
+    ):
+        self.redis_client = redis_client
+        self.session_factory = session_factory
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        self.watch_seconds = watch_seconds
+        self.shared = shared
+
+        self._entries: "OrderedDict[str, Tuple[float, Profile, int]]" = OrderedDict()
+        self._bytes = 0
+        self._invalidated: Dict[str, float] = {}  # user_id -> when it was last invalidated
+        self._cleared_at = 0.0
+        self._hits = 0
+        self._lookups = 0
+        self._token = uuid.uuid4().hex
+        self._pruned_at = 0.0
+        self._tasks: List[asyncio.Task] = []
+
+    def get_many(self, user_ids: Iterable[str]) -> Dict[str, Profile]:
+        """The cached, unexpired profiles among user_ids."""
+        self._start()
+        user_ids = list(user_ids)
+        now = time.monotonic()
+        found = {}
+        for user_id in user_ids:
+            self._lookups += 1
+            entry = self._entries.get(user_id)
+            if entry is None:
+                continue
+            if now - entry[0] >= self.ttl_seconds:
+                self._drop(user_id)
+                metrics.incr("profile_cache.expired")
+                continue
+            self._entries.move_to_end(user_id)
+            found[user_id] = entry[1]
+            self._hits += 1
+        metrics.incr("profile_cache.hit", len(found))
+        metrics.incr("profile_cache.miss", len(user_ids) - len(found))
+        self._report()
+        return found
+
+    def get(self, user_id: str) -> Optional[Profile]:
+        return self.get_many([user_id]).get(user_id)
+
+    def put_many(self, profiles: Iterable[Profile], loaded_since: float):
+        """Caches profiles whose load started at `loaded_since` (time.monotonic()), unless invalidated since."""
+        now = time.monotonic()
+        for profile in profiles:
+            user_id = profile.user_id
+            if self._cleared_at > loaded_since or self._invalidated.get(user_id, 0.0) > loaded_since:
+                metrics.incr("profile_cache.put_skipped")
+                continue
+            self._drop(user_id)
+            size = _approximate_size(profile)
+            self._entries[user_id] = (now, profile, size)
+            self._bytes += size
+        while len(self._entries) > self.max_entries:
+            self._drop(next(iter(self._entries)))
+            metrics.incr("profile_cache.evicted")
+        self._report()
+
+    def invalidate(self, user_ids: Optional[Iterable[str]] = None):
+        """Drops the given users from this worker's cache, or everything when user_ids is None."""
+        now = time.monotonic()
+        if user_ids is None:
+            self._entries.clear()
+            self._bytes = 0
+            self._invalidated.clear()
+            self._cleared_at = now
+        else:
+            for user_id in user_ids:
+                self._drop(user_id)
+                self._invalidated[user_id] = now
+            if len(self._invalidated) > self.max_entries:
+                # Loads never run longer than the TTL, so older marks no longer matter.
+                self._invalidated = { k: t for k, t in self._invalidated.items() if now - t < self.ttl_seconds }
+        metrics.incr("profile_cache.invalidated")
+        self._report()
+
+    async def publish(self, user_ids: Optional[List[str]] = None):
+        """Invalidates the users (or everything) on every worker, this one included."""
+        self.invalidate(user_ids)
+        if self.shared:
+            await self.shared.invalidate(user_ids)
+        payload = json.dumps({ "user_ids": user_ids })
+        try:
+            await self.redis_client.publish(INVALIDATION_CHANNEL, payload)
+        except redis.exceptions.RedisError as e:
+            print(f"[ERROR] Failed to publish profile cache invalidation: {e}")
+
+    def _drop(self, user_id: str):
+        entry = self._entries.pop(user_id, None)
+        if entry is not None:
+            self._bytes -= entry[2]
+
+    def _report(self):
+        metrics.gauge("profile_cache.entries", len(self._entries))
+        metrics.gauge("profile_cache.bytes", self._bytes)
+        if self._lookups:
+            metrics.gauge("profile_cache.hit_ratio", self._hits / self._lookups)
+
+    """
+    Background tasks
+    """
+    def _start(self):
+        if self._tasks and not any(task.done() for task in self._tasks):
+            return
+        for task in self._tasks:
+            task.cancel()
+        self._tasks = [asyncio.create_task(self._listen()), asyncio.create_task(self._watch_changes())]
+
+    async def _listen(self):
+        while True:
+            pubsub = self.redis_client.pubsub()
+            try:
+                await pubsub.subscribe(INVALIDATION_CHANNEL)
+                # Anything published while unsubscribed was missed.
+                self.invalidate()
+                while True:
+                    message = await pubsub.get_message(ignore_subscribe_messages=True, timeout=1.0)
+                    if message and message["type"] == "message":
+                        self.invalidate(json.loads(message["data"]).get("user_ids"))
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                print(f"[WARN] Profile cache invalidation listener failed, resubscribing: {e}")
+                metrics.incr("profile_cache.listener_error")
+                await asyncio.sleep(1.0)
+            finally:
+                await pubsub.aclose()
+
+    async def _watch_changes(self):
+        while True:
+            try:
+                if await self._hold_watch_lock():
+                    await self._publish_changes()
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                print(f"[WARN] Profile change watch failed: {e}")
+                metrics.incr("profile_cache.watch_error")
+            await asyncio.sleep(self.watch_seconds)
+
+    async def _hold_watch_lock(self) -> bool:
+        """Takes or renews the watcher lease; it lapses a few polls after its holder stops."""
+        ttl = int(self.watch_seconds * 5) + 1
+        if await self.redis_client.set(WATCH_LOCK_KEY, self._token, nx=True, ex=ttl):
+            return True
+        owner = await self.redis_client.get(WATCH_LOCK_KEY)
+        if isinstance(owner, bytes):
+            owner = owner.decode()
+        if owner != self._token:
+            return False
+        await self.redis_client.expire(WATCH_LOCK_KEY, ttl)
+        return True
+
+    async def _publish_changes(self):
+        cursor = await self.redis_client.get(WATCH_CURSOR_KEY)
+        async with self.session_factory() as session:
+            if cursor is None:
+                # First watcher: start from now; nothing cached predates this process.
+                latest = (await session.execute(text("SELECT coalesce(max(change_id), 0) FROM profile_changes"))).scalar()
+                await self.redis_client.set(WATCH_CURSOR_KEY, int(latest))
+                return
+            rows = (await session.execute(
+                text("SELECT change_id, user_id FROM profile_changes WHERE change_id > :cursor ORDER BY change_id LIMIT :limit"),
+                { "cursor": int(cursor), "limit": MAX_CHANGES_PER_POLL }
+            )).all()
+            if time.monotonic() - self._pruned_at >= PRUNE_INTERVAL_SECONDS:
+                metrics.incr("profile_cache.changes_pruned", await prune(session))
+                await session.commit()
+                self._pruned_at = time.monotonic()
+        if not rows:
+            return
+        await self.publish(list({ user_id for _, user_id in rows }))
+        await self.redis_client.set(WATCH_CURSOR_KEY, rows[-1][0])
+        metrics.incr("profile_cache.changes_published", len(rows))
+
+
+def _approximate_size(profile: Profile) -> int:
+    """Serialized size of the profile's views, a stable proxy for its memory footprint."""
+    return len(json.dumps(profile.to_dict())) + len(json.dumps(profile.for_llm()))
@@ -0,0 +1,235 @@
+# src/search/services/profile_documents.py
+
+"""
+Precomputed profile documents (migration 0005).
+
+Each row of profile_documents holds a profile in both read shapes, built in
+Postgres with the same expressions as profile_json.py, so serving a profile is
+one primary-key lookup instead of a read of five tables. Documents follow profile
+writes through the profile_changes log (migration 0003): the refresher
+rebuilds users with a change newer than their document's version, oldest
+change first, in committed batches of BATCH_SIZE. It runs in the background of
+the serving workers, one worker at a time, and also prunes the log
+(database/profile_changes.py) so that scanning it stays cheap. Reads check
+each document's version against the log and skip documents that are behind.
+
+Usage (from src/), to backfill after migrating and to repair drift:
+    python -m search.services.profile_documents            # rebuild all documents
+    python -m search.services.profile_documents --stale    # report staleness only
+
+change_id comes from a sequence, so a change can commit with a lower id than a
+document already built; such a change is only picked up by a full rebuild,
+which should run periodically (e.g. nightly).
+"""
+
+import sys
+import json
+import time
+import asyncio
+from typing import Dict, List, Optional
+from sqlalchemy import text
+from sqlalchemy.ext.asyncio import async_sessionmaker, AsyncSession
+from database.client import get_async_session_factory
+from database.profile_changes import prune, PRUNE_INTERVAL_SECONDS
+from database.read_models import ProfileDocument
+from search.services.metrics import metrics
+from search.services.profile_json import PROFILE_OBJECTS, DICT, LLM
+
+BATCH_SIZE = 500  # Documents built per statement, and per committed refresh batch
+MAX_BATCHES_PER_REFRESH = 20  # The rest waits for the next refresh
+REFRESH_LOCK_KEY = 0x70726f66  # Advisory lock held by the worker that is refreshing
+
+_UPSERT = text(f"""
+    INSERT INTO profile_documents (user_id, document, llm_digest, version, built_at)
+    SELECT
+        u.user_id,
+        {PROFILE_OBJECTS[DICT]}::jsonb,
+        {PROFILE_OBJECTS[LLM]}::text,
+        coalesce((SELECT max(c.change_id) FROM profile_changes c WHERE c.user_id = u.user_id), 0),
+        now()
+    FROM users u
+    WHERE u.user_id = ANY(CAST(:ids AS text[]))
+    ON CONFLICT (user_id) DO UPDATE SET
+        document = EXCLUDED.document,
+        llm_digest = EXCLUDED.llm_digest,
+        version = EXCLUDED.version,
+        built_at = EXCLUDED.built_at
+""")
+
+_DELETE_ORPHANS = text("""
+    DELETE FROM profile_documents d
+    WHERE d.user_id = ANY(CAST(:ids AS text[]))
+      AND NOT EXISTS (SELECT 1 FROM users u WHERE u.user_id = d.user_id)
+""")
+
+# Users whose document is missing or older than their latest change, oldest
+# change first (LIMIT NULL for all). Deleted users only count while they still
+# have a document to remove.
+_STALE = text("""
+    SELECT c.user_id, min(c.changed_at) AS oldest_change
+    FROM profile_changes c
+    LEFT JOIN profile_documents d ON d.user_id = c.user_id
+    WHERE c.change_id > coalesce(d.version, 0)
+      AND (d.user_id IS NOT NULL OR EXISTS (SELECT 1 FROM users u WHERE u.user_id = c.user_id))
+    GROUP BY c.user_id
+    ORDER BY oldest_change
+    LIMIT :limit
+""")
+
+# `current` is false while the user has a change newer than the document.
+_GET_MANY = text("""
+    SELECT
+        d.user_id,
+        d.document::text,
+        d.llm_digest,
+        extract(epoch FROM now() - d.built_at) AS age_seconds,
+        d.version >= coalesce((SELECT max(c.change_id) FROM profile_changes c WHERE c.user_id = d.user_id), 0) AS current
+    FROM profile_documents d
+    WHERE d.user_id = ANY(CAST(:ids AS text[]))
+""")
+
+
+class ProfileDocumentStore:
+    """
+    Primary-key reads of profile documents, plus the background refresher.
+    get() returns None for users without a current document (get_many() leaves
+    them out), and callers fall back to reading the profile tables. A document
+    older than its user's latest change is never served, so a user reads their
+    own writes and the profile caches are never filled from a stale document;
+    finding one brings the next refresh forward.
+    """
+
+    def __init__(self, session_factory: async_sessionmaker[AsyncSession], refresh_seconds: float = 10.0):
+        self.session_factory = session_factory
+        self.refresh_seconds = refresh_seconds
+        self._refreshed_at = 0.0
+        self._pruned_at = 0.0
+        self._refreshing: Optional[asyncio.Task] = None
+
+    async def get(self, user_id: str) -> Optional[ProfileDocument]:
+        return (await self.get_many([user_id])).get(user_id)
+
+    async def get_many(self, user_ids: List[str]) -> Dict[str, ProfileDocument]:
+        """The documents of the given users, in `user_ids` order, in one query."""
+        self._schedule_refresh()
+        ids = list(dict.fromkeys(user_ids))
+        if not ids:
+            return {}
+        async with self.session_factory() as session:
+            rows = (await session.execute(_GET_MANY, { "ids": ids })).all()
+        documents = {}
+        behind = 0
+        for row in rows:
+            if not row.current:
+                behind += 1
+                continue
+            metrics.observe("profile_documents.age_seconds", float(row.age_seconds))
+            documents[row.user_id] = ProfileDocument(row.user_id, json.loads(row.document), json.loads(row.llm_digest))
+        if behind:
+            metrics.incr("profile_documents.behind", behind)
+            # Refresh within a second of the last one instead of refresh_seconds.
+            self._refreshed_at = min(self._refreshed_at, time.monotonic() - self.refresh_seconds + 1.0)
+            self._schedule_refresh()
+        metrics.incr("profile_documents.hit", len(documents))
+        metrics.incr("profile_documents.miss", len(ids) - len(documents))
+        return { user_id: documents[user_id] for user_id in ids if user_id in documents }
+
+    def _schedule_refresh(self):
+        if self._refreshing is not None and not self._refreshing.done():
+            return
+        if time.monotonic() - self._refreshed_at < self.refresh_seconds:
+            return
+        self._refreshing = asyncio.create_task(self.refresh())
+
+    async def refresh(self):
+        """
+        Rebuilds the documents of users with unapplied changes, a committed
+        batch at a time, while no other worker is. The lock is a transaction
+        lock, so it is taken again for each batch.
+        """
+        started = time.monotonic()
+        refreshed = 0
+        try:
+            async with self.session_factory() as session:
+                for batch in range(MAX_BATCHES_PER_REFRESH):
+                    locked = (await session.execute(
+                        text("SELECT pg_try_advisory_xact_lock(:key)"), { "key": REFRESH_LOCK_KEY }
+                    )).scalar()
+                    if not locked:
+                        break
+                    stale = (await session.execute(_STALE, { "limit": BATCH_SIZE })).all()
+                    if batch == 0:
+                        # Oldest first, so the lag is exact; the count is capped at BATCH_SIZE.
+                        report_staleness(stale)
+                    user_ids = [user_id for user_id, _ in stale]
+                    await build(session, user_ids)
+                    await session.commit()
+                    refreshed += len(user_ids)
+                    if len(stale) < BATCH_SIZE:
+                        break
+                if time.monotonic() - self._pruned_at >= PRUNE_INTERVAL_SECONDS:
+                    pruned = await prune(session)
+                    await session.commit()
+                    self._pruned_at = time.monotonic()
+                    metrics.incr("profile_documents.changes_pruned", pruned)
+            if refreshed:
+                print(f"[DOCUMENTS]: Refreshed {refreshed} profile documents.")
+        except Exception as e:
+            print(f"[ERROR] Profile document refresh failed: {e}")
+            metrics.incr("profile_documents.refresh_failed")
+        finally:
+            self._refreshed_at = time.monotonic()
+        metrics.observe("profile_documents.refresh_ms", (time.monotonic() - started) * 1000)
+
+
+def report_staleness(stale: List) -> Dict[str, float]:
+    """Gauges the number of stale documents and how long the oldest unapplied change has waited."""
+    now = time.time()
+    lag = max((now - oldest.timestamp() for _, oldest in stale), default=0.0)
+    metrics.gauge("profile_documents.stale", len(stale))
+    metrics.gauge("profile_documents.lag_seconds", lag)
+    return { "stale": len(stale), "lag_seconds": round(lag, 1) }
+
+
+async def build(session: AsyncSession, user_ids: List[str]):
+    """(Re)builds the documents of the given users and drops those of deleted users."""
+    for i in range(0, len(user_ids), BATCH_SIZE):
+        batch = user_ids[i:i + BATCH_SIZE]
+        await session.execute(_UPSERT, { "ids": batch })
+        await session.execute(_DELETE_ORPHANS, { "ids": batch })
+    metrics.incr("profile_documents.built", len(user_ids))
+
+
+async def rebuild(session: AsyncSession) -> int:
+    """Rebuilds every document, committing batch by batch, and removes documents of deleted users."""
+    built = 0
+    last = ""
+    while True:
+        user_ids = (await session.execute(
+            text("SELECT user_id FROM users WHERE user_id > :last ORDER BY user_id LIMIT :limit"),
+            { "last": last, "limit": BATCH_SIZE }
+        )).scalars().all()
+        if not user_ids:
+            break
+        await build(session, user_ids)
+        await session.commit()
+        built += len(user_ids)
+        last = user_ids[-1]
+        print(f"[DOCUMENTS]: Built {built} documents...")
+    await session.execute(text(
+        "DELETE FROM profile_documents d WHERE NOT EXISTS (SELECT 1 FROM users u WHERE u.user_id = d.user_id)"
+    ))
+    await session.commit()
+    return built
+
+
+async def main(args: List[str]):
+    async with get_async_session_factory()() as session:
+        if "--stale" not in args:
+            print(f"[DOCUMENTS]: Rebuilt {await rebuild(session)} profile documents.")
+        stale = (await session.execute(_STALE, { "limit": None })).all()
+        print(f"[DOCUMENTS]: {report_staleness(stale)}")
+
+
+if __name__ == "__main__":
+    asyncio.run(main(sys.argv[1:]))
@@ -0,0 +1,152 @@
+# src/search/services/profile_json.py
+
+"""
+Profiles serialized by Postgres instead of the ORM.
+
+ProfileJSONLoader reads any number of profiles with one SQL statement that
+builds each profile with json_build_object, in either the User.to_dict() shape
+(DICT) or the User.for_llm() shape (LLM). Rows come back as JSON text, wrapped
+in RawJSON, and dumps_event() splices them into SSE events as is, so a profile
+is never hydrated into ORM objects, converted to dicts, or encoded again.
+
+The text matches what the ORM path produces once parsed, except that nested
+lists are ordered by primary key (the ORM loads them in table order). LLM
+strings reproduce the Python formatting exactly, including "None" for missing
+values, so prompts and their cache keys do not change with the read path.
+
+Benchmark: python -m benchmarks.profile_json_benchmark
+"""
+
+import json
+from typing import Any, Dict, List
+from sqlalchemy import text
+from sqlalchemy.ext.asyncio import async_sessionmaker, AsyncSession
+from search.services.metrics import metrics
+
+DICT = "dict"
+LLM = "llm"
+
+
+class RawJSON(str):
+    """Already-serialized JSON, spliced into events by dumps_event() instead of encoded as a string."""
+
+
+def dumps_event(event: Dict[str, Any]) -> str:
+    """json.dumps for events whose message may be RawJSON or a list of RawJSON."""
+    message = event.get("message")
+    if isinstance(message, RawJSON):
+        raw = message
+    elif isinstance(message, list) and message and all(isinstance(item, RawJSON) for item in message):
+        raw = "[" + ", ".join(message) + "]"
+    else:
+        return json.dumps(event)
+    rest = json.dumps({ key: value for key, value in event.items() if key != "message" })
+    separator = ", " if len(rest) > 2 else ""
+    return f'{rest[:-1]}{separator}"message": {raw}}}'
+
+
+def _py_str(column: str) -> str:
+    """A text column as a Python f-string renders it, with None for NULL."""
+    return f"coalesce({column}::text, 'None')"
+
+
+def _day(column: str) -> str:
+    return f"to_char({column}, 'YYYY-MM-DD')"
+
+
+def _objects(table: str, alias: str, order_by: str, fields: List[tuple]) -> str:
+    """Correlated subquery: the user's rows of a table as a JSON array, '[]' when none."""
+    pairs = ", ".join(f"'{name}', {expression}" for name, expression in fields)
+    return _array(table, alias, order_by, f"json_build_object({pairs})")
+
+
+def _array(table: str, alias: str, order_by: str, element: str) -> str:
+    # array_to_json, unlike json_agg, puts no newlines between elements, which SSE data lines cannot carry.
+    return (
+        f"coalesce((SELECT array_to_json(array_agg({element} ORDER BY {alias}.{order_by})) "
+        f"FROM {table} {alias} WHERE {alias}.user_id = u.user_id), '[]'::json)"
+    )
+
+
+def _columns(alias: str, names: List[str]) -> List[tuple]:
+    return [(name, f"{alias}.{name}") for name in names]
+
+
+_DICT_FIELDS = _columns("u", ["user_id", "first_name", "last_name", "email", "pfp_url"]) + [
+    ("projects", _objects("projects", "p", "project_id", _columns("p", [
+        "project_id", "user_id", "project_name", "project_description", "github_url", "project_url",
+        "project_start_date", "project_end_date"
+    ]))),
+    ("educations", _objects("educations", "ed", "education_id", _columns("ed", [
+        "education_id", "user_id", "institution_name", "degree_type", "degree_name",
+        "enrollment_date", "graduation_date"
+    ]))),
+    ("experiences", _objects("experiences", "ex", "experience_id", _columns("ex", [
+        "experience_id", "user_id", "company_name", "start_date", "end_date", "experience_description",
+        "job_title", "location"
+    ]))),
+    ("skills", _objects("skills", "s", "skill_id", _columns("s", ["skill_id", "user_id", "skill_name"]))),
+]
+
+# Experience.job_description() and Education.education_description().
+_JOB_DESCRIPTION = (
+    f"CASE WHEN ex.start_date IS NULL THEN concat({_py_str('ex.job_title')}, ' at ', {_py_str('ex.company_name')}) "
+    f"ELSE concat({_py_str('ex.job_title')}, ' at ', {_py_str('ex.company_name')}, "
+    f"'. From ', {_day('ex.start_date')}, ' to ', coalesce({_day('ex.end_date')}, 'Present'), "
+    f"'. Description: ', {_py_str('ex.experience_description')}) END"
+)
+_EDUCATION_DESCRIPTION = (
+    f"concat({_py_str('ed.degree_type')}, ' in ', {_py_str('ed.degree_name')}, ' at ', {_py_str('ed.institution_name')}, '. ', "
+    f"CASE WHEN ed.enrollment_date IS NOT NULL AND ed.graduation_date IS NOT NULL "
+    f"THEN concat('From ', {_day('ed.enrollment_date')}, ' to ', {_day('ed.graduation_date')}) ELSE '' END)"
+)
+
+_LLM_FIELDS = [
+    ("user_id", "u.user_id"),
+    ("name", f"concat({_py_str('u.first_name')}, ' ', {_py_str('u.last_name')})"),
+    ("contact", "u.email"),
+    ("projects", _objects("projects", "p", "project_id", _columns("p", [
+        "project_id", "project_name", "project_description"
+    ]))),
+    ("experiences", _array("experiences", "ex", "experience_id", _JOB_DESCRIPTION)),
+    ("educations", _array("educations", "ed", "education_id", _EDUCATION_DESCRIPTION)),
+    ("skills", _array("skills", "s", "skill_id", "s.skill_name")),
+]
+
+
+def _profile_object(fields: List[tuple]) -> str:
+    pairs = ",\n        ".join(f"'{name}', {expression}" for name, expression in fields)
+    return f"json_build_object(\n        {pairs}\n        )"
+
+
+# The json expression for each shape, over a row of users aliased as u.
+PROFILE_OBJECTS = { DICT: _profile_object(_DICT_FIELDS), LLM: _profile_object(_LLM_FIELDS) }
+
+STATEMENTS = {
+    shape: text(f"""
+        SELECT u.user_id, {expression}::text AS profile
+        FROM users u
+        WHERE u.user_id = ANY(CAST(:ids AS text[]))
+    """)
+    for shape, expression in PROFILE_OBJECTS.items()
+}
+
+
+class ProfileJSONLoader:
+    """Loads profiles as ready-to-send JSON text, one statement per batch."""
+
+    def __init__(self, session_factory: async_sessionmaker[AsyncSession]):
+        self.session_factory = session_factory
+
+    async def load(self, user_ids: List[str], shape: str = DICT) -> Dict[str, RawJSON]:
+        """user_id -> profile JSON for the ids that exist, in the order of user_ids."""
+        ids = list(dict.fromkeys(user_ids))
+        if not ids:
+            return {}
+        async with self.session_factory() as session:
+            rows = (await session.execute(STATEMENTS[shape], { "ids": ids })).all()
+        profiles = { user_id: RawJSON(profile) for user_id, profile in rows }
+        metrics.incr(f"profile_json.{shape}.loaded", len(profiles))
+        if len(profiles) < len(ids):
+            metrics.incr("profile_json.missing", len(ids) - len(profiles))
+        return { user_id: profiles[user_id] for user_id in ids if user_id in profiles }
@@ -1,34 +1,271 @@
 # src/search/services/prompt_manager.py
 
+import os
 import yaml
+import threading
 from pathlib import Path
+from string import Formatter
+from typing import Dict, Iterable, List, Mapping, Optional, Tuple
+
+_formatter = Formatter()
+
+DEFAULT_POLL_INTERVAL_SECONDS = 2.0
+
+
+class _UniqueKeyLoader(yaml.SafeLoader):
+    """SafeLoader that rejects duplicate mapping keys instead of keeping the last one."""
+
+    def construct_mapping(self, node, deep=False):
+        seen = set()
+        for key_node, _ in node.value:
+            key = self.construct_object(key_node, deep=deep)
+            if key in seen:
+                raise ValueError(f"Duplicate prompt template key '{key}' at line {key_node.start_mark.line + 1}")
+            seen.add(key)
+        return super().construct_mapping(node, deep=deep)
+
+
+class CompiledPrompt:
+    """
+    A prompt template split into a static prefix and a dynamic suffix.
+
+    The prefix is sent as the system message and is byte-identical across
+    calls, so provider-side prompt prefix caching can hit on it. Only the
+    suffix is formatted per call and sent as the user message. The suffix is
+    parsed once into literal/field segments, so rendering is a join.
+    """
+
+    def __init__(self, name: str, prefix: str, suffix: str, joiner: Optional[str] = None):
+        self.name = name
+        self.prefix = prefix
+        self.suffix = suffix
+        # Text placed between prefix and suffix by render(), so a split plain
+        # string template still renders exactly as str.format would.
+        self._joiner = "\n\n" if joiner is None else joiner
+        self._segments, self.fields = self._parse(suffix)
+
+    def render(self, **kwargs) -> str:
+        suffix = self._format_suffix(**kwargs)
+        return f"{self.prefix}{self._joiner}{suffix}" if self.prefix else suffix
+
+    def messages(self, **kwargs) -> List[Dict[str, str]]:
+        messages = []
+        if self.prefix:
+            messages.append({ "role": "system", "content": self.prefix })
+        messages.append({ "role": "user", "content": self._format_suffix(**kwargs) })
+        return messages
+
+    def _format_suffix(self, **kwargs) -> str:
+        if self._segments is None:
+            try:
+                return self.suffix.format(**kwargs)
+            except KeyError as e:
+                raise ValueError(f"Missing required format variable in template {self.name}: {e}")
+
+        parts = []
+        for literal, field in self._segments:
+            parts.append(literal)
+            if field is not None:
+                try:
+                    parts.append(str(kwargs[field]))
+                except KeyError as e:
+                    raise ValueError(f"Missing required format variable in template {self.name}: {e}")
+        return "".join(parts)
+
+    @staticmethod
+    def _parse(template: str) -> Tuple[Optional[List[Tuple[str, Optional[str]]]], set]:
+        """
+        Pre-compiles plain `{name}` placeholders into segments. Templates using
+        format specs, conversions or attribute access fall back to str.format.
+        """
+        segments = []
+        fields = set()
+        simple = True
+        for literal, field, spec, conversion in _formatter.parse(template):
+            if field is not None:
+                fields.add(field)
+                if spec or conversion or not field.isidentifier():
+                    simple = False
+            segments.append((literal, field))
+        return (segments if simple else None), fields
+
+    @classmethod
+    def compile(cls, name: str, template) -> "CompiledPrompt":
+        """
+        Templates are either a {system, user} mapping, where system must be
+        static, or a plain string, which is split at its first placeholder.
+        """
+        if isinstance(template, dict):
+            system = template.get("system", "")
+            user = template.get("user", "")
+            fields = [field for _, field, _, _ in _formatter.parse(system) if field is not None]
+            if fields:
+                raise ValueError(f"System prefix of template {name} must be static, found placeholders: {fields}")
+            prefix = "".join(literal for literal, _, _, _ in _formatter.parse(system))
+            return cls(name, prefix.strip(), user)
+
+        if not isinstance(template, str):
+            raise ValueError(f"Invalid prompt template {name}: expected a string or a system/user mapping")
+
+        prefix = ""
+        suffix = ""
+        static = True
+        for literal, field, spec, conversion in _formatter.parse(template):
+            if static:
+                prefix += literal
+                if field is None:
+                    continue
+                static = False
+                literal = ""
+            suffix += literal.replace("{", "{{").replace("}", "}}")
+            if field is not None:
+                suffix += "{" + field
+                suffix += f"!{conversion}" if conversion else ""
+                suffix += f":{spec}" if spec else ""
+                suffix += "}"
+
+        if static:
+            # No placeholders at all: the whole template is the user message.
+            return cls(name, "", template)
+        stripped = prefix.rstrip()
+        return cls(name, stripped.lstrip(), suffix, joiner=prefix[len(stripped):])
+
+
+class TemplateRegistry:
+    """
+    Process-wide, compiled view of one prompt template file.
+
+    The file is parsed and validated once; a daemon thread polls its mtime and
+    swaps in a freshly compiled template dict when it changes. The swap is a
+    single reference assignment, so readers never see a partial reload and
+    never touch the filesystem. A reload that fails validation is logged and
+    the previous templates stay live.
+    """
+
+    def __init__(
+        self,
+        template_file: str,
+        required_placeholders: Optional[Mapping[str, Iterable[str]]] = None,
+        poll_interval: float = DEFAULT_POLL_INTERVAL_SECONDS
+    ):
+        self._path = Path(template_file)
+        self._required = { name: set(fields) for name, fields in (required_placeholders or {}).items() }
+        self._poll_interval = poll_interval
+        self._mtime_ns: Optional[int] = None
+        self._watcher: Optional[threading.Thread] = None
+        self._lock = threading.Lock()
+        self.templates: Dict[str, CompiledPrompt] = {}
+        self.load()
+
+    def load(self):
+        with self._lock:
+            if not self._path.exists():
+                raise FileNotFoundError(f"Prompt template file not found: {self._path}")
+
+            mtime_ns = os.stat(self._path).st_mtime_ns
+            try:
+                with open(self._path, "r") as f:
+                    raw = yaml.load(f, Loader=_UniqueKeyLoader)
+            except yaml.YAMLError as e:
+                raise ValueError(f"Invalid YAML in prompt template file: {e}")
+
+            if not isinstance(raw, dict):
+                raise ValueError(f"Prompt template file {self._path} must be a mapping of template names")
+
+            compiled = { name: CompiledPrompt.compile(name, template) for name, template in raw.items() }
+            self._validate(compiled)
+
+            self.templates = compiled
+            self._mtime_ns = mtime_ns
+            print(f"[PROMPTS]: Loaded {len(compiled)} templates from {self._path}")
+
+    def _validate(self, compiled: Dict[str, CompiledPrompt]):
+        for name, required in self._required.items():
+            if name not in compiled:
+                raise ValueError(f"Required prompt template missing from {self._path}: {name}")
+            fields = compiled[name].fields
+            missing = required - fields
+            unknown = fields - required
+            if missing or unknown:
+                raise ValueError(
+                    f"Placeholder mismatch in template {name}: "
+                    f"missing {sorted(missing)}, unexpected {sorted(unknown)}"
+                )
+
+    def watch(self):
+        if self._watcher is not None:
+            return
+        self._watcher = threading.Thread(
+            target=self._watch_loop,
+            name=f"prompt-watcher:{self._path.name}",
+            daemon=True
+        )
+        self._watcher.start()
+
+    def _watch_loop(self):
+        stop = threading.Event()
+        while not stop.wait(self._poll_interval):
+            try:
+                mtime_ns = os.stat(self._path).st_mtime_ns
+            except OSError as e:
+                print(f"[WARN] Cannot stat prompt template file {self._path}: {e}")
+                continue
+            if mtime_ns == self._mtime_ns:
+                continue
+            try:
+                self.load()
+            except (ValueError, OSError) as e:
+                # Remember the broken version so it is not re-parsed every poll.
+                self._mtime_ns = mtime_ns
+                print(f"[ERROR] Prompt template reload failed, keeping previous templates: {e}")
+
+    def get(self, prompt_name: str) -> CompiledPrompt:
+        try:
+            return self.templates[prompt_name]
+        except KeyError:
+            raise KeyError(f"Prompt template not found: {prompt_name}")
+
+
+_registries: Dict[Path, TemplateRegistry] = {}
+_registries_lock = threading.Lock()
+
+
+def get_template_registry(
+    template_file: str,
+    required_placeholders: Optional[Mapping[str, Iterable[str]]] = None,
+    watch: bool = True
+) -> TemplateRegistry:
+    path = Path(template_file).resolve()
+    with _registries_lock:
+        registry = _registries.get(path)
+        if registry is None:
+            registry = TemplateRegistry(str(path), required_placeholders)
+            _registries[path] = registry
+    if watch:
+        registry.watch()
+    return registry
+
 
 class PromptManager:
-    
-    def __init__(self, template_file="andrew_prompts.yaml"):
+
+    def __init__(
+        self,
+        template_file="andrew_prompts.yaml",
+        required_placeholders: Optional[Mapping[str, Iterable[str]]] = None
+    ):
         self._template_file = template_file
-        self.templates = self._load_prompt_templates(template_file)
-    
-    def _load_prompt_templates(self, file_path):
-        path = Path(file_path)
-        if not path.exists():
-            raise FileNotFoundError(f"Prompt template file not found: {file_path}")
-        
-        try:
-            with open(path, "r") as f:
-                templates = yaml.safe_load(f)
-            return templates
-        except yaml.YAMLError as e:
-            raise ValueError(f"Invalid YAML in prompt template file: {e}")
-    
+        self._registry = get_template_registry(template_file, required_placeholders)
+
+    @property
+    def templates(self) -> Dict[str, CompiledPrompt]:
+        return self._registry.templates
+
     def get_prompt(self, prompt_name, **kwargs):
-        if prompt_name not in self.templates:
-            raise KeyError(f"Prompt template not found: {prompt_name}")
-        
-        try:
-            return self.templates[prompt_name].format(**kwargs)
-        except KeyError as e:
-            raise ValueError(f"Missing required format variable in template {prompt_name}: {e}")
-    
+        return self._registry.get(prompt_name).render(**kwargs)
+
+    def get_messages(self, prompt_name, **kwargs) -> List[Dict[str, str]]:
+        """Returns the prompt as [system (static prefix), user (dynamic suffix)] messages."""
+        return self._registry.get(prompt_name).messages(**kwargs)
+
     def reload_templates(self):
-        self.templates = self._load_prompt_templates(self._template_file)
+        self._registry.load()
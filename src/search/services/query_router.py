@@ -0,0 +1,235 @@
+# src/search/services/query_router.py
+
+import re
+import asyncio
+import numpy as np
+from typing import Any, Dict, List, Optional
+from sentence_transformers import SentenceTransformer
+from search.services.metrics import metrics
+
+# Reference queries for the embedding classifier. "Simple" queries are a plain
+# lookup on profile fields; "complex" ones need the agent to reason or plan.
+SIMPLE_EXAMPLES = [
+    "software engineers at google",
+    "data scientists in new york",
+    "product managers at stripe in san francisco",
+    "people who know rust",
+    "designers in london",
+    "engineers with kubernetes",
+    "machine learning engineers",
+    "recruiters at meta",
+    "python developers in austin",
+]
+COMPLEX_EXAMPLES = [
+    "who would be a good cofounder for a climate startup",
+    "find someone who moved from finance into engineering",
+    "people who worked at two startups before joining big tech",
+    "compare the backgrounds of the top candidates",
+    "who has a background similar to mine",
+    "engineers who left google in the last two years to start companies",
+    "which of these people would fit a senior backend role",
+    "i need help finding a mentor for my career change",
+    "what should i look for when hiring my first engineer",
+]
+# Reference texts per vector namespace, used to pick where a keyword query goes.
+NAMESPACE_EXAMPLES = {
+    "experience": ["backend engineer building payment systems", "worked on distributed systems", "growth marketing lead"],
+    "skill": ["python", "kubernetes and terraform", "react", "figma"],
+    "education": ["stanford computer science", "phd in machine learning", "mba graduates"],
+    "summary": ["passionate about climate tech", "startup founder", "open source maintainer"],
+}
+
+_LEADING = re.compile(
+    r"^(?:please\s+)?(?:(?:find|show|list|get|search\s+for|search|look\s+for|looking\s+for|"
+    r"i\s+(?:am|'m)\s+looking\s+for|i\s+need|i\s+want|give)\s+)?(?:me\s+)?(?:all\s+|some\s+|the\s+|any\s+)?"
+)
+_SLOTS = re.compile(r"\s+(at|in|based\s+in|located\s+in|from|with|who\s+know|who\s+knows|skilled\s+in)\s+")
+_SLOT_FIELDS = {
+    "at": "company_name",
+    "from": "company_name",
+    "in": "location",
+    "based in": "location",
+    "located in": "location",
+    "with": "skill",
+    "who know": "skill",
+    "who knows": "skill",
+    "skilled in": "skill",
+}
+_GENERIC_SUBJECTS = { "people", "person", "users", "candidates", "someone", "anyone", "folks", "profiles", "employees" }
+# Words that signal conditions the structured filters cannot express.
+_COMPLEX_WORDS = {
+    "who", "that", "which", "whose", "not", "without", "except", "or", "but", "than", "more", "less",
+    "years", "year", "best", "top", "similar", "like", "worked", "working", "previously", "formerly",
+    "ex", "former", "before", "after", "since", "between", "and", "phd", "degree", "graduates",
+    "graduated", "students", "alumni", "studied", "why", "how", "what", "should", "would", "could",
+}
+_ROLE_WORDS = {
+    "engineer", "developer", "scientist", "designer", "manager", "recruiter", "analyst", "founder",
+    "architect", "researcher", "consultant", "director", "lead", "intern", "marketer", "administrator",
+    "specialist", "officer", "accountant", "writer", "programmer", "president", "cto", "ceo",
+}
+_SKILL_SUFFIX = re.compile(r"\s+(?:skills?|experience)$")
+# A bare "in" also introduces topics and dates ("engineers in fintech", "in 2020"),
+# so it only sets the location when followed by one of these.
+_KNOWN_PLACES = {
+    "remote", "usa", "us", "united states", "uk", "united kingdom", "canada", "mexico", "brazil",
+    "germany", "france", "spain", "italy", "netherlands", "ireland", "sweden", "switzerland",
+    "poland", "portugal", "india", "china", "japan", "singapore", "australia", "israel", "nigeria",
+    "europe", "asia", "africa", "latin america", "bay area", "silicon valley",
+    "california", "texas", "new york", "washington", "massachusetts", "florida", "illinois",
+    "colorado", "georgia", "ontario", "san francisco", "sf", "nyc", "new york city", "los angeles",
+    "la", "seattle", "austin", "boston", "chicago", "denver", "atlanta", "miami", "dallas",
+    "houston", "san diego", "san jose", "palo alto", "mountain view", "menlo park", "portland",
+    "philadelphia", "pittsburgh", "washington dc", "dc", "toronto", "vancouver", "montreal",
+    "london", "dublin", "paris", "berlin", "munich", "amsterdam", "stockholm", "zurich", "madrid",
+    "barcelona", "lisbon", "warsaw", "tel aviv", "bangalore", "bengaluru", "hyderabad", "mumbai",
+    "delhi", "pune", "beijing", "shanghai", "shenzhen", "tokyo", "seoul", "hong kong", "sydney",
+    "melbourne", "lagos", "nairobi", "sao paulo", "mexico city", "buenos aires",
+}
+_DIGITS = re.compile(r"\d")
+
+
+class QueryRouter:
+    """
+    Decides whether a query can skip the agent loop.
+
+    A rule-based parser maps "<title> at <company> in <location> with <skill>"
+    style queries onto filter_structured fields; an embedding classifier scores
+    how much the query looks like a plain lookup. Filter routes need a full
+    parse and a confident classifier; short keyword queries with no structure
+    can go to a single vector search. Anything else returns None, meaning the
+    agent should handle it.
+    """
+
+    def __init__(
+        self,
+        embedding_engine: SentenceTransformer,
+        filter_threshold: float,
+        vector_threshold: float,
+        max_vector_words: int = 4
+    ):
+        self.embedding_engine = embedding_engine
+        self.filter_threshold = filter_threshold
+        self.vector_threshold = vector_threshold
+        self.max_vector_words = max_vector_words
+        self._prototypes: Optional[Dict[str, np.ndarray]] = None
+        self._prototype_lock = asyncio.Lock()
+
+    async def route(self, query: str) -> Optional[Dict[str, Any]]:
+        normalized = " ".join(query.lower().strip().rstrip(".!").split())
+        if not normalized or "?" in normalized:
+            metrics.incr("query_router.agent")
+            return None
+
+        filters = self.parse_filters(normalized)
+        if filters is None and _SLOTS.search(f" {normalized} "):
+            # Structured, but a slot failed validation: the agent can read it properly.
+            metrics.incr("query_router.agent")
+            return None
+        if filters is None and len(normalized.split()) > self.max_vector_words:
+            # Long free-form text: not worth an embedding to find out.
+            metrics.incr("query_router.agent")
+            return None
+
+        try:
+            confidence, namespace = await self._classify(normalized)
+        except Exception as e:
+            print(f"[WARN] Query router classifier failed, using the agent: {e}")
+            metrics.incr("query_router.agent")
+            return None
+
+        if filters is not None and confidence >= self.filter_threshold:
+            metrics.incr("query_router.filter")
+            return { "route": "filter", "filters": filters, "confidence": confidence }
+        if filters is None and confidence >= self.vector_threshold:
+            metrics.incr("query_router.vector")
+            return { "route": "vector", "query": normalized, "namespace": namespace, "confidence": confidence }
+
+        print(f"[ROUTER]: Low confidence ({confidence:.2f}) for '{normalized}', using the agent")
+        metrics.incr("query_router.agent")
+        return None
+
+    def parse_filters(self, query: str) -> Optional[Dict[str, str]]:
+        """
+        Parses a lowercase query into filter_structured fields, or None when
+        any part of it falls outside the grammar or fails validation: a bare
+        "in" must name a known place, and no slot may be a number.
+        """
+        text = _LEADING.sub("", query, count=1)
+        parts = _SLOTS.split(f" {text} ")
+        head = parts[0].strip()
+        filters: Dict[str, str] = {}
+
+        for keyword, value in zip(parts[1::2], parts[2::2]):
+            keyword = " ".join(keyword.split())
+            field = _SLOT_FIELDS[keyword]
+            value = value.strip()
+            if field == "skill":
+                value = _SKILL_SUFFIX.sub("", value)
+            if not value or field in filters or value.isdigit():
+                return None
+            if field == "skill" and value in { "skills", "skill", "experience" }:
+                return None
+            if field == "location" and (_DIGITS.search(value) or (keyword == "in" and value not in _KNOWN_PLACES)):
+                return None
+            filters[field] = value
+
+        if head and head not in _GENERIC_SUBJECTS:
+            title = self._role_title(head)
+            # A bare phrase is only a title filter if it names a role; "rust" is a keyword.
+            if not filters and title.split()[-1] not in _ROLE_WORDS:
+                return None
+            filters["job_title"] = title
+
+        words = set(" ".join(filters.values()).split())
+        if not filters or words & _COMPLEX_WORDS:
+            return None
+        if any(len(value.split()) > 4 for value in filters.values()):
+            return None
+        return filters
+
+    def _role_title(self, title: str) -> str:
+        """Singularizes a plural role word ("engineers"); any other title is kept as written."""
+        words = title.split()
+        if words[-1].endswith("s") and words[-1][:-1] in _ROLE_WORDS:
+            words[-1] = words[-1][:-1]
+        return " ".join(words)
+
+    async def _classify(self, query: str):
+        """Returns (probability the query is a simple lookup, closest vector namespace)."""
+        prototypes = await self._get_prototypes()
+        embedding = await self._encode([query])
+        embedding = embedding[0]
+
+        simple = float(np.max(prototypes["simple"] @ embedding))
+        complex_ = float(np.max(prototypes["complex"] @ embedding))
+        # Softmax over the two nearest-example similarities.
+        confidence = float(1.0 / (1.0 + np.exp((complex_ - simple) / 0.05)))
+
+        namespace = max(
+            NAMESPACE_EXAMPLES,
+            key=lambda ns: float(np.max(prototypes[f"ns:{ns}"] @ embedding))
+        )
+        return confidence, namespace
+
+    async def _get_prototypes(self) -> Dict[str, np.ndarray]:
+        if self._prototypes is None:
+            async with self._prototype_lock:
+                if self._prototypes is None:
+                    prototypes = {
+                        "simple": await self._encode(SIMPLE_EXAMPLES),
+                        "complex": await self._encode(COMPLEX_EXAMPLES),
+                    }
+                    for namespace, examples in NAMESPACE_EXAMPLES.items():
+                        prototypes[f"ns:{namespace}"] = await self._encode(examples)
+                    self._prototypes = prototypes
+        return self._prototypes
+
+    async def _encode(self, texts: List[str]) -> np.ndarray:
+        embeddings = await asyncio.to_thread(
+            self.embedding_engine.encode,
+            texts,
+            prompt_name="classification",
+            normalize_embeddings=True
+        )
+        return np.asarray(embeddings, dtype=np.float32)
@@ -0,0 +1,133 @@
+# src/search/services/run_scheduler.py
+
+import asyncio
+import time
+from typing import Any, AsyncGenerator, Dict, Mapping, Optional
+
+# Stages that produce the answer once the loop stops. They get their own
+# timeout even after the run deadline has passed, so an exhausted run still
+# ends with a response built from the results found so far.
+FINALIZATION_STAGES = { "response", "format_users" }
+
+
+class StageTimeout(Exception):
+    """Raised when a stage of the run exceeds its time allowance."""
+
+    def __init__(self, stage: str, timeout: float):
+        super().__init__(f"Stage '{stage}' timed out after {timeout:.1f}s")
+        self.stage = stage
+        self.timeout = timeout
+
+
+class RunScheduler:
+    """
+    Tracks one agent run against its limits: iteration count, wall-clock
+    deadline, per-stage timeouts and a cumulative token budget.
+
+    The run loop asks `exhausted()` before each iteration and, once a limit is
+    reached, goes straight to finalization. Stage timeouts are capped by the
+    time left until the deadline, except for finalization stages.
+    """
+
+    def __init__(
+        self,
+        max_iterations: int,
+        deadline_seconds: float,
+        token_budget: int,
+        stage_timeouts: Optional[Mapping[str, float]] = None
+    ):
+        self.max_iterations = max_iterations
+        self.deadline_seconds = deadline_seconds
+        self.token_budget = token_budget
+        self.stage_timeouts = dict(stage_timeouts or {})
+        self.iteration = 0
+        self.tokens_used = 0
+        self.stage_seconds: Dict[str, float] = {}
+        self.stop_reason: Optional[str] = None
+        self._started = time.monotonic()
+
+    @property
+    def elapsed(self) -> float:
+        return time.monotonic() - self._started
+
+    @property
+    def remaining(self) -> float:
+        return self.deadline_seconds - self.elapsed
+
+    def next_iteration(self):
+        self.iteration += 1
+
+    def record_tokens(self, tokens: int):
+        self.tokens_used += tokens
+
+    def stop(self, reason: str):
+        if self.stop_reason is None:
+            self.stop_reason = reason
+
+    def exhausted(self) -> Optional[str]:
+        """The reason the run must stop now, or None while it may continue."""
+        if self.stop_reason is None:
+            if self.iteration >= self.max_iterations:
+                self.stop_reason = f"reached the limit of {self.max_iterations} iterations"
+            elif self.remaining <= 0:
+                self.stop_reason = f"reached the {self.deadline_seconds:.0f}s deadline"
+            elif self.tokens_used >= self.token_budget:
+                self.stop_reason = f"used {self.tokens_used} of the {self.token_budget} token budget"
+        return self.stop_reason
+
+    def timeout_for(self, stage: str, default: Optional[float] = None) -> Optional[float]:
+        timeout = self.stage_timeouts.get(stage, default)
+        if stage in FINALIZATION_STAGES:
+            return timeout
+        remaining = max(self.remaining, 0.0)
+        return remaining if timeout is None else min(timeout, remaining)
+
+    async def bounded(self, stage: str, awaitable, default: Optional[float] = None):
+        """Awaits one step of a stage within its time allowance."""
+        timeout = self.timeout_for(stage, default)
+        started = time.monotonic()
+        try:
+            return await asyncio.wait_for(awaitable, timeout=timeout)
+        except asyncio.TimeoutError:
+            raise StageTimeout(stage, timeout or 0.0)
+        finally:
+            self._add_stage_time(stage, time.monotonic() - started)
+
+    async def stream(self, stage: str, agen: AsyncGenerator[Any, None]) -> AsyncGenerator[Any, None]:
+        """
+        Re-yields a streaming stage, bounding the whole stream (not each chunk)
+        by the stage's allowance. Time spent by the consumer between chunks
+        counts against the stage too.
+        """
+        timeout = self.timeout_for(stage)
+        started = time.monotonic()
+        try:
+            while True:
+                left = None if timeout is None else timeout - (time.monotonic() - started)
+                if left is not None and left <= 0:
+                    raise StageTimeout(stage, timeout)
+                try:
+                    chunk = await asyncio.wait_for(agen.__anext__(), timeout=left)
+                except StopAsyncIteration:
+                    return
+                except asyncio.TimeoutError:
+                    raise StageTimeout(stage, timeout)
+                yield chunk
+        finally:
+            self._add_stage_time(stage, time.monotonic() - started)
+            await agen.aclose()
+
+    def _add_stage_time(self, stage: str, seconds: float):
+        self.stage_seconds[stage] = self.stage_seconds.get(stage, 0.0) + seconds
+
+    def snapshot(self) -> Dict[str, Any]:
+        return {
+            "iteration": self.iteration,
+            "max_iterations": self.max_iterations,
+            "elapsed_seconds": round(self.elapsed, 3),
+            "deadline_seconds": self.deadline_seconds,
+            "tokens_used": self.tokens_used,
+            "token_budget": self.token_budget,
+            "stage_seconds": { stage: round(seconds, 3) for stage, seconds in self.stage_seconds.items() },
+            "stop_reason": self.stop_reason,
+        }
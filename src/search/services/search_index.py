@@ -0,0 +1,70 @@
+# src/search/services/search_index.py
+
+"""
+Index-backed matching for structured profile filters (see filter_compiler.py).
+
+Relies on database/migrations/0002_experiences_search_indexes.sql:
+substring filters on experiences use ILIKE, which Postgres serves from the
+pg_trgm GIN indexes, and the `keywords` filter uses the weighted search_tsv
+column. `experience_rank` scores how well a user's best experience matches, so
+filtered results can be ordered instead of returned in table order.
+"""
+
+from typing import Any, Dict, List
+from sqlalchemy import select, func, literal_column
+from sqlalchemy.sql.elements import ColumnElement
+from database.models import User, Experience
+
+# Filter name -> experiences column matched by substring (trigram index).
+TRIGRAM_FIELDS = {
+    "location": Experience.location,
+    "company_name": Experience.company_name,
+    "job_title": Experience.job_title,
+}
+KEYWORDS_FIELD = "keywords"
+TS_CONFIG = "simple"
+
+# pg_trgm cannot use the index for patterns shorter than a trigram.
+MIN_TRIGRAM_LENGTH = 3
+
+
+def _escape_like(value: str) -> str:
+    return value.replace("\\", "\\\\").replace("%", "\\%").replace("_", "\\_")
+
+
+def substring_match(column, value: str) -> ColumnElement:
+    """ILIKE '%value%' with the value's wildcards escaped."""
+    return column.ilike(f"%{_escape_like(value)}%", escape="\\")
+
+
+def keywords_query(value: str):
+    """Parses free text ("a b", "a or b", "-c", quoted phrases) into a tsquery."""
+    return func.websearch_to_tsquery(literal_column(f"'{TS_CONFIG}'::regconfig"), value)
+
+
+def experience_rank(filters: Dict[str, Any]):
+    """
+    Correlated scalar subquery: the best score among the user's experiences,
+    summing trigram word similarity for substring filters and ts_rank for
+    keywords. Returns None when no ranked filter is present.
+    """
+    scores: List[ColumnElement] = []
+    for field, value in filters.items():
+        if not isinstance(value, str) or not value.strip():
+            continue
+        if field in TRIGRAM_FIELDS:
+            scores.append(func.coalesce(func.word_similarity(value.strip(), TRIGRAM_FIELDS[field]), 0.0))
+        elif field == KEYWORDS_FIELD:
+            scores.append(func.ts_rank(Experience.search_tsv, keywords_query(value.strip())))
+    if not scores:
+        return None
+
+    total = scores[0]
+    for score in scores[1:]:
+        total = total + score
+    return (
+        select(func.max(total))
+        .where(Experience.user_id == User.user_id)
+        .correlate(User)
+        .scalar_subquery()
+    )
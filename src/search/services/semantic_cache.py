@@ -0,0 +1,162 @@
+# src/search/services/semantic_cache.py
+
+import json
+import time
+import uuid
+import base64
+import asyncio
+import numpy as np
+import redis.asyncio as redis
+from typing import Any, Dict, List, Optional
+from sentence_transformers import SentenceTransformer
+from search.services.metrics import metrics
+from search.services.index_version import get_index_version
+
+SEMCACHE_PREFIX = "semcache:v{version}"
+
+
+class SemanticQueryCache:
+    """
+    Caches completed first-turn agent runs by query embedding.
+
+    Entries live in Redis under the current index version:
+      <prefix>:embeddings  hash   entry id -> base64 float32 embedding
+      <prefix>:added       zset   entry id -> created timestamp
+      <prefix>:entry:<id>  string JSON payload (query, response, user_ids), with TTL
+    Each worker mirrors the embeddings into a local matrix and only pulls
+    entries added since its last sync, so a lookup is one ZRANGEBYSCORE plus
+    a matrix-vector product. Bumping the index version invalidates everything.
+    """
+
+    def __init__(
+        self,
+        redis_client: redis.Redis,
+        embedding_engine: SentenceTransformer,
+        threshold: float,
+        ttl_seconds: int,
+        max_entries: int
+    ):
+        self.redis_client = redis_client
+        self.embedding_engine = embedding_engine
+        self.threshold = threshold
+        self.ttl_seconds = ttl_seconds
+        self.max_entries = max_entries
+
+        self._version: Optional[int] = None
+        self._synced_at = 0.0
+        self._ids: List[str] = []
+        self._added: List[float] = []
+        self._matrix = np.zeros((0, 0), dtype=np.float32)
+        self._sync_lock = asyncio.Lock()
+
+    async def embed(self, query: str) -> np.ndarray:
+        embedding = await asyncio.to_thread(
+            self.embedding_engine.encode,
+            query,
+            prompt_name="retrieval",
+            normalize_embeddings=True
+        )
+        return np.asarray(embedding, dtype=np.float32)
+
+    async def lookup(self, embedding: np.ndarray) -> Optional[Dict[str, Any]]:
+        try:
+            prefix = await self._sync()
+            if not self._ids:
+                metrics.incr("semantic_cache.miss")
+                return None
+
+            similarities = self._matrix @ embedding
+            best = int(np.argmax(similarities))
+            score = float(similarities[best])
+            if score < self.threshold:
+                metrics.incr("semantic_cache.miss")
+                return None
+
+            payload = await self.redis_client.get(f"{prefix}:entry:{self._ids[best]}")
+        except redis.exceptions.RedisError as e:
+            print(f"[ERROR] Redis error during semantic cache lookup: {e}")
+            return None
+
+        if not payload:
+            metrics.incr("semantic_cache.miss")
+            return None
+
+        metrics.incr("semantic_cache.hit")
+        entry = json.loads(payload)
+        entry["similarity"] = score
+        print(f"[SEMANTIC CACHE]: Hit for '{entry['query']}' (similarity {score:.3f})")
+        return entry
+
+    async def store(self, query: str, embedding: np.ndarray, response: str, user_ids: List[str]):
+        entry_id = uuid.uuid4().hex
+        now = time.time()
+        payload = json.dumps({ "query": query, "response": response, "user_ids": user_ids, "created_at": now })
+        encoded = base64.b64encode(embedding.astype(np.float32).tobytes()).decode()
+
+        try:
+            prefix = SEMCACHE_PREFIX.format(version=await get_index_version(self.redis_client))
+            async with self.redis_client.pipeline(transaction=True) as pipe:
+                pipe.set(f"{prefix}:entry:{entry_id}", payload, ex=self.ttl_seconds)
+                pipe.hset(f"{prefix}:embeddings", entry_id, encoded)
+                pipe.zadd(f"{prefix}:added", { entry_id: now })
+                pipe.expire(f"{prefix}:embeddings", self.ttl_seconds)
+                pipe.expire(f"{prefix}:added", self.ttl_seconds)
+                await pipe.execute()
+            await self._trim(prefix, now)
+        except redis.exceptions.RedisError as e:
+            print(f"[ERROR] Redis error storing semantic cache entry: {e}")
+
+    async def _trim(self, prefix: str, now: float):
+        expired = await self.redis_client.zrangebyscore(f"{prefix}:added", "-inf", now - self.ttl_seconds)
+        overflow = await self.redis_client.zrange(f"{prefix}:added", 0, -self.max_entries - 1)
+        stale = list(set(expired) | set(overflow))
+        if stale:
+            async with self.redis_client.pipeline(transaction=True) as pipe:
+                pipe.zrem(f"{prefix}:added", *stale)
+                pipe.hdel(f"{prefix}:embeddings", *stale)
+                # Overflowed entries would otherwise keep their payload until the TTL.
+                pipe.delete(*(f"{prefix}:entry:{entry_id}" for entry_id in stale))
+                await pipe.execute()
+
+    async def _sync(self) -> str:
+        """Pulls embeddings added since the last sync; resets on an index version change."""
+        async with self._sync_lock:
+            version = await get_index_version(self.redis_client)
+            prefix = SEMCACHE_PREFIX.format(version=version)
+            if version != self._version:
+                self._version = version
+                self._synced_at = 0.0
+                self._ids, self._added = [], []
+                self._matrix = np.zeros((0, 0), dtype=np.float32)
+
+            now = time.time()
+            new = await self.redis_client.zrangebyscore(
+                f"{prefix}:added", f"({self._synced_at}", "+inf", withscores=True
+            )
+            if new:
+                new_ids = [entry_id for entry_id, _ in new]
+                encoded = await self.redis_client.hmget(f"{prefix}:embeddings", new_ids)
+                rows = []
+                for (entry_id, added), value in zip(new, encoded):
+                    if value is None:
+                        continue
+                    rows.append(np.frombuffer(base64.b64decode(value), dtype=np.float32))
+                    self._ids.append(entry_id)
+                    self._added.append(added)
+                    self._synced_at = max(self._synced_at, added)
+                if rows:
+                    stacked = np.vstack(rows)
+                    self._matrix = stacked if self._matrix.size == 0 else np.vstack([self._matrix, stacked])
+
+            # Drop expired entries and keep at most max_entries locally.
+            keep_from = 0
+            cutoff = now - self.ttl_seconds
+            while keep_from < len(self._added) and self._added[keep_from] < cutoff:
+                keep_from += 1
+            keep_from = max(keep_from, len(self._ids) - self.max_entries)
+            if keep_from > 0:
+                self._ids = self._ids[keep_from:]
+                self._added = self._added[keep_from:]
+                self._matrix = self._matrix[keep_from:]
+
+            return prefix
@@ -0,0 +1,194 @@
+# src/search/services/shared_profile_cache.py
+
+"""
+Profiles shared by every worker through Redis, between each worker's
+ProfileCache (profile_cache.py) and Postgres.
+
+Each profile is one msgpack blob: the ProfileView columns positionally, dates as
+ordinals and the repeated user_id left out of nested rows, or a ProfileDocument's
+two views. Keys:
+  profiles:generation         bumped to drop every entry
+  profiles:version:{user_id}  set from profiles:clock whenever the user changes
+  profiles:data:{user_id}     [generation, version, kind, ...payload]
+
+get_many() reads the generation, the versions and the blobs of a whole batch
+with a single MGET; a blob is served only if stamped with the current generation
+and version. Putting the version in the blob rather than in the data key's name
+keeps that to one round trip. put_many() writes the misses back in one pipeline,
+stamped with the versions get_many() saw, so a profile loaded before an edit
+is never served after it. That relies on every source below the cache being
+current once an edit commits: the profile tables are, and profile documents
+are only returned once rebuilt past the user's latest change
+(ProfileDocumentStore.get_many), since the document refresher may run well
+after the invalidation. invalidate() stamps all the given users with one new
+clock value in a single script, so an edit invalidates atomically and a version
+never repeats even after its key expires.
+
+Edits reach invalidate() through ProfileCache.publish(), whose change watcher
+tails profile_changes; the shared cache is only used alongside it.
+"""
+
+import time
+import msgpack
+import redis.asyncio as redis
+from datetime import date
+from typing import Any, Dict, Iterable, List, NamedTuple, Optional, Tuple
+from database.read_models import (
+    Profile, ProfileView, ProfileDocument, ProjectRow, EducationRow, ExperienceRow, SkillRow
+)
+from search.services.metrics import metrics
+
+GENERATION_KEY = "profiles:generation"
+CLOCK_KEY = "profiles:clock"
+VERSION_KEY = "profiles:version:{}"
+DATA_KEY = "profiles:data:{}"
+
+KIND_VIEW = 0
+KIND_DOCUMENT = 1
+
+# Stamps the users (KEYS[2:]) with one new value of the clock (KEYS[1]).
+_STAMP_SCRIPT = """
+local stamp = redis.call('INCR', KEYS[1])
+for i = 2, #KEYS do
+    redis.call('SET', KEYS[i], stamp, 'EX', ARGV[1])
+end
+return stamp
+"""
+
+_ROW_TYPES = (ProjectRow, EducationRow, ExperienceRow, SkillRow)
+_DATE_FIELDS = {
+    row_type: [i for i, hint in enumerate(row_type.__annotations__.values()) if hint == Optional[date]]
+    for row_type in _ROW_TYPES
+}
+
+
+class CacheStamp(NamedTuple):
+    """The generation and per-user versions seen by a get_many(), for writing its misses back."""
+    generation: int
+    versions: Dict[str, int]
+
+
+class SharedProfileCache:
+    """
+    Redis-backed profile cache shared across workers. Needs a client without
+    decode_responses, as entries are binary. Redis errors are treated as misses.
+    """
+
+    def __init__(self, redis_client: redis.Redis, ttl_seconds: int = 3600):
+        self.redis_client = redis_client
+        self.ttl_seconds = ttl_seconds
+        # Versions outlive every blob stamped with them (see module docstring).
+        self.version_ttl_seconds = ttl_seconds * 2
+        self._stamp = redis_client.register_script(_STAMP_SCRIPT)
+
+    async def get_many(self, user_ids: Iterable[str]) -> Tuple[Dict[str, Profile], Optional[CacheStamp]]:
+        """The cached profiles among user_ids, and the stamp to pass to put_many() (None if Redis failed)."""
+        ids = list(dict.fromkeys(user_ids))
+        if not ids:
+            return {}, None
+        keys = [GENERATION_KEY]
+        keys += [VERSION_KEY.format(user_id) for user_id in ids]
+        keys += [DATA_KEY.format(user_id) for user_id in ids]
+
+        started = time.perf_counter()
+        try:
+            values = await self.redis_client.mget(keys)
+        except redis.exceptions.RedisError as e:
+            print(f"[WARN] Shared profile cache read failed: {e}")
+            metrics.incr("shared_profile_cache.error")
+            return {}, None
+        metrics.observe("shared_profile_cache.mget_ms", (time.perf_counter() - started) * 1000)
+
+        generation = int(values[0] or 0)
+        versions = { user_id: int(value or 0) for user_id, value in zip(ids, values[1:len(ids) + 1]) }
+        found = {}
+        for user_id, blob in zip(ids, values[len(ids) + 1:]):
+            if blob is None:
+                continue
+            try:
+                entry = msgpack.unpackb(blob)
+                if entry[0] != generation or entry[1] != versions[user_id]:
+                    metrics.incr("shared_profile_cache.outdated")
+                    continue
+                found[user_id] = _decode(user_id, entry[2], entry[3:])
+            except Exception as e:
+                print(f"[WARN] Dropping undecodable shared profile cache entry for {user_id}: {e}")
+                metrics.incr("shared_profile_cache.error")
+        metrics.incr("shared_profile_cache.hit", len(found))
+        metrics.incr("shared_profile_cache.miss", len(ids) - len(found))
+        return found, CacheStamp(generation, versions)
+
+    async def put_many(self, profiles: Iterable[Profile], stamp: Optional[CacheStamp]):
+        """Writes back profiles loaded after the get_many() that returned `stamp`, in one pipeline."""
+        if stamp is None:
+            return
+        written = 0
+        pipe = self.redis_client.pipeline(transaction=False)
+        for profile in profiles:
+            version = stamp.versions.get(profile.user_id)
+            if version is None:
+                continue
+            blob = msgpack.packb([stamp.generation, version, *_encode(profile)])
+            pipe.set(DATA_KEY.format(profile.user_id), blob, ex=self.ttl_seconds)
+            written += len(blob)
+        if not written:
+            return
+        try:
+            await pipe.execute()
+        except redis.exceptions.RedisError as e:
+            print(f"[WARN] Shared profile cache write failed: {e}")
+            metrics.incr("shared_profile_cache.error")
+            return
+        metrics.incr("shared_profile_cache.bytes_written", written)
+
+    async def invalidate(self, user_ids: Optional[List[str]] = None):
+        """Invalidates the given users, or every entry when user_ids is None."""
+        try:
+            if user_ids is None:
+                await self.redis_client.incr(GENERATION_KEY)
+            elif user_ids:
+                keys = [CLOCK_KEY] + [VERSION_KEY.format(user_id) for user_id in dict.fromkeys(user_ids)]
+                await self._stamp(keys=keys, args=[self.version_ttl_seconds])
+        except redis.exceptions.RedisError as e:
+            print(f"[ERROR] Failed to invalidate shared profile cache: {e}")
+            metrics.incr("shared_profile_cache.error")
+            return
+        metrics.incr("shared_profile_cache.invalidated")
+
+
+def _encode(profile: Profile) -> List[Any]:
+    if isinstance(profile, ProfileDocument):
+        return [KIND_DOCUMENT, profile.document, profile.llm_digest]
+    rows = [
+        [_encode_row(row) for row in rows]
+        for rows in (profile.projects, profile.educations, profile.experiences, profile.skills)
+    ]
+    return [KIND_VIEW, profile.first_name, profile.last_name, profile.email, profile.pfp_url, *rows]
+
+
+def _decode(user_id: str, kind: int, payload: List[Any]) -> Profile:
+    if kind == KIND_DOCUMENT:
+        return ProfileDocument(user_id, payload[0], payload[1])
+    columns, children = payload[:4], payload[4:]
+    rows = [
+        tuple(_decode_row(row_type, user_id, values) for values in encoded)
+        for row_type, encoded in zip(_ROW_TYPES, children)
+    ]
+    return ProfileView(user_id, *columns, *rows)
+
+
+def _encode_row(row: NamedTuple) -> List[Any]:
+    values = list(row)
+    for i in _DATE_FIELDS[type(row)]:
+        if values[i] is not None:
+            values[i] = values[i].toordinal()
+    del values[1]  # user_id, the profile's own
+    return values
+
+
+def _decode_row(row_type, user_id: str, values: List[Any]) -> NamedTuple:
+    values.insert(1, user_id)
+    for i in _DATE_FIELDS[row_type]:
+        if values[i] is not None:
+            values[i] = date.fromordinal(values[i])
+    return row_type._make(values)
@@ -0,0 +1,369 @@
+# src/search/services/single_flight.py
+
+import json
+import uuid
+import asyncio
+import redis.asyncio as redis
+from typing import Any, AsyncGenerator, Awaitable, Callable, Dict, List, Optional
+from search.services.metrics import metrics
+from search.services.profile_json import dumps_event
+
+SF_PREFIX = "sf:"
+
+# Deletes the lock only if this worker still owns it.
+_RELEASE_LOCK = """
+if redis.call("get", KEYS[1]) == ARGV[1] then
+    return redis.call("del", KEYS[1])
+end
+return 0
+"""
+
+_STREAM_END = "__end__"
+_STREAM_ERROR = "__error__"
+_STREAM_HEARTBEAT = "__heartbeat__"
+
+
+class _Broadcast:
+    """An append-only event buffer that any number of local consumers replay from the start."""
+
+    def __init__(self):
+        self.events: List[Dict[str, Any]] = []
+        self.done = False
+        self.error: Optional[BaseException] = None
+        self.task: Optional[asyncio.Task] = None
+        self._changed = asyncio.Condition()
+
+    async def publish(self, event: Dict[str, Any]):
+        async with self._changed:
+            self.events.append(event)
+            self._changed.notify_all()
+
+    async def close(self, error: Optional[BaseException] = None):
+        async with self._changed:
+            self.done = True
+            self.error = error
+            self._changed.notify_all()
+
+    async def subscribe(self) -> AsyncGenerator[Dict[str, Any], None]:
+        index = 0
+        while True:
+            async with self._changed:
+                await self._changed.wait_for(lambda: index < len(self.events) or self.done)
+                pending = self.events[index:]
+                done, error = self.done, self.error
+            for event in pending:
+                yield event
+            index += len(pending)
+            if done and index >= len(self.events):
+                if error is not None:
+                    raise error
+                return
+
+
+class _StreamMirror:
+    """
+    Copies a leader's events to its Redis stream for followers on other workers.
+    Events are written in batches from a background task, so producing an event
+    never waits on Redis, and a heartbeat is written whenever the run has been
+    quiet for `heartbeat_seconds`, so followers can tell a slow stage from a
+    dead leader.
+    """
+
+    def __init__(self, redis_client: redis.Redis, stream_key: str, ttl_seconds: int, heartbeat_seconds: float):
+        self.redis_client = redis_client
+        self.stream_key = stream_key
+        self.ttl_seconds = ttl_seconds
+        self.heartbeat_seconds = heartbeat_seconds
+        self._pending: List[str] = []
+        self._closed = False
+        self._wake = asyncio.Event()
+        self._task = asyncio.create_task(self._run())
+
+    def add(self, data: str):
+        self._pending.append(data)
+        self._wake.set()
+
+    async def close(self, final: str):
+        """Writes the final marker after everything pending."""
+        self._closed = True
+        self.add(final)
+        await self._task
+
+    def abort(self):
+        self._task.cancel()
+
+    async def _run(self):
+        while True:
+            try:
+                await asyncio.wait_for(self._wake.wait(), timeout=self.heartbeat_seconds)
+            except asyncio.TimeoutError:
+                self._pending.append(_STREAM_HEARTBEAT)
+            self._wake.clear()
+            batch, self._pending = self._pending, []
+            await self._flush(batch)
+            if self._closed and not self._pending:
+                return
+
+    async def _flush(self, batch: List[str]):
+        try:
+            async with self.redis_client.pipeline(transaction=False) as pipe:
+                for data in batch:
+                    pipe.xadd(self.stream_key, { "event": data })
+                pipe.expire(self.stream_key, self.ttl_seconds)
+                await pipe.execute()
+            metrics.observe("single_flight.stream.batch_size", len(batch))
+        except redis.exceptions.RedisError as e:
+            print(f"[WARN] Failed to broadcast single-flight events to {self.stream_key}: {e}")
+
+
+class SingleFlight:
+    """
+    Coalesces identical concurrent work, in this worker and across workers.
+
+    In-process, callers with the same key share one future (do) or one
+    broadcast event buffer (stream). Across workers, the first caller takes a
+    Redis lock whose value is a per-leadership token; other workers read the
+    leader's result from `<key>:<token>` keys (a pub/sub notification for do,
+    a Redis stream for stream). If the leader fails or goes quiet for
+    `wait_timeout` seconds, a follower does the work itself; a streaming
+    leader sends a heartbeat every `heartbeat_seconds`, so only a dead leader
+    goes quiet, not a long silent stage.
+    Results passed across workers must be JSON-serializable.
+    """
+
+    def __init__(
+        self,
+        redis_client: redis.Redis,
+        lock_ttl_seconds: int = 120,
+        result_ttl_seconds: int = 10,
+        wait_timeout: float = 30.0,
+        heartbeat_seconds: float = 5.0
+    ):
+        self.redis_client = redis_client
+        self.lock_ttl_seconds = lock_ttl_seconds
+        self.result_ttl_seconds = result_ttl_seconds
+        self.wait_timeout = wait_timeout
+        # A follower must see several heartbeats within its wait.
+        self.heartbeat_seconds = min(heartbeat_seconds, wait_timeout / 3)
+        self._calls: Dict[str, asyncio.Future] = {}
+        self._streams: Dict[str, _Broadcast] = {}
+
+    """
+    Request/response work
+    """
+    async def do(self, key: str, fn: Callable[[], Awaitable[Any]]) -> Any:
+        """
+        Runs fn once per key at a time. Followers belong to unrelated callers,
+        so a cancelled leader hands the key over: the first follower to wake
+        becomes the new leader instead of being cancelled too.
+        """
+        future = self._calls.get(key)
+        while future is not None:
+            metrics.incr("single_flight.do.shared_local")
+            try:
+                return await asyncio.shield(future)
+            except asyncio.CancelledError:
+                if asyncio.current_task().cancelling() or not future.cancelled():
+                    raise  # This caller was cancelled, not the leader.
+            metrics.incr("single_flight.do.leader_cancelled")
+            future = self._calls.get(key)
+
+        future = asyncio.get_running_loop().create_future()
+        self._calls[key] = future
+        try:
+            result = await self._do_clustered(key, fn)
+            future.set_result(result)
+            return result
+        except asyncio.CancelledError:
+            future.cancel()
+            raise
+        except Exception as e:
+            future.set_exception(e)
+            future.exception()  # Mark retrieved when there are no other waiters.
+            raise
+        finally:
+            self._calls.pop(key, None)
+
+    async def _do_clustered(self, key: str, fn: Callable[[], Awaitable[Any]]) -> Any:
+        lock_key = f"{SF_PREFIX}lock:{key}"
+        token = uuid.uuid4().hex
+        try:
+            acquired = await self.redis_client.set(lock_key, token, nx=True, ex=self.lock_ttl_seconds)
+            leader_token = token if acquired else await self.redis_client.get(lock_key)
+        except redis.exceptions.RedisError as e:
+            print(f"[WARN] Single-flight lock unavailable, running locally: {e}")
+            return await fn()
+
+        if not acquired and leader_token:
+            found, result = await self._wait_for_result(key, leader_token)
+            if found:
+                metrics.incr("single_flight.do.shared_remote")
+                return result
+            metrics.incr("single_flight.do.leader_timeout")
+            return await fn()
+
+        result_key = f"{SF_PREFIX}result:{key}:{token}"
+        channel = f"{SF_PREFIX}done:{key}:{token}"
+        try:
+            result = await fn()
+            payload = json.dumps({ "result": result })
+        except Exception:
+            await self._publish_quietly(channel, json.dumps({ "error": True }))
+            await self._release(lock_key, token)
+            raise
+
+        try:
+            async with self.redis_client.pipeline(transaction=False) as pipe:
+                pipe.set(result_key, payload, ex=self.result_ttl_seconds)
+                pipe.publish(channel, payload)
+                await pipe.execute()
+        except redis.exceptions.RedisError as e:
+            print(f"[WARN] Failed to publish single-flight result for {key}: {e}")
+        await self._release(lock_key, token)
+        return result
+
+    async def _wait_for_result(self, key: str, token: str):
+        result_key = f"{SF_PREFIX}result:{key}:{token}"
+        channel = f"{SF_PREFIX}done:{key}:{token}"
+        pubsub = self.redis_client.pubsub()
+        try:
+            await pubsub.subscribe(channel)
+            # The leader may have finished between our lock attempt and subscribing.
+            payload = await self.redis_client.get(result_key)
+            loop = asyncio.get_running_loop()
+            deadline = loop.time() + self.wait_timeout
+            while payload is None and loop.time() < deadline:
+                message = await pubsub.get_message(ignore_subscribe_messages=True, timeout=1.0)
+                if message and message["type"] == "message":
+                    payload = message["data"]
+        except redis.exceptions.RedisError as e:
+            print(f"[WARN] Single-flight wait failed for {key}: {e}")
+            return False, None
+        finally:
+            await pubsub.aclose()
+
+        if payload is None:
+            return False, None
+        decoded = json.loads(payload)
+        if decoded.get("error"):
+            return False, None
+        return True, decoded["result"]
+
+    """
+    Streaming work
+    """
+    async def stream(
+        self,
+        key: str,
+        factory: Callable[[], AsyncGenerator[Dict[str, Any], None]]
+    ) -> AsyncGenerator[Dict[str, Any], None]:
+        """
+        Yields the events of factory(), produced once per key. Production runs
+        in its own task, so a consumer disconnecting does not cut off the others.
+        """
+        broadcast = self._streams.get(key)
+        if broadcast is None:
+            broadcast = _Broadcast()
+            self._streams[key] = broadcast
+            broadcast.task = asyncio.create_task(self._produce(key, broadcast, factory))
+        else:
+            metrics.incr("single_flight.stream.shared_local")
+
+        async for event in broadcast.subscribe():
+            yield event
+
+    async def _produce(self, key: str, broadcast: _Broadcast, factory):
+        lock_key = f"{SF_PREFIX}lock:{key}"
+        token = uuid.uuid4().hex
+        mirror: Optional[_StreamMirror] = None
+        try:
+            try:
+                acquired = await self.redis_client.set(lock_key, token, nx=True, ex=self.lock_ttl_seconds)
+                leader_token = token if acquired else await self.redis_client.get(lock_key)
+            except redis.exceptions.RedisError as e:
+                print(f"[WARN] Single-flight lock unavailable, running locally: {e}")
+                acquired, leader_token = False, None
+
+            if not acquired and leader_token:
+                if await self._follow_remote(key, leader_token, broadcast):
+                    metrics.incr("single_flight.stream.shared_remote")
+                    await broadcast.close()
+                    return
+                # Leader went quiet before finishing: produce locally, but never
+                # re-send events this worker's consumers have already seen.
+                metrics.incr("single_flight.stream.leader_timeout")
+                if broadcast.events:
+                    raise RuntimeError("Shared search stopped responding")
+
+            if acquired:
+                mirror = _StreamMirror(
+                    self.redis_client,
+                    f"{SF_PREFIX}stream:{key}:{token}",
+                    ttl_seconds=self.lock_ttl_seconds,
+                    heartbeat_seconds=self.heartbeat_seconds
+                )
+            try:
+                async for event in factory():
+                    await broadcast.publish(event)
+                    if mirror:
+                        mirror.add(dumps_event(event))
+            except Exception:
+                if mirror:
+                    await mirror.close(_STREAM_ERROR)
+                raise
+            if mirror:
+                await mirror.close(_STREAM_END)
+            await broadcast.close()
+        except Exception as e:
+            await broadcast.close(error=e)
+        finally:
+            if mirror:
+                mirror.abort()
+            if self._streams.get(key) is broadcast:
+                del self._streams[key]
+            await self._release(lock_key, token)
+
+    async def _follow_remote(self, key: str, token: str, broadcast: _Broadcast) -> bool:
+        """Mirrors a leader's Redis stream into the local broadcast. False if the leader fails or stops heartbeating."""
+        stream_key = f"{SF_PREFIX}stream:{key}:{token}"
+        last_id = "0-0"
+        while True:
+            try:
+                response = await self.redis_client.xread(
+                    { stream_key: last_id },
+                    block=int(self.wait_timeout * 1000),
+                    count=100
+                )
+            except redis.exceptions.RedisError as e:
+                print(f"[WARN] Single-flight stream read failed for {key}: {e}")
+                return False
+
+            if not response:
+                return False
+
+            for _, entries in response:
+                for entry_id, fields in entries:
+                    last_id = entry_id
+                    data = fields["event"]
+                    if data == _STREAM_END:
+                        return True
+                    if data == _STREAM_ERROR:
+                        return False
+                    if data == _STREAM_HEARTBEAT:
+                        continue
+                    await broadcast.publish(json.loads(data))
+
+    """
+    Redis helpers
+    """
+    async def _publish_quietly(self, channel: str, payload: str):
+        try:
+            await self.redis_client.publish(channel, payload)
+        except redis.exceptions.RedisError as e:
+            print(f"[WARN] Failed to publish to {channel}: {e}")
+
+    async def _release(self, lock_key: str, token: str):
+        try:
+            await self.redis_client.eval(_RELEASE_LOCK, 1, lock_key, token)
+        except redis.exceptions.RedisError as e:
+            print(f"[WARN] Failed to release single-flight lock {lock_key}: {e}")
@@ -9,6 +9,9 @@ from fastapi import APIRouter, Depends, HTTPException
 # from users.service import UserService
 from sqlalchemy import select
 from database.models import User
+from database.read_models import load_profiles
+from search.dependencies import get_profile_documents
+from search.services.profile_documents import ProfileDocumentStore
 from typing import List
 
 router = APIRouter(prefix="/users", tags=["users"])
@@ -43,22 +46,19 @@ async def get_db():
         yield session
 
 @router.get("/{user_id}/profile", response_model=UserProfileResponse)
-async def get_user_profile(user_id: str, db: AsyncSession = Depends(get_db)):
-    query = (
-        select(User)
-        .options(
-            selectinload(User.projects),
-            selectinload(User.educations),
-            selectinload(User.experiences),
-            selectinload(User.skills)
-        )
-        .where(User.user_id == user_id)
-    )
-    
-    result = await db.execute(query)
-    user = result.scalars().first()
-    
-    if not user:
+async def get_user_profile(
+    user_id: str,
+    db: AsyncSession = Depends(get_db),
+    profile_documents: ProfileDocumentStore | None = Depends(get_profile_documents)
+):
+    if profile_documents:
+        # Only a document as new as the user's latest change: edits show up on reload.
+        document = await profile_documents.get(user_id)
+        if document:
+            return document.to_dict()
+
+    profiles = await load_profiles(db, [user_id])
+    if user_id not in profiles:
         raise HTTPException(status_code=404, detail=f"User with id {user_id} not found")
     
-    return user
+    return profiles[user_id].to_dict()